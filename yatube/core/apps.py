@@ -1,5 +1,15 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from . import querycache
+        connection_created.connect(querycache.install)
+
+        if settings.TEMPLATE_PROFILING:
+            from . import templateprofile
+            templateprofile.install()
@@ -0,0 +1,201 @@
+"""Вспомогательные средства для нагрузочных измерений.
+
+Запросы отправляются напрямую в WSGI-приложение проекта, без сети и без
+тестового клиента Django: тестовый клиент сохраняет контексты шаблонов и
+заметно искажает время ответа.
+"""
+import io
+import re
+import sys
+import time
+import tracemalloc
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+from importlib import import_module
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth import (
+    BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+)
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections, connection
+from django.middleware.csrf import _get_new_csrf_token
+
+IMPORT_TIME = re.compile(
+    r'^import time:\s+(\d+) \|\s+(\d+) \|\s*(\S+)$', re.M)
+
+ImportTime = namedtuple('ImportTime', 'module own_us cumulative_us')
+
+
+def percentile(values, q):
+    """Перцентиль q (0–100) с линейной интерполяцией."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (
+        position - lower)
+
+
+def summarize(durations):
+    """Сводка по длительностям в секундах, результат в миллисекундах."""
+    return {
+        f'p{q}_ms': round(percentile(durations, q) * 1000, 3)
+        for q in (50, 95, 99)
+    }
+
+
+@contextmanager
+def count_queries(using=connection):
+    """Считает SQL-запросы, выполненные внутри блока."""
+    counter = {'queries': 0}
+
+    def wrapper(execute, sql, params, many, context):
+        counter['queries'] += 1
+        return execute(sql, params, many, context)
+
+    with using.execute_wrapper(wrapper):
+        yield counter
+
+
+@contextmanager
+def persistent_connections():
+    """Не закрывает соединение с БД между запросами.
+
+    WSGIHandler закрывает «устаревшие» соединения на сигналах начала и
+    конца запроса. Внутри транзакции это оборвало бы её, поэтому, как и
+    тестовый клиент Django, на время измерений отключаем эти обработчики.
+    """
+    request_started.disconnect(close_old_connections)
+    request_finished.disconnect(close_old_connections)
+    try:
+        yield
+    finally:
+        request_started.connect(close_old_connections)
+        request_finished.connect(close_old_connections)
+
+
+def session_cookie(user):
+    """Создаёт сессию вошедшего пользователя и возвращает её cookie."""
+    store = import_module(settings.SESSION_ENGINE).SessionStore()
+    store[SESSION_KEY] = user._meta.pk.value_to_string(user)
+    store[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    store[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    store.save()
+    return {settings.SESSION_COOKIE_NAME: store.session_key}
+
+
+class WSGIClient:
+    """Минимальный клиент, вызывающий WSGI-приложение в том же процессе."""
+
+    def __init__(self, application=None, cookies=None, host='testserver'):
+        if application is None:
+            from django.core.wsgi import get_wsgi_application
+            application = get_wsgi_application()
+        self.application = application
+        self.cookies = dict(cookies or {})
+        self.host = host
+
+    def environ(self, path, method='GET', data=None):
+        path, _, query = path.partition('?')
+        cookies = dict(self.cookies)
+        data = dict(data or {})
+        if method == 'POST':
+            token = _get_new_csrf_token()
+            cookies[settings.CSRF_COOKIE_NAME] = token
+            data.setdefault('csrfmiddlewaretoken', token)
+        body = urlencode(data).encode()
+        return {
+            'REQUEST_METHOD': method,
+            'SCRIPT_NAME': '',
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'SERVER_NAME': self.host,
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'REMOTE_ADDR': '192.0.2.1',
+            'HTTP_HOST': self.host,
+            'HTTP_COOKIE': '; '.join(f'{k}={v}' for k, v in cookies.items()),
+            'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.url_scheme': 'http',
+            'wsgi.version': (1, 0),
+            'wsgi.multithread': False,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+
+    def request(self, path, method='GET', data=None):
+        """Выполняет запрос и возвращает пару (код ответа, тело)."""
+        status = []
+
+        def start_response(value, headers, exc_info=None):
+            status.append(int(value.split()[0]))
+
+        response = self.application(
+            self.environ(path, method, data), start_response)
+        try:
+            body = b''.join(response)
+        finally:
+            if hasattr(response, 'close'):
+                response.close()
+        return status[0], body
+
+    def get(self, path):
+        return self.request(path)
+
+    def post(self, path, data=None):
+        return self.request(path, 'POST', data)
+
+
+def measure(call, iterations, warmup=0):
+    """Прогревает и многократно вызывает call, возвращает длительности."""
+    for _ in range(warmup):
+        call()
+    durations = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        call()
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+def peak_memory(call):
+    """Пиковый объём памяти в байтах, выделенной Python во время call."""
+    tracemalloc.start()
+    try:
+        call()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def parse_importtime(output):
+    """Строки вывода ``python -X importtime`` в список ImportTime."""
+    return [
+        ImportTime(module, int(own), int(cumulative))
+        for own, cumulative, module in IMPORT_TIME.findall(output)
+    ]
+
+
+def import_owner(module, packages):
+    """Приложение или пакет, к которому относится модуль: самый длинный
+    подходящий префикс из packages, иначе пакет верхнего уровня."""
+    owners = [
+        package for package in packages
+        if module == package or module.startswith(package + '.')
+    ]
+    return max(owners, key=len) if owners else module.split('.')[0]
+
+
+def imports_by_owner(imports, packages):
+    """Собственное время импорта в микросекундах по приложениям."""
+    totals = Counter()
+    for row in imports:
+        totals[import_owner(row.module, packages)] += row.own_us
+    return totals
@@ -0,0 +1,93 @@
+"""Защита горячих ключей кеша от одновременного пересчёта.
+
+Когда запись истекает, все запросы разом идут её пересчитывать и базу
+захлёстывает волна одинаковых запросов. ``get_or_set`` пускает к
+пересчёту только один запрос на ключ: он берёт блокировку через
+``cache.add``, атомарную и для потоков, и (на общем кеше) для процессов;
+на LocMemCache она работает как локальная блокировка процесса.
+Остальные в это время отдают прежнее значение, а если его нет — недолго
+ждут результата.
+
+Чтобы пересчёт не совпадал с моментом истечения, применяется
+вероятностное досрочное обновление (XFetch): чем ближе срок и чем дольше
+пересчёт, тем вероятнее, что очередной запрос обновит запись заранее.
+"""
+import math
+import random
+import time
+from collections import namedtuple
+
+from django.core.cache import cache
+
+Entry = namedtuple('Entry', 'value delta expires')
+
+# Сколько секунд после срока запись ещё хранится и отдаётся, пока её
+# пересчитывают.
+STALE = 60
+LOCK_TIMEOUT = 10
+WAIT = 0.5
+POLL_INTERVAL = 0.02
+
+
+def lock_key(key):
+    return f'{key}:lock'
+
+
+def acquire(key, timeout=LOCK_TIMEOUT, using=cache):
+    """Берёт блокировку ключа; False, если её уже держит другой."""
+    return using.add(lock_key(key), True, timeout)
+
+
+def release(key, using=cache):
+    using.delete(lock_key(key))
+
+
+def should_recompute(entry, beta=1.0, now=None):
+    """XFetch: досрочное обновление с вероятностью, растущей к сроку."""
+    if now is None:
+        now = time.time()
+    early = -entry.delta * beta * math.log(1 - random.random())
+    return now + early >= entry.expires
+
+
+def compute_and_store(key, compute, timeout, using=cache):
+    started = time.time()
+    value = compute()
+    finished = time.time()
+    using.set(
+        key, Entry(value, finished - started, finished + timeout),
+        timeout + STALE)
+    return value
+
+
+def wait_for(key, using=cache):
+    """Ждёт, пока другой запрос положит значение; None по истечении."""
+    deadline = time.monotonic() + WAIT
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = using.get(key)
+        if entry is not None:
+            return entry
+    return None
+
+
+def get_or_set(key, compute, timeout, beta=1.0, using=cache):
+    """Значение из кеша или compute(), пересчитываемое одним запросом.
+
+    Запись живёт timeout секунд и ещё STALE секунд отдаётся тем, кто не
+    получил блокировку, пока её пересчитывают.
+    """
+    entry = using.get(key)
+    if entry is not None and not should_recompute(entry, beta):
+        return entry.value
+    if not acquire(key, using=using):
+        if entry is None:
+            entry = wait_for(key, using)
+        if entry is not None:
+            return entry.value
+        # Пересчитывающий запрос не успел: считаем сами, не блокируя.
+        return compute_and_store(key, compute, timeout, using)
+    try:
+        return compute_and_store(key, compute, timeout, using)
+    finally:
+        release(key, using)
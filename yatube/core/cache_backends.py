@@ -0,0 +1,867 @@
+"""Бэкенды кеша, общие для рабочих процессов одного сервера.
+
+``SQLiteCache`` хранит записи в одном файле SQLite. LocMemCache у каждого
+рабочего процесса свой: процент попаданий падает с числом процессов,
+сброс кеша не доходит до соседей, память дублируется. Здесь все процессы
+работают с одним файлом в режиме WAL: чтения идут параллельно, записи
+коротки и сериализуются самой SQLite.
+
+Объём ограничен параметром ``MAX_SIZE`` (байты значений) и, как у других
+бэкендов Django, ``MAX_ENTRIES``. Сверх лимита удаляются сначала
+истёкшие, затем давно не читанные записи (LRU). Время последнего чтения
+обновляется не чаще раза в ``TOUCH_INTERVAL`` секунд, чтобы чтения не
+превращались в запись на каждом обращении. Суммарный размер и число
+записей поддерживают триггеры, так что проверка лимита стоит одного
+чтения строки.
+
+``NearCache`` — небольшой LRU в памяти процесса перед общим кешем: самые
+горячие ключи читаются без обращения к файлу, а строки и числа — ещё и
+без распаковки.
+Согласованность между процессами описана в документации класса.
+
+``InstrumentedCache`` — обёртка над любым кешем, которая считает
+попадания, промахи, записи, вытеснения и байты по пространствам имён
+ключей (``template.cache.index_page``, ``feed``, ``sorl-thumbnail``,
+``sessions`` и так далее).
+
+Пример настройки::
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache_backends.InstrumentedCache',
+            'LOCATION': 'near',
+        },
+        'near': {
+            'BACKEND': 'core.cache_backends.NearCache',
+            'LOCATION': 'shared',
+            'OPTIONS': {'MAX_ENTRIES': 1000},
+        },
+        'shared': {
+            'BACKEND': 'core.cache_backends.SQLiteCache',
+            'LOCATION': '/var/tmp/yatube-cache.sqlite3',
+            'OPTIONS': {'MAX_SIZE': 256 * 2 ** 20},
+        },
+    }
+"""
+import logging
+import math
+import os
+import pickle
+import random
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+logger = logging.getLogger('yatube.cache')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+CREATE TABLE IF NOT EXISTS cache_stats (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    entries INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_stats VALUES (1, 0, 0);
+CREATE TRIGGER IF NOT EXISTS cache_insert AFTER INSERT ON cache BEGIN
+    UPDATE cache_stats
+    SET entries = entries + 1, size = size + new.size WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_delete AFTER DELETE ON cache BEGIN
+    UPDATE cache_stats
+    SET entries = entries - 1, size = size - old.size WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_update AFTER UPDATE OF size ON cache
+BEGIN
+    UPDATE cache_stats SET size = size - old.size + new.size WHERE id = 1;
+END;
+'''
+
+# Кеш чистится с запасом, чтобы не делать этого на каждой записи.
+CULL_TARGET = 0.9
+
+# Значения, которые NearCache хранит в памяти без pickle.
+IMMUTABLE = (str, bytes, int, float, type(None))
+
+
+class SQLiteCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.path = location
+        self.max_size = int(options.get('MAX_SIZE', 64 * 2 ** 20))
+        self.touch_interval = float(options.get('TOUCH_INTERVAL', 1))
+        self.busy_timeout = float(options.get('BUSY_TIMEOUT', 5))
+        self._local = threading.local()
+
+    @property
+    def connection(self):
+        # Соединение своё у каждого потока и у каждого процесса после fork.
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self.path, timeout=self.busy_timeout, isolation_level=None,
+                check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            # Иначе INSERT OR REPLACE не вызывает триггер удаления старой
+            # строки и счётчики в cache_stats расходятся.
+            connection.execute('PRAGMA recursive_triggers=ON')
+            connection.executescript(SCHEMA)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _write(self, key, value, timeout, replace=True):
+        pickled = pickle.dumps(value, self.pickle_protocol)
+        now = time.time()
+        verb = 'REPLACE' if replace else 'IGNORE'
+        cursor = self.connection.execute(
+            f'INSERT OR {verb} INTO cache VALUES (?, ?, ?, ?, ?)',
+            (key, pickled, self.get_backend_timeout(timeout), now,
+             len(pickled)))
+        return cursor.rowcount == 1
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        connection = self.connection
+        with Transaction(connection):
+            connection.execute(
+                'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                (key, time.time()))
+            added = self._write(key, value, timeout, replace=False)
+        if added:
+            self._cull()
+        return added
+
+    def get(self, key, default=None, version=None):
+        return self.get_with_timeout(key, default, version)[0]
+
+    def get_with_timeout(self, key, default=None, version=None):
+        """Значение и оставшееся время жизни записи в секундах (None —
+        бессрочная); для отсутствующего ключа — (default, None)."""
+        key = self._key(key, version)
+        now = time.time()
+        row = self.connection.execute(
+            'SELECT value, expires, accessed FROM cache WHERE key = ?',
+            (key,)).fetchone()
+        if row is None:
+            return default, None
+        value, expires, accessed = row
+        if expires is not None and expires <= now:
+            self.connection.execute(
+                'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                (key, now))
+            return default, None
+        if now - accessed >= self.touch_interval:
+            self.connection.execute(
+                'UPDATE cache SET accessed = ? WHERE key = ?', (now, key))
+        return pickle.loads(value), None if expires is None else expires - now
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._write(self._key(key, version), value, timeout)
+        self._cull()
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        cursor = self.connection.execute(
+            'UPDATE cache SET expires = ? '
+            'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), self._key(key, version),
+             time.time()))
+        return cursor.rowcount == 1
+
+    def delete(self, key, version=None):
+        self.connection.execute(
+            'DELETE FROM cache WHERE key = ?', (self._key(key, version),))
+
+    def has_key(self, key, version=None):
+        row = self.connection.execute(
+            'SELECT 1 FROM cache '
+            'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self._key(key, version), time.time())).fetchone()
+        return row is not None
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        connection = self.connection
+        with Transaction(connection):
+            row = connection.execute(
+                'SELECT value FROM cache '
+                'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (key, time.time())).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            pickled = pickle.dumps(value, self.pickle_protocol)
+            connection.execute(
+                'UPDATE cache SET value = ?, size = ? WHERE key = ?',
+                (pickled, len(pickled), key))
+        return value
+
+    def clear(self):
+        self.connection.execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Соединение переиспользуется между запросами своего потока.
+        pass
+
+    def stats(self):
+        """Число записей и суммарный размер значений в байтах."""
+        entries, size = self.connection.execute(
+            'SELECT entries, size FROM cache_stats').fetchone()
+        return {'entries': entries, 'size': size}
+
+    def _cull(self):
+        stats = self.stats()
+        if (stats['size'] <= self.max_size
+                and stats['entries'] <= self._max_entries):
+            return
+        connection = self.connection
+        connection.execute(
+            'DELETE FROM cache WHERE expires <= ?', (time.time(),))
+        while True:
+            stats = self.stats()
+            excess = max(
+                stats['entries'] - int(self._max_entries * CULL_TARGET),
+                math.ceil(
+                    (stats['size'] - self.max_size * CULL_TARGET)
+                    * stats['entries'] / max(stats['size'], 1)))
+            if excess <= 0:
+                return
+            keys = connection.execute(
+                'SELECT key FROM cache ORDER BY accessed LIMIT ?',
+                (excess,)).fetchall()
+            if not keys:
+                return
+            connection.executemany('DELETE FROM cache WHERE key = ?', keys)
+            EVICTIONS.update(namespace(original_key(key)) for key, in keys)
+
+    def scan(self, sample=None):
+        """Пары (ключ, размер значения) всех записей или случайной
+        выборки из sample записей; ключи без префикса и версии."""
+        query = 'SELECT key, size FROM cache'
+        params = ()
+        if sample is not None:
+            query += ' ORDER BY random() LIMIT ?'
+            params = (sample,)
+        for key, size in self.connection.execute(query, params):
+            yield original_key(key), size
+
+
+class Transaction:
+    """BEGIN IMMEDIATE: блокировка записи берётся сразу, поэтому чтение
+    и запись внутри транзакции атомарны и между процессами."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute('BEGIN IMMEDIATE')
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.connection.execute('ROLLBACK' if exc_type else 'COMMIT')
+
+
+# Журнал изменений ближнего кеша в общем кеше: номер последней записи и
+# кольцо из JOURNAL_SIZE ключей вида (номер, изменённый ключ).
+SEQUENCE_KEY = 'nearcache:sequence'
+JOURNAL_KEY = 'nearcache:journal:{}'
+# Запись журнала о полной очистке кеша.
+CLEARED = '*'
+
+
+class NearCache(BaseCache):
+    """LRU в памяти процесса перед общим кешем с алиасом LOCATION.
+
+    Прочитанные и записанные значения хранятся локально не дольше
+    ``LOCAL_TIMEOUT`` секунд и не больше ``MAX_ENTRIES`` штук, а
+    прочитанные — и не дольше, чем осталось жить записи в общем кеше, если
+    он это сообщает (``get_with_timeout`` у SQLiteCache). Строки, байты и
+    числа отдаются как есть, остальные значения хранятся в pickle и
+    распаковываются при каждом чтении, так что изменение полученного
+    значения не портит кеш.
+
+    Каждая запись (set, add, incr, delete, clear) попадает в журнал в
+    общем кеше. Раз в ``SYNC_INTERVAL`` секунд процесс читает новые записи
+    журнала и выбрасывает у себя изменённые ключи; если журнал прерван
+    (общий кеш очищен, записи вытеснены или ещё не дописаны), локальный
+    уровень очищается целиком. Так процесс видит чужие записи не позже
+    чем через SYNC_INTERVAL, свои — сразу.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.shared_alias = location
+        self.local_timeout = float(options.get('LOCAL_TIMEOUT', 5))
+        self.sync_interval = float(options.get('SYNC_INTERVAL', 0.5))
+        self.journal_size = int(options.get('JOURNAL_SIZE', 1000))
+        # Запись журнала должна пережить локальную копию ключа.
+        self.journal_timeout = max(60, 2 * self.local_timeout)
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self._sequence = None
+        self._synced = 0
+        self.counters = Counter()
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    # Локальный уровень.
+
+    def _local_get(self, key, now):
+        """Локальное значение ключа или _MISSING."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            if entry[1] <= now:
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+        value, expires, pickled = entry
+        return pickle.loads(value) if pickled else value
+
+    def _local_set(self, key, value, timeout, now):
+        expires = now + self.local_timeout
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.shared.default_timeout
+        if timeout is not None:
+            if timeout <= 0:
+                self._local_delete(key)
+                return
+            expires = min(expires, now + timeout)
+        pickled = not isinstance(value, IMMUTABLE)
+        if pickled:
+            value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._entries[key] = (value, expires, pickled)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def _local_delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def _shared_get_many(self, keys, version):
+        """{ключ: (значение, оставшееся время жизни или None)} для
+        найденных в общем кеше ключей."""
+        shared = self.shared
+        if not hasattr(shared, 'get_with_timeout'):
+            return {
+                key: (value, None)
+                for key, value in shared.get_many(
+                    keys, version=version).items()
+            }
+        found = {}
+        for key in keys:
+            value, timeout = shared.get_with_timeout(
+                key, _MISSING, version=version)
+            if value is not _MISSING:
+                found[key] = (value, timeout)
+        return found
+
+    # Журнал изменений.
+
+    def _publish(self, keys):
+        """Записывает изменённые ключи в журнал."""
+        shared = self.shared
+        try:
+            last = shared.incr(SEQUENCE_KEY, len(keys))
+        except ValueError:
+            if not shared.add(SEQUENCE_KEY, len(keys), timeout=None):
+                last = shared.incr(SEQUENCE_KEY, len(keys))
+            else:
+                last = len(keys)
+        first = last - len(keys) + 1
+        shared.set_many({
+            self._journal_key(number): (number, key)
+            for number, key in zip(range(first, last + 1), keys)
+        }, timeout=self.journal_timeout)
+        with self._lock:
+            # Между прошлой синхронизацией и этой записью журнал никто
+            # не дополнял: свои изменения применять незачем.
+            if self._sequence == first - 1:
+                self._sequence = last
+
+    def _journal_key(self, number):
+        return JOURNAL_KEY.format(number % self.journal_size)
+
+    def _sync(self):
+        now = time.monotonic()
+        if now - self._synced < self.sync_interval:
+            return
+        self._synced = now
+        shared = self.shared
+        sequence = shared.get(SEQUENCE_KEY, 0)
+        with self._lock:
+            seen = self._sequence
+            if seen is None or sequence == seen:
+                self._sequence = sequence
+                return
+        if not seen < sequence <= seen + self.journal_size:
+            self._reset(sequence)
+            return
+        numbers = range(seen + 1, sequence + 1)
+        journal = shared.get_many(
+            [self._journal_key(number) for number in numbers])
+        changed = []
+        for number in numbers:
+            entry = journal.get(self._journal_key(number))
+            if entry is None or entry[0] != number or entry[1] == CLEARED:
+                self._reset(sequence)
+                return
+            changed.append(entry[1])
+        with self._lock:
+            for key in changed:
+                self._entries.pop(key, None)
+            self._sequence = max(self._sequence, sequence)
+        self.counters['invalidations'] += len(changed)
+
+    def _reset(self, sequence):
+        with self._lock:
+            self._entries.clear()
+            self._sequence = sequence
+        self.counters['resets'] += 1
+
+    # API кеша.
+
+    def get(self, key, default=None, version=None):
+        self._sync()
+        local_key = self._key(key, version)
+        now = time.monotonic()
+        value = self._local_get(local_key, now)
+        if value is not _MISSING:
+            self.counters['near_hits'] += 1
+            return value
+        self.counters['near_misses'] += 1
+        found = self._shared_get_many([key], version)
+        if key not in found:
+            self.counters['shared_misses'] += 1
+            return default
+        self.counters['shared_hits'] += 1
+        value, timeout = found[key]
+        self._local_set(local_key, value, timeout, now)
+        return value
+
+    def get_many(self, keys, version=None):
+        self._sync()
+        now = time.monotonic()
+        found = {}
+        missing = {}
+        for key in keys:
+            local_key = self._key(key, version)
+            value = self._local_get(local_key, now)
+            if value is _MISSING:
+                missing[key] = local_key
+            else:
+                found[key] = value
+        self.counters['near_hits'] += len(found)
+        self.counters['near_misses'] += len(missing)
+        if missing:
+            values = self._shared_get_many(missing, version)
+            self.counters['shared_hits'] += len(values)
+            self.counters['shared_misses'] += len(missing) - len(values)
+            for key, (value, timeout) in values.items():
+                self._local_set(missing[key], value, timeout, now)
+                found[key] = value
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self._key(key, version)
+        self.shared.set(key, value, timeout, version=version)
+        self._publish([local_key])
+        self._local_set(local_key, value, timeout, time.monotonic())
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version=version)
+        local_keys = {key: self._key(key, version) for key in data}
+        self._publish(list(local_keys.values()))
+        now = time.monotonic()
+        for key, value in data.items():
+            if key not in failed:
+                self._local_set(local_keys[key], value, timeout, now)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self._key(key, version)
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self._local_delete(local_key)
+            self._publish([local_key])
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        local_key = self._key(key, version)
+        self.shared.delete(key, version=version)
+        self._local_delete(local_key)
+        self._publish([local_key])
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.shared.delete_many(keys, version=version)
+        local_keys = [self._key(key, version) for key in keys]
+        for local_key in local_keys:
+            self._local_delete(local_key)
+        if local_keys:
+            self._publish(local_keys)
+
+    def has_key(self, key, version=None):
+        self._sync()
+        value = self._local_get(self._key(key, version), time.monotonic())
+        return (value is not _MISSING
+                or self.shared.has_key(key, version=version))
+
+    def incr(self, key, delta=1, version=None):
+        local_key = self._key(key, version)
+        value = self.shared.incr(key, delta, version=version)
+        self._local_delete(local_key)
+        self._publish([local_key])
+        return value
+
+    def clear(self):
+        # Номер журнала продолжается после очистки: иначе процесс, уже
+        # видевший такой же номер, не заметил бы записи об очистке.
+        sequence = self.shared.get(SEQUENCE_KEY, 0)
+        self.shared.clear()
+        self.shared.add(SEQUENCE_KEY, sequence, timeout=None)
+        with self._lock:
+            self._entries.clear()
+        self._publish([CLEARED])
+
+    def close(self, **kwargs):
+        # Общий кеш закрывается обработчиком Django под своим алиасом.
+        pass
+
+    def stats(self):
+        """Попадания на обоих уровнях в этом процессе и состояние
+        общего кеша."""
+        counters = self.counters
+        result = {
+            'pid': os.getpid(),
+            'near': tier_stats(
+                counters['near_hits'], counters['near_misses']),
+            'shared': tier_stats(
+                counters['shared_hits'], counters['shared_misses']),
+            'invalidations': counters['invalidations'],
+            'resets': counters['resets'],
+        }
+        result['near']['entries'] = len(self._entries)
+        if hasattr(self.shared, 'stats'):
+            result['shared'].update(self.shared.stats())
+        return result
+
+
+_MISSING = object()
+
+
+def tier_stats(hits, misses):
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else None,
+    }
+
+
+# Счётчики и статистика по пространствам имён ключей.
+
+def namespace(key):
+    """Пространство имён ключа: имя фрагмента ``{% cache %}`` для
+    template.cache.*, sessions и sorl-thumbnail для их ключей, для
+    остальных — часть до первого двоеточия. Блокировки core.cache
+    относятся к отдельному пространству <имя>:lock."""
+    if key.endswith(':lock'):
+        return namespace(key[:-len(':lock')]) + ':lock'
+    if key.startswith('template.cache.'):
+        # template.cache.<фрагмент>.<хеш параметров vary_on>
+        return key.rsplit('.', 1)[0]
+    if key.startswith('django.contrib.sessions.'):
+        return 'sessions'
+    if key.startswith('sorl-thumbnail'):
+        return 'sorl-thumbnail'
+    return key.split(':', 1)[0]
+
+
+def original_key(key):
+    """Ключ без префикса и версии, которые добавляет make_key."""
+    return key.split(':', 2)[-1]
+
+
+# Вытесненные этим процессом записи SQLiteCache по пространствам имён.
+EVICTIONS = Counter()
+
+# Снимки счётчиков рабочих процессов в оборачиваемом кеше:
+# {pid: (время, снимок)}.
+PROCESSES_KEY = 'cachestats:processes'
+
+
+class InstrumentedCache(BaseCache):
+    """Счётчики обращений к кешу с алиасом LOCATION по пространствам имён.
+
+    Для каждого пространства считаются попадания, промахи, записи,
+    удаления и вытеснения. Размер значений измеряется у доли
+    ``SAMPLE_RATE`` записей и попаданий (значение сериализуется ещё раз),
+    по выборке оцениваются прочитанные и записанные байты и собираются
+    ``LARGEST`` самых больших ключей; записи больше ``OVERSIZED`` байт
+    попадают в журнал. Раз в ``PUBLISH_INTERVAL`` секунд процесс
+    сохраняет снимок счётчиков в оборачиваемом кеше, чтобы команда
+    cache_stats и /metrics/ показывали сумму по всем процессам.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.wrapped_alias = location
+        self.sample_rate = float(options.get('SAMPLE_RATE', 0.01))
+        self.oversized = int(options.get('OVERSIZED', 2 ** 20))
+        self.largest_count = int(options.get('LARGEST', 20))
+        self.publish_interval = float(options.get('PUBLISH_INTERVAL', 10))
+        self.counters = defaultdict(Counter)
+        self.largest = {}
+        self._lock = threading.Lock()
+        self._published = time.monotonic()
+
+    @property
+    def wrapped(self):
+        return caches[self.wrapped_alias]
+
+    def _count(self, key, name, amount=1):
+        self.counters[namespace(key)][name] += amount
+        now = time.monotonic()
+        if now - self._published >= self.publish_interval:
+            self._published = now
+            self.publish()
+
+    def _sample(self, key, value, name):
+        if random.random() >= self.sample_rate:
+            return
+        size = len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        counters = self.counters[namespace(key)]
+        counters[f'{name}_sampled'] += 1
+        counters[f'{name}_sampled_bytes'] += size
+        counters['max_size'] = max(counters['max_size'], size)
+        with self._lock:
+            self.largest[key] = size
+            if len(self.largest) > self.largest_count:
+                del self.largest[min(self.largest, key=self.largest.get)]
+        if size > self.oversized:
+            logger.warning('Запись кеша %s занимает %d байт', key, size)
+
+    def _hit(self, key, value):
+        self._count(key, 'hits')
+        self._sample(key, value, 'read')
+
+    def _write(self, key, value):
+        self._count(key, 'sets')
+        self._sample(key, value, 'write')
+
+    # API кеша.
+
+    def get(self, key, default=None, version=None):
+        value = self.wrapped.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            self._count(key, 'misses')
+            return default
+        self._hit(key, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        values = self.wrapped.get_many(keys, version=version)
+        for key in keys:
+            if key in values:
+                self._hit(key, values[key])
+            else:
+                self._count(key, 'misses')
+        return values
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.wrapped.set(key, value, timeout, version=version)
+        self._write(key, value)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.wrapped.set_many(data, timeout, version=version)
+        for key, value in data.items():
+            if key not in failed:
+                self._write(key, value)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.wrapped.add(key, value, timeout, version=version)
+        if added:
+            self._write(key, value)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.wrapped.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self.wrapped.delete(key, version=version)
+        self._count(key, 'deletes')
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.wrapped.delete_many(keys, version=version)
+        for key in keys:
+            self._count(key, 'deletes')
+
+    def has_key(self, key, version=None):
+        return self.wrapped.has_key(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        value = self.wrapped.incr(key, delta, version=version)
+        self._count(key, 'sets')
+        return value
+
+    def clear(self):
+        self.wrapped.clear()
+
+    def close(self, **kwargs):
+        pass
+
+    # Статистика.
+
+    def snapshot(self):
+        with self._lock:
+            largest = dict(self.largest)
+        return {
+            'namespaces': {
+                name: dict(counters)
+                for name, counters in list(self.counters.items())
+            },
+            'evictions': dict(EVICTIONS),
+            'largest': largest,
+        }
+
+    def publish(self):
+        """Сохраняет снимок счётчиков процесса в оборачиваемом кеше."""
+        wrapped = self.wrapped
+        lock = f'{PROCESSES_KEY}:lock'
+        if not wrapped.add(lock, True, 5):
+            return False
+        try:
+            now = time.time()
+            # Снимки остановленных процессов со временем выбрасываются.
+            stale = now - 6 * self.publish_interval
+            processes = {
+                pid: entry
+                for pid, entry in wrapped.get(PROCESSES_KEY, {}).items()
+                if entry[0] >= stale
+            }
+            processes[os.getpid()] = (now, self.snapshot())
+            wrapped.set(PROCESSES_KEY, processes, None)
+        finally:
+            wrapped.delete(lock)
+        return True
+
+    def published(self):
+        """Снимки всех процессов, для текущего — свежий."""
+        processes = {
+            pid: snapshot
+            for pid, (_, snapshot)
+            in self.wrapped.get(PROCESSES_KEY, {}).items()
+        }
+        processes[os.getpid()] = self.snapshot()
+        return processes
+
+    def stats(self):
+        """Счётчики по пространствам имён в этом процессе и сумма по
+        всем процессам, сохранившим снимки."""
+        processes = self.published()
+        return {
+            'pid': os.getpid(),
+            'process': summarize(processes[os.getpid()], self.largest_count),
+            'all': summarize(
+                merge(processes.values()), self.largest_count),
+            'processes': sorted(processes),
+        }
+
+
+def merge(snapshots):
+    """Складывает снимки счётчиков нескольких процессов."""
+    result = {
+        'namespaces': defaultdict(Counter),
+        'evictions': Counter(),
+        'largest': {},
+    }
+    for snapshot in snapshots:
+        for name, counters in snapshot['namespaces'].items():
+            total = result['namespaces'][name]
+            max_size = max(total['max_size'], counters.get('max_size', 0))
+            total.update(counters)
+            total['max_size'] = max_size
+        result['evictions'].update(snapshot['evictions'])
+        for key, size in snapshot['largest'].items():
+            result['largest'][key] = max(size, result['largest'].get(key, 0))
+    return result
+
+
+def average(counters, name):
+    sampled = counters.get(f'{name}_sampled', 0)
+    if not sampled:
+        return None
+    return counters[f'{name}_sampled_bytes'] / sampled
+
+
+def summarize(snapshot, largest=20):
+    """Сводка снимка: по пространствам имён и самые большие ключи.
+
+    Прочитанные и записанные байты оцениваются по среднему размеру
+    значений в выборке.
+    """
+    names = set(snapshot['namespaces']) | set(snapshot['evictions'])
+    namespaces = {}
+    for name in sorted(names):
+        counters = snapshot['namespaces'].get(name, {})
+        read = average(counters, 'read')
+        written = average(counters, 'write')
+        hits = counters.get('hits', 0)
+        sets = counters.get('sets', 0)
+        row = tier_stats(hits, counters.get('misses', 0))
+        row.update({
+            'sets': sets,
+            'deletes': counters.get('deletes', 0),
+            'evictions': snapshot['evictions'].get(name, 0),
+            'bytes_read': round(read * hits) if read else None,
+            'bytes_written': round(written * sets) if written else None,
+            'max_size': counters.get('max_size') or None,
+        })
+        namespaces[name] = row
+    top = sorted(
+        snapshot['largest'].items(), key=lambda item: item[1], reverse=True)
+    return {
+        'namespaces': namespaces,
+        'largest': [
+            {'key': key, 'size': size} for key, size in top[:largest]],
+    }
@@ -0,0 +1,185 @@
+"""Прогрев кеша страниц после выкладки или очистки кеша.
+
+Пустой кеш отдаёт первые запросы к самым посещаемым страницам базе
+целиком: все процессы разом строят одни и те же ленты и карточки.
+Прогрев заранее запрашивает первые страницы главной, страницы самых
+больших групп и профили авторов с наибольшим числом подписчиков через
+WSGI-приложение, так что заполняются все уровни сразу: кеш страниц,
+компактные ленты, карточки постов и результаты запросов.
+
+Популярность группы оценивается числом постов, а профиля — числом
+подписчиков. Просмотры (PostViewCount) считаются только у страниц
+отдельных постов, а не у лент групп и профилей, которые прогреваются
+здесь; оценки популярного (TrendingScore) затухают за часы и отражают
+всплески, а не постоянную посещаемость, и без TRENDING_ENABLED пусты.
+
+Запросы выполняются в нескольких потоках, не больше ``workers``
+одновременно. Команда ``warm_cache`` прогревает кеш один раз;
+``Scheduler`` повторяет прогрев в фоне рабочего процесса каждые
+``CACHE_WARMING_INTERVAL`` секунд, и из всех процессов сервера за
+интервал его выполняет только один.
+"""
+import logging
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.db.models import Count
+from django.urls import reverse
+
+from .benchmark import WSGIClient
+from .cache import acquire
+from .warmup import request_host
+
+logger = logging.getLogger('yatube.cachewarm')
+
+LOCK_KEY = 'cachewarm:scheduler'
+
+Result = namedtuple('Result', 'path status duration_ms')
+
+
+def index_paths(pages):
+    path = reverse('posts:index')
+    return [path] + [f'{path}?page={number}' for number in range(2, pages + 1)]
+
+
+def group_paths(limit):
+    from posts.models import Group
+
+    groups = Group.objects.annotate(total=Count('posts')).order_by(
+        '-total', 'pk').values_list('slug', flat=True)[:limit]
+    return [reverse('posts:group_list', args=(slug,)) for slug in groups]
+
+
+def profile_paths(limit):
+    authors = get_user_model().objects.annotate(
+        followers=Count('following', distinct=True),
+        total=Count('posts', distinct=True),
+    ).filter(total__gt=0).order_by(
+        '-followers', '-total', 'pk').values_list('username', flat=True)
+    return [
+        reverse('posts:profile', args=(username,))
+        for username in authors[:limit]
+    ]
+
+
+def targets(pages, groups, profiles):
+    """Адреса для прогрева, от самых посещаемых."""
+    return index_paths(pages) + group_paths(groups) + profile_paths(profiles)
+
+
+def fetch(client, paths):
+    results = []
+    for path in paths:
+        started = time.perf_counter()
+        try:
+            status, _ = client.get(path)
+        except Exception:
+            logger.exception('Не удалось прогреть %s', path)
+            status = None
+        results.append(Result(
+            path, status, round((time.perf_counter() - started) * 1000, 1)))
+    return results
+
+
+def warm(paths, application=None, workers=1, host=None):
+    """Запрашивает paths не больше чем в workers потоков одновременно.
+
+    Ключ кеша страниц включает адрес целиком, поэтому host должен быть
+    тем, под которым сайт открывают читатели (CACHE_WARMING_HOST).
+    Каждый поток обходит свою часть адресов и по завершении закрывает
+    свои соединения с базой. С одним потоком запросы выполняются в
+    текущем.
+    """
+    host = host or settings.CACHE_WARMING_HOST or request_host()
+    client = WSGIClient(application, host=host)
+    workers = max(1, min(workers, len(paths)))
+    if workers == 1:
+        return fetch(client, paths)
+    chunks = [paths[number::workers] for number in range(workers)]
+    results = [None] * workers
+
+    def work(number):
+        try:
+            results[number] = fetch(client, chunks[number])
+        finally:
+            connections.close_all()
+
+    threads = [
+        threading.Thread(target=work, args=(number,))
+        for number in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    by_path = {
+        result.path: result for chunk in results for result in chunk}
+    return [by_path[path] for path in paths]
+
+
+def warm_cache(application=None, pages=None, groups=None, profiles=None,
+               workers=None, host=None):
+    """Прогревает кеш с параметрами из настроек CACHE_WARMING_*."""
+    results = warm(
+        targets(
+            settings.CACHE_WARMING_PAGES if pages is None else pages,
+            settings.CACHE_WARMING_GROUPS if groups is None else groups,
+            settings.CACHE_WARMING_PROFILES if profiles is None else profiles,
+        ),
+        application,
+        settings.CACHE_WARMING_WORKERS if workers is None else workers,
+        host,
+    )
+    failed = [result.path for result in results if result.status != 200]
+    logger.info(
+        'Прогрев кеша: %d страниц, %.1f мс, ошибок: %d',
+        len(results), sum(result.duration_ms for result in results),
+        len(failed))
+    return results
+
+
+class Scheduler(threading.Thread):
+    """Фоновый поток, прогревающий кеш каждые interval секунд.
+
+    Перед прогревом берёт блокировку в общем кеше на interval секунд и
+    не снимает её: соседние процессы пропускают этот интервал.
+    """
+
+    def __init__(self, application, interval):
+        super().__init__(name='cache-warming', daemon=True)
+        self.application = application
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.tick()
+
+    def tick(self):
+        if not acquire(LOCK_KEY, self.interval):
+            return False
+        try:
+            warm_cache(self.application)
+        except Exception:
+            logger.exception('Прогрев кеша не выполнен')
+        finally:
+            connections.close_all()
+        return True
+
+    def stop(self):
+        self.stopped.set()
+
+
+def start_scheduler(application, interval=None):
+    """Запускает Scheduler, если интервал задан; иначе возвращает None."""
+    if interval is None:
+        interval = settings.CACHE_WARMING_INTERVAL
+    if not interval:
+        return None
+    scheduler = Scheduler(application, interval)
+    scheduler.start()
+    return scheduler
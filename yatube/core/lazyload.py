@@ -0,0 +1,114 @@
+"""Поиск ленивых загрузок связанных объектов в циклах.
+
+Обращение к незагруженной связи (``comment.author`` без ``select_related``)
+стоит отдельного SQL-запроса. Один раз это незаметно, но в цикле шаблона
+превращается в N+1. Детектор подменяет дескрипторы связей у выбранных
+моделей и считает ленивые загрузки в пределах запроса по месту вызова:
+повторная загрузка той же связи из той же строки шаблона или кода
+означает цикл. В зависимости от ``settings.LAZY_RELATIONS`` такое место
+записывается в журнал (``'log'``) или вызывает ``LazyRelationError``
+(``'raise'``).
+"""
+import copy
+import logging
+import os
+import sys
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.db.models.fields.related_descriptors import (
+    ForwardManyToOneDescriptor, ReverseManyToOneDescriptor
+)
+from django.template.base import Node
+
+logger = logging.getLogger('yatube.lazyload')
+
+_local = threading.local()
+
+# Механизм prefetch_related сам обращается к менеджерам обратных связей
+# до того, как положит в них загруженные объекты.
+PREFETCH_FRAMES = {'get_prefetcher', 'prefetch_one_level'}
+
+
+class LazyRelationError(Exception):
+    pass
+
+
+def start(**kwargs):
+    _local.sites = Counter()
+
+
+def stop(**kwargs):
+    _local.sites = None
+
+
+def call_site():
+    """Строка шаблона или кода проекта, откуда пришло обращение."""
+    frame = sys._getframe(2)
+    fallback = None
+    while frame is not None:
+        node = frame.f_locals.get('self')
+        if (frame.f_code.co_name == 'render_annotated'
+                and isinstance(node, Node)):
+            return f'{node.origin.template_name}:{node.token.lineno}'
+        filename = frame.f_code.co_filename
+        if (fallback is None and filename.startswith(settings.BASE_DIR)
+                and filename != __file__
+                and f'{os.sep}site-packages{os.sep}' not in filename):
+            fallback = f'{filename}:{frame.f_lineno}'
+        frame = frame.f_back
+    return fallback or 'неизвестно'
+
+
+def lazy_access(instance, name):
+    sites = getattr(_local, 'sites', None)
+    mode = getattr(settings, 'LAZY_RELATIONS', None)
+    if sites is None or not mode:
+        return
+    site = call_site()
+    key = (instance._meta.label, name, site)
+    sites[key] += 1
+    if sites[key] != 2:
+        return
+    message = (f'Связь {instance._meta.label}.{name} загружается лениво '
+               f'в цикле: {site}')
+    if mode == 'raise':
+        raise LazyRelationError(message)
+    logger.warning(message)
+
+
+class WatchedForwardDescriptor(ForwardManyToOneDescriptor):
+    def __get__(self, instance, cls=None):
+        if (instance is not None and not self.field.is_cached(instance)
+                and getattr(instance, self.field.attname) is not None):
+            lazy_access(instance, self.field.name)
+        return super().__get__(instance, cls)
+
+
+class WatchedReverseDescriptor(ReverseManyToOneDescriptor):
+    def __get__(self, instance, cls=None):
+        if (instance is not None
+                and sys._getframe(1).f_code.co_name not in PREFETCH_FRAMES):
+            prefetched = getattr(instance, '_prefetched_objects_cache', {})
+            if self.rel.get_cache_name() not in prefetched:
+                lazy_access(instance, self.rel.get_accessor_name())
+        return super().__get__(instance, cls)
+
+
+def watch(*models):
+    """Подменяет дескрипторы прямых и обратных связей у моделей."""
+    for model in models:
+        for name, descriptor in list(vars(model).items()):
+            if type(descriptor) is ForwardManyToOneDescriptor:
+                watched = WatchedForwardDescriptor
+            elif type(descriptor) is ReverseManyToOneDescriptor:
+                watched = WatchedReverseDescriptor
+            else:
+                continue
+            descriptor = copy.copy(descriptor)
+            descriptor.__class__ = watched
+            setattr(model, name, descriptor)
+    request_started.connect(start, dispatch_uid='lazyload_start')
+    request_finished.connect(stop, dispatch_uid='lazyload_stop')
@@ -0,0 +1,109 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from core.benchmark import measure, summarize
+from core.cache_backends import SQLiteCache
+
+BACKENDS = ('locmem', 'filebased', 'sqlite')
+
+OPERATIONS = ('get_hit', 'get_miss', 'set', 'add', 'incr')
+
+
+def make_backend(name, directory, max_entries, max_size):
+    params = {
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': max_entries, 'MAX_SIZE': max_size},
+    }
+    if name == 'locmem':
+        return LocMemCache('benchmark', params)
+    if name == 'filebased':
+        return FileBasedCache(os.path.join(directory, 'filebased'), params)
+    return SQLiteCache(os.path.join(directory, 'cache.sqlite3'), params)
+
+
+def operations(backend, keys, value):
+    """Вызовы для измерения: каждый берёт следующий ключ по кругу."""
+    position = {'index': 0}
+
+    def key():
+        position['index'] = (position['index'] + 1) % len(keys)
+        return keys[position['index']]
+
+    backend.set('counter', 0)
+    return {
+        'get_hit': lambda: backend.get(key()),
+        'get_miss': lambda: backend.get('missing:' + key()),
+        'set': lambda: backend.set(key(), value),
+        'add': lambda: backend.add('added:' + key(), value),
+        'incr': lambda: backend.incr('counter'),
+    }
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает LocMemCache, файловый кеш Django и общий кеш '
+            'SQLite на чтении, записи и инкременте значений разного '
+            'размера.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backends', default=','.join(BACKENDS),
+            help='Бэкенды через запятую: ' + ', '.join(BACKENDS) + '.'
+        )
+        parser.add_argument(
+            '--sizes', default='100,10000,100000',
+            help='Размеры значений в байтах через запятую.'
+        )
+        parser.add_argument('--keys', type=int, default=1000)
+        parser.add_argument('--iterations', type=int, default=2000)
+        parser.add_argument(
+            '--output', help='Куда записать результаты в формате JSON.'
+        )
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        report = {}
+        for name in options['backends'].split(','):
+            report[name] = {}
+            for size in sizes:
+                report[name][size] = self.run(name, size, options)
+                self.print_result(name, size, report[name][size])
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2, ensure_ascii=False)
+
+    @staticmethod
+    def run(name, size, options):
+        directory = tempfile.mkdtemp(prefix='yatube-cache-')
+        try:
+            keys = [f'key:{index}' for index in range(options['keys'])]
+            # Места хватает на все ключи: измеряется работа с кешем,
+            # а не вытеснение.
+            backend = make_backend(
+                name, directory, len(keys) * 4, len(keys) * size * 4)
+            value = os.urandom(size)
+            for key in keys:
+                backend.set(key, value)
+            calls = operations(backend, keys, value)
+            result = {
+                operation: summarize(measure(
+                    calls[operation], options['iterations'],
+                    warmup=len(keys)))
+                for operation in OPERATIONS
+            }
+            backend.close()
+            return result
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def print_result(self, name, size, result):
+        self.stdout.write(self.style.SQL_KEYWORD(f'{name}: {size} байт'))
+        for operation, timings in result.items():
+            self.stdout.write(
+                f'  {operation:<10} {timings["p50_ms"]:>9.3f} ms p50, '
+                f'{timings["p99_ms"]:>9.3f} ms p99')
@@ -0,0 +1,192 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import Counter
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmark import imports_by_owner, parse_importtime, summarize
+
+# Выполняется в отдельном процессе: время считается от начала импорта
+# Django до готового WSGI-приложения (вместе с прогревом, если он
+# включён) и затем для первого и второго запроса к каждому адресу.
+CHILD = '''
+import json, sys, time
+started = time.perf_counter()
+from yatube.wsgi import application
+result = {'startup': time.perf_counter() - started, 'paths': {}}
+from core.benchmark import WSGIClient
+client = WSGIClient(application)
+for path in sys.argv[1:]:
+    timings = []
+    for _ in range(2):
+        started = time.perf_counter()
+        status, _ = client.get(path)
+        timings.append(time.perf_counter() - started)
+    result['paths'][path] = {
+        'status': status, 'first': timings[0], 'second': timings[1]}
+print(json.dumps(result))
+'''
+
+WORKER = 'wsgi'
+
+
+def summarize_imports(runs):
+    """Среднее собственное время импорта в мс по модулям и по
+    приложениям из INSTALLED_APPS (прочие модули — по пакетам)."""
+    packages = [config.name for config in apps.get_app_configs()]
+    packages.append('debug_toolbar')
+    modules = Counter()
+    owners = Counter()
+    for run in runs:
+        for row in run['imports']:
+            modules[row.module] += row.own_us
+        owners.update(imports_by_owner(run['imports'], packages))
+    scale = 1000 * len(runs)
+    return {
+        'total_ms': round(sum(modules.values()) / scale, 3),
+        'apps': {name: round(value / scale, 3)
+                 for name, value in owners.most_common()},
+        'modules': {name: round(value / scale, 3)
+                    for name, value in modules.most_common()},
+    }
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает профили настроек по времени запуска рабочего '
+            'процесса и коротких команд manage.py, задержке первого '
+            'запроса и времени импорта модулей и приложений.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profiles', default='development,production',
+            help='Профили YATUBE_PROFILE через запятую.'
+        )
+        parser.add_argument(
+            '--paths', default='/,/about/author/',
+            help='Адреса для первого запроса через запятую.'
+        )
+        parser.add_argument(
+            '--commands', default='check',
+            help='Команды manage.py через запятую, пустая строка — без них.'
+        )
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument(
+            '--imports', type=int, default=0, metavar='N',
+            help='Запускать с -X importtime и показать N самых дорогих '
+                 'модулей и приложений.'
+        )
+        parser.add_argument(
+            '--database', help='Файл SQLite вместо базы по умолчанию.'
+        )
+        parser.add_argument(
+            '--warmup', action='store_true',
+            help='Запускать процессы с WARMUP_ON_BOOT.'
+        )
+        parser.add_argument(
+            '--output', help='Куда записать результаты в формате JSON.'
+        )
+
+    def handle(self, *args, **options):
+        paths = options['paths'].split(',')
+        targets = [WORKER] + [
+            command for command in options['commands'].split(',') if command
+        ]
+        report = {}
+        for profile in options['profiles'].split(','):
+            report[profile] = {}
+            for target in targets:
+                runs = [self.run(profile, target, paths, options)
+                        for _ in range(options['runs'])]
+                summary = self.summarize(runs, options)
+                report[profile][target] = summary
+                self.print_target(
+                    f'{profile}: {target}', summary, options['imports'])
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2, ensure_ascii=False)
+
+    @staticmethod
+    def environment(profile, options):
+        env = dict(os.environ)
+        env.pop('DEBUG', None)
+        env.update({
+            'YATUBE_PROFILE': profile,
+            'DJANGO_SETTINGS_MODULE': 'yatube.settings',
+            'ALLOWED_HOSTS': 'testserver',
+            'WARMUP_ON_BOOT': '1' if options['warmup'] else '',
+        })
+        env.setdefault('SECRET_KEY', settings.SECRET_KEY)
+        if options['database']:
+            env['DATABASE_PATH'] = os.path.abspath(options['database'])
+        return env
+
+    def run(self, profile, target, paths, options):
+        command = [sys.executable]
+        if options['imports']:
+            command += ['-X', 'importtime']
+        if target == WORKER:
+            command += ['-c', CHILD, *paths]
+        else:
+            command += ['manage.py', *target.split()]
+        started = time.perf_counter()
+        process = subprocess.run(
+            command, cwd=settings.BASE_DIR,
+            env=self.environment(profile, options),
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            universal_newlines=True)
+        elapsed = time.perf_counter() - started
+        if process.returncode:
+            raise CommandError(
+                f'{target} ({profile}) завершился с ошибкой:\n'
+                f'{process.stderr[-2000:]}')
+        result = {'process': elapsed, 'paths': {}}
+        if target == WORKER:
+            result.update(json.loads(process.stdout.strip().splitlines()[-1]))
+        result['imports'] = parse_importtime(process.stderr)
+        return result
+
+    @staticmethod
+    def summarize(runs, options):
+        summary = {'process': summarize([run['process'] for run in runs])}
+        if 'startup' in runs[0]:
+            summary['startup'] = summarize([run['startup'] for run in runs])
+        summary['paths'] = {}
+        for path in runs[0]['paths']:
+            results = [run['paths'][path] for run in runs]
+            summary['paths'][path] = {
+                'status': results[-1]['status'],
+                'first': summarize([result['first'] for result in results]),
+                'second': summarize(
+                    [result['second'] for result in results]),
+            }
+        if options['imports']:
+            summary['imports'] = summarize_imports(runs)
+        return summary
+
+    def print_target(self, title, summary, limit):
+        self.stdout.write(self.style.SQL_KEYWORD(title))
+        self.stdout.write(
+            f'  {"процесс":<30} {summary["process"]["p50_ms"]:>9.1f} ms')
+        if 'startup' in summary:
+            self.stdout.write(
+                f'  {"запуск Django":<30} '
+                f'{summary["startup"]["p50_ms"]:>9.1f} ms')
+        for path, result in summary['paths'].items():
+            self.stdout.write(
+                f'  {path:<30} {result["first"]["p50_ms"]:>9.1f} ms '
+                f'первый, {result["second"]["p50_ms"]:>7.1f} ms второй '
+                f'[{result["status"]}]')
+        if 'imports' not in summary:
+            return
+        imports = summary['imports']
+        self.stdout.write(
+            f'  {"импорт всего":<30} {imports["total_ms"]:>9.1f} ms')
+        for group in ('apps', 'modules'):
+            self.stdout.write(f'  {group}:')
+            for name, value in list(imports[group].items())[:limit]:
+                self.stdout.write(f'    {name:<40} {value:>9.1f} ms')
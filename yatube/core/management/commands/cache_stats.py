@@ -0,0 +1,127 @@
+import json
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+
+from core.cache_backends import (
+    InstrumentedCache, merge, namespace, summarize
+)
+
+
+def key_space(backend, sample=None, top=20):
+    """Записи и байты по пространствам имён в хранилище backend.
+
+    При выборке из sample записей числа пересчитываются на все записи
+    хранилища.
+    """
+    rows = list(backend.scan(sample))
+    scale = 1
+    if sample is not None and rows:
+        scale = max(backend.stats()['entries'], len(rows)) / len(rows)
+    namespaces = defaultdict(lambda: {'entries': 0, 'size': 0, 'max_size': 0})
+    for key, length in rows:
+        row = namespaces[namespace(key)]
+        row['entries'] += 1
+        row['size'] += length
+        row['max_size'] = max(row['max_size'], length)
+    for row in namespaces.values():
+        row['entries'] = round(row['entries'] * scale)
+        row['size'] = round(row['size'] * scale)
+    largest = sorted(rows, key=lambda row: row[1], reverse=True)[:top]
+    return {
+        'sampled': len(rows),
+        'namespaces': dict(sorted(
+            namespaces.items(), key=lambda item: item[1]['size'],
+            reverse=True)),
+        'largest': [
+            {'key': key, 'size': length} for key, length in largest],
+    }
+
+
+def size(value):
+    if value is None:
+        return '-'
+    for unit in ('Б', 'КБ', 'МБ'):
+        if value < 1024:
+            return f'{value:.0f} {unit}'
+        value /= 1024
+    return f'{value:.1f} ГБ'
+
+
+class Command(BaseCommand):
+    help = ('Статистика кеша по пространствам имён ключей: попадания, '
+            'промахи, записи и вытеснения во всех рабочих процессах, '
+            'число и размер записей в хранилище, самые большие записи.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--alias', default='default')
+        parser.add_argument(
+            '--sample', type=int, default=1000,
+            help='Сколько случайных записей хранилища измерить; 0 — все.'
+        )
+        parser.add_argument('--top', type=int, default=20)
+        parser.add_argument(
+            '--json', action='store_true', help='Вывести сводку в JSON.'
+        )
+
+    def handle(self, *args, **options):
+        if options['alias'] not in settings.CACHES:
+            raise CommandError(f'Кеша {options["alias"]} нет в CACHES.')
+        cache = caches[options['alias']]
+        report = {'counters': None, 'storage': {}}
+        if isinstance(cache, InstrumentedCache):
+            report['counters'] = summarize(
+                merge(cache.published().values()), options['top'])
+        sample = options['sample'] or None
+        for alias in settings.CACHES:
+            if hasattr(caches[alias], 'scan'):
+                report['storage'][alias] = key_space(
+                    caches[alias], sample, options['top'])
+        if options['json']:
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+            return
+        if report['counters'] is None:
+            self.stdout.write(
+                f'Кеш {options["alias"]} не обёрнут в InstrumentedCache: '
+                f'счётчиков обращений нет.')
+        else:
+            self.write_counters(report['counters'])
+        for alias, storage in report['storage'].items():
+            self.write_storage(alias, storage)
+
+    def write_counters(self, counters):
+        self.stdout.write(self.style.SQL_KEYWORD(
+            f'{"попаданий":>10} {"промахов":>10} {"доля":>6} '
+            f'{"записей":>9} {"вытеснено":>10} {"прочитано":>11} '
+            f'{"записано":>11}  пространство'))
+        for name, row in counters['namespaces'].items():
+            ratio = row['hit_ratio']
+            self.stdout.write(
+                f'{row["hits"]:>10} {row["misses"]:>10} '
+                f'{"-" if ratio is None else f"{ratio:.2f}":>6} '
+                f'{row["sets"]:>9} {row["evictions"]:>10} '
+                f'{size(row["bytes_read"]):>11} '
+                f'{size(row["bytes_written"]):>11}  {name}')
+        self.write_largest(counters['largest'])
+
+    def write_storage(self, alias, storage):
+        self.stdout.write('')
+        self.stdout.write(self.style.SQL_KEYWORD(
+            f'Хранилище {alias}, измерено записей: {storage["sampled"]}'))
+        self.stdout.write(self.style.SQL_KEYWORD(
+            f'{"записей":>9} {"размер":>11} {"наибольшая":>11}  '
+            f'пространство'))
+        for name, row in storage['namespaces'].items():
+            self.stdout.write(
+                f'{row["entries"]:>9} {size(row["size"]):>11} '
+                f'{size(row["max_size"]):>11}  {name}')
+        self.write_largest(storage['largest'])
+
+    def write_largest(self, largest):
+        if not largest:
+            return
+        self.stdout.write(self.style.SQL_KEYWORD('Самые большие записи:'))
+        for row in largest:
+            self.stdout.write(f'{size(row["size"]):>11}  {row["key"]}')
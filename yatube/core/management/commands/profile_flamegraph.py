@@ -0,0 +1,126 @@
+import glob
+import os
+import pstats
+import sys
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+@lru_cache(maxsize=None)
+def frame_label(func):
+    """Читаемое имя кадра: функция и путь внутри проекта или пакета."""
+    filename, lineno, name = func
+    if filename == '~':
+        return name.replace(';', ',')
+    for prefix in [settings.BASE_DIR] + sys.path[::-1]:
+        if prefix and filename.startswith(prefix + os.sep):
+            filename = os.path.relpath(filename, prefix)
+            break
+    return f'{name} ({filename}:{lineno})'.replace(';', ',')
+
+
+def call_graph(stats):
+    """Вызываемые функции с временем на ребре и корни графа вызовов."""
+    callees = defaultdict(list)
+    roots = []
+    for func, (_, _, _, _, callers) in stats.items():
+        if not callers:
+            roots.append(func)
+        for caller, edge in callers.items():
+            callees[caller].append((func, edge[3]))
+    # У входа в цепочку middleware из-за рекурсии вызывающие есть всегда,
+    # поэтому корнем считается и самая дорогая функция профиля.
+    top = max(stats, key=lambda func: stats[func][3])
+    if sum(stats[root][3] for root in roots) < stats[top][3]:
+        roots.append(top)
+    return callees, roots
+
+
+def collapse(stats, min_time):
+    """Восстанавливает стеки вызовов из графа pstats.
+
+    pstats хранит только пары «вызывающий — вызываемый» с суммарным
+    временем, поэтому время вызываемой функции делится между вызывающими
+    пропорционально времени на каждом ребре графа. Поддерево стеков каждой
+    функции строится один раз и затем масштабируется, так что разбор
+    остаётся быстрым даже на объединении тысяч профилей. Повторный вход в
+    функцию, уже стоящую в стеке, не разворачивается: рекурсия (цепочка
+    middleware, вложенные узлы шаблонов) схлопывается в один уровень.
+    Стеки дешевле min_time секунд отбрасываются.
+    """
+    callees, roots = call_graph(stats)
+    subtrees = {}
+    active = set()
+
+    def subtree(func):
+        """Стеки под func, в секундах от полного времени func."""
+        if func in subtrees:
+            return subtrees[func]
+        active.add(func)
+        _, _, own, _, _ = stats[func]
+        label = (frame_label(func),)
+        result = defaultdict(float)
+        if own >= min_time:
+            result[label] += own
+        for child, edge_time in callees[func]:
+            child_total = stats[child][3]
+            if child in active or edge_time < min_time or child_total <= 0:
+                continue
+            scale = min(edge_time / child_total, 1)
+            for stack, seconds in subtree(child).items():
+                if seconds * scale >= min_time:
+                    result[label + stack] += seconds * scale
+        active.discard(func)
+        subtrees[func] = result
+        return result
+
+    stacks = defaultdict(float)
+    for root in roots:
+        for stack, seconds in subtree(root).items():
+            stacks[';'.join(stack)] += seconds
+    return stacks
+
+
+class Command(BaseCommand):
+    help = ('Объединяет сохранённые профили запросов в формат свёрнутых '
+            'стеков для построения flamegraph.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'views', nargs='*',
+            help='Имена view, например posts:profile. По умолчанию — все.'
+        )
+        parser.add_argument('--dir', default=settings.PROFILING_DIR)
+        parser.add_argument(
+            '--output', help='Файл для результата, по умолчанию stdout.'
+        )
+        parser.add_argument(
+            '--min-us', type=float, default=10,
+            help='Не выводить стеки дешевле заданного числа микросекунд.'
+        )
+
+    def handle(self, *args, **options):
+        views = [view.replace(':', '.') for view in options['views']] or ['*']
+        files = []
+        for view in views:
+            files.extend(glob.glob(
+                os.path.join(options['dir'], view, '*.prof')))
+        if not files:
+            raise CommandError('Профили не найдены.')
+        stats = pstats.Stats(*sorted(files)).stats
+        stacks = collapse(stats, options['min_us'] / 10 ** 6)
+        lines = [
+            f'{stack} {round(seconds * 10 ** 6)}'
+            for stack, seconds in sorted(stacks.items())
+        ]
+        output = '\n'.join(lines) + '\n'
+        if options['output']:
+            with open(options['output'], 'w') as destination:
+                destination.write(output)
+        else:
+            self.stdout.write(output, ending='')
+        self.stderr.write(
+            f'Профилей: {len(files)}, стеков: {len(lines)}')
@@ -0,0 +1,67 @@
+import json
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def group_entries(entries):
+    """Группирует записи журнала по отпечатку SQL."""
+    groups = {}
+    for entry in entries:
+        group = groups.setdefault(entry['fingerprint'], {
+            'fingerprint': entry['fingerprint'],
+            'sql': entry['sql'],
+            'count': 0,
+            'total_ms': 0,
+            'max_ms': 0,
+            'views': Counter(),
+        })
+        group['count'] += 1
+        group['total_ms'] += entry['duration_ms']
+        group['max_ms'] = max(group['max_ms'], entry['duration_ms'])
+        group['views'][entry['view'] or '-'] += 1
+        group['plan'] = entry['plan']
+    return sorted(
+        groups.values(), key=lambda group: group['total_ms'], reverse=True)
+
+
+class Command(BaseCommand):
+    help = ('Сводка журнала медленных запросов: число, суммарное и '
+            'максимальное время по каждому отпечатку SQL.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=settings.SLOW_QUERY_LOG)
+        parser.add_argument(
+            '--view', help='Учитывать только запросы этого view.'
+        )
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument(
+            '--json', action='store_true', help='Вывести сводку в JSON.'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['file']) as log:
+                entries = [json.loads(line) for line in log if line.strip()]
+        except FileNotFoundError:
+            raise CommandError(f'Журнал {options["file"]} не найден.')
+        if options['view']:
+            entries = [entry for entry in entries
+                       if entry['view'] == options['view']]
+        groups = group_entries(entries)[:options['limit']]
+        if options['json']:
+            self.stdout.write(json.dumps(groups, ensure_ascii=False, indent=2))
+            return
+        for group in groups:
+            views = ', '.join(
+                f'{view} ×{count}'
+                for view, count in group['views'].most_common())
+            self.stdout.write(self.style.SQL_KEYWORD(
+                f'{group["fingerprint"]}  {group["count"]} раз, '
+                f'всего {group["total_ms"]:.1f} мс, '
+                f'максимум {group["max_ms"]:.1f} мс'))
+            self.stdout.write(f'  view: {views}')
+            self.stdout.write(f'  {group["sql"]}')
+            for row in group['plan']:
+                self.stdout.write(f'    {row}')
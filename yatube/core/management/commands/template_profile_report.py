@@ -0,0 +1,61 @@
+import json
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+COLUMNS = ('own_ms', 'total_ms', 'calls')
+
+
+def aggregate(entries):
+    """Суммирует профили запросов по меткам шаблонов, тегов и фильтров."""
+    totals = defaultdict(lambda: {
+        'requests': 0, 'calls': 0, 'total_ms': 0, 'own_ms': 0})
+    for entry in entries:
+        for row in entry['rows']:
+            total = totals[row['label']]
+            total['requests'] += 1
+            for column in COLUMNS:
+                total[column] += row[column]
+    return [
+        dict(label=label, **total) for label, total in totals.items()
+    ]
+
+
+class Command(BaseCommand):
+    help = ('Сводка профилей отрисовки шаблонов: время по шаблонам, '
+            'тегам и фильтрам за все записанные запросы.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=settings.TEMPLATE_PROFILE_LOG)
+        parser.add_argument(
+            '--view', help='Учитывать только запросы этого view.'
+        )
+        parser.add_argument('--sort', choices=COLUMNS, default='own_ms')
+        parser.add_argument('--limit', type=int, default=30)
+        parser.add_argument(
+            '--json', action='store_true', help='Вывести сводку в JSON.'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['file']) as log:
+                entries = [json.loads(line) for line in log if line.strip()]
+        except FileNotFoundError:
+            raise CommandError(f'Журнал {options["file"]} не найден.')
+        if options['view']:
+            entries = [entry for entry in entries
+                       if entry['view'] == options['view']]
+        rows = sorted(aggregate(entries),
+                      key=lambda row: row[options['sort']], reverse=True)
+        rows = rows[:options['limit']]
+        if options['json']:
+            self.stdout.write(json.dumps(rows, ensure_ascii=False, indent=2))
+            return
+        self.stdout.write(f'Запросов: {len(entries)}')
+        self.stdout.write(self.style.SQL_KEYWORD(
+            f'{"собств., мс":>12} {"полное, мс":>12} {"вызовов":>9}  метка'))
+        for row in rows:
+            self.stdout.write(
+                f'{row["own_ms"]:>12.2f} {row["total_ms"]:>12.2f} '
+                f'{row["calls"]:>9}  {row["label"]}')
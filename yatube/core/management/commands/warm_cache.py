@@ -0,0 +1,63 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import pagecache
+from core.benchmark import persistent_connections
+from core.cachewarm import warm_cache
+
+
+class Command(BaseCommand):
+    help = ('Прогревает кеш: первые страницы главной, самые большие группы '
+            'и профили авторов с наибольшим числом подписчиков.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pages', type=int, default=settings.CACHE_WARMING_PAGES)
+        parser.add_argument(
+            '--groups', type=int, default=settings.CACHE_WARMING_GROUPS)
+        parser.add_argument(
+            '--profiles', type=int, default=settings.CACHE_WARMING_PROFILES)
+        parser.add_argument(
+            '--workers', type=int, default=settings.CACHE_WARMING_WORKERS,
+            help='Сколько страниц запрашивать одновременно.'
+        )
+        parser.add_argument(
+            '--host', default=settings.CACHE_WARMING_HOST,
+            help='Хост, под которым сайт открывают читатели.'
+        )
+        parser.add_argument(
+            '--invalidate', action='store_true',
+            help='Сбросить кеш страниц перед прогревом, например после '
+                 'выкладки с новыми шаблонами.'
+        )
+        parser.add_argument(
+            '--json', action='store_true', help='Вывести результат в JSON.'
+        )
+
+    def handle(self, *args, **options):
+        if options['invalidate']:
+            pagecache.invalidate()
+        with persistent_connections():
+            results = warm_cache(
+                pages=options['pages'],
+                groups=options['groups'],
+                profiles=options['profiles'],
+                workers=options['workers'],
+                host=options['host'],
+            )
+        if options['json']:
+            self.stdout.write(json.dumps(
+                [result._asdict() for result in results], indent=2))
+            return
+        for result in results:
+            line = f'{result.status or "-":>4} {result.duration_ms:8.1f} мс  '
+            line += result.path
+            if result.status == 200:
+                self.stdout.write(line)
+            else:
+                self.stdout.write(self.style.ERROR(line))
+        total = sum(result.duration_ms for result in results)
+        self.stdout.write(self.style.SUCCESS(
+            f'Прогрето страниц: {len(results)}, {total:.1f} мс'))
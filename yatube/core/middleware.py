@@ -0,0 +1,160 @@
+import os
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+from . import pagecache
+from .queries import SlowQueryLogger
+
+
+class ProfilingMiddleware:
+    """Профилирует отдельные запросы через cProfile.
+
+    Профиль снимается, если сотрудник прислал заголовок ``X-Profile`` или
+    запрос попал в случайную выборку ``PROFILING_SAMPLE_RATE``. Результат
+    в формате pstats сохраняется в ``PROFILING_DIR/<имя view>/``, а путь к
+    файлу возвращается в заголовке ответа ``X-Profile``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+        import cProfile
+
+        profiler = cProfile.Profile()
+        response = profiler.runcall(self.get_response, request)
+        path = self.save(request, profiler)
+        if request.META.get('HTTP_X_PROFILE'):
+            response['X-Profile'] = os.path.relpath(
+                path, settings.PROFILING_DIR)
+        return response
+
+    @staticmethod
+    def should_profile(request):
+        if request.META.get('HTTP_X_PROFILE'):
+            user = getattr(request, 'user', None)
+            return bool(user and user.is_staff)
+        rate = settings.PROFILING_SAMPLE_RATE
+        return bool(rate) and random.random() < rate
+
+    @staticmethod
+    def save(request, profiler):
+        match = request.resolver_match
+        view_name = match.view_name if match else 'unresolved'
+        directory = os.path.join(
+            settings.PROFILING_DIR, view_name.replace(':', '.'))
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(
+            directory, f'{time.time_ns()}-{os.getpid()}.prof')
+        profiler.dump_stats(path)
+        return path
+
+
+class SlowQueryMiddleware:
+    """Подключает SlowQueryLogger ко всем соединениям на время запроса."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if settings.SLOW_QUERY_THRESHOLD_MS is None:
+            return self.get_response(request)
+        logger = SlowQueryLogger(request)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(logger))
+            return self.get_response(request)
+
+
+class TemplateProfileMiddleware:
+    """Профилирует отрисовку шаблонов при ``TEMPLATE_PROFILING``.
+
+    Самые затратные шаблоны и теги запроса отдаются в заголовке
+    ``Server-Timing`` (вкладка Timing в инструментах браузера), полный
+    профиль дописывается в журнал ``TEMPLATE_PROFILE_LOG``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.TEMPLATE_PROFILING:
+            return self.get_response(request)
+        from .templateprofile import TemplateProfile
+
+        with TemplateProfile() as profile:
+            response = self.get_response(request)
+        if profile.calls:
+            response['Server-Timing'] = profile.server_timing()
+            profile.log(request)
+        return response
+
+
+class PersonalFragmentsMiddleware:
+    """Заполняет метки персональных фрагментов в HTML-ответах.
+
+    При PAGE_SHELL_ENABLED отмечает запрос, чтобы тег {% personal %}
+    оставлял метки вместо фрагментов, и заменяет их в готовом ответе,
+    в том числе взятом из кеша страниц (см. core.personal).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.PAGE_SHELL_ENABLED:
+            return self.get_response(request)
+        request.personal_shell = True
+        response = self.get_response(request)
+        if (response.streaming
+                or not response.get('Content-Type', '').startswith(
+                    'text/html')
+                or b'<!--personal ' not in response.content):
+            return response
+        from . import personal
+
+        response.content = personal.fill(request, response.content)
+        if response.has_header('Content-Length'):
+            response['Content-Length'] = str(len(response.content))
+        return response
+
+
+class AnonymousPageCacheMiddleware:
+    """Отдаёт страницы из кеша целиком: анонимным читателям, а при
+    PAGE_SHELL_ENABLED — и вошедшим пользователям.
+
+    Сессия и пользователь к этому моменту загружаются лениво, поэтому
+    попадание в кеш для анонимного читателя не трогает ни шаблоны, ни
+    базу. Устаревшая запись отдаётся, пока фоновый поток готовит свежую
+    (см. core.pagecache).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if (not settings.PAGE_CACHE_ENABLED
+                or not pagecache.is_cacheable(request)):
+            return self.get_response(request)
+        key = pagecache.page_key(request)
+        current = pagecache.generation()
+        entry = cache.get(key)
+        if entry is not None and entry.generation == current:
+            age = time.time() - entry.created
+            if age < settings.PAGE_CACHE_TIMEOUT:
+                return pagecache.build_response(entry, 'hit')
+            pagecache.refresh_in_background(
+                self.get_response, request, key, current)
+            return pagecache.build_response(entry, 'stale')
+        response = self.get_response(request)
+        if request.method == 'GET':
+            pagecache.store(key, response, current)
+        response['X-Page-Cache'] = 'miss'
+        return response
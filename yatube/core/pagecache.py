@@ -0,0 +1,113 @@
+"""Кеш целых страниц.
+
+Ответ сохраняется в кеше вместе с заголовками. Первые
+``PAGE_CACHE_TIMEOUT`` секунд запись свежая и отдаётся как есть; ещё
+``PAGE_CACHE_STALE`` секунд она отдаётся устаревшей, пока один фоновый
+поток строит страницу заново (остальные запросы видят блокировку в кеше и
+обновление не запускают). Запись постов, комментариев и групп увеличивает
+поколение кеша: записи прежних поколений больше не отдаются.
+
+Без ``PAGE_SHELL_ENABLED`` страницы кешируются только для анонимных
+читателей, с ним — общие для всех оболочки, персональные места в которых
+заполняет core.personal.
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+
+from .cache import acquire, release
+
+logger = logging.getLogger('yatube.pagecache')
+
+GENERATION_KEY = 'pagecache:generation'
+
+Entry = namedtuple('Entry', 'created generation status headers content')
+
+
+def generation():
+    value = cache.get(GENERATION_KEY)
+    if value is None:
+        cache.add(GENERATION_KEY, 1, timeout=None)
+        value = cache.get(GENERATION_KEY, 1)
+    return value
+
+
+def invalidate():
+    """Делает недействительными все сохранённые страницы."""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.add(GENERATION_KEY, 2, timeout=None)
+
+
+def page_key(request):
+    url = request.build_absolute_uri().encode()
+    return f'pagecache:page:{hashlib.md5(url).hexdigest()}'
+
+
+def is_cacheable(request):
+    """GET без отложенных сообщений от анонимного читателя, а при
+    PAGE_SHELL_ENABLED — от любого пользователя: персональные места
+    страницы заполняет core.personal."""
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if (settings.SESSION_COOKIE_NAME in request.COOKIES
+            and not settings.PAGE_SHELL_ENABLED):
+        return False
+    if 'messages' in request.COOKIES:
+        return False
+    try:
+        match = resolve(request.path_info, getattr(request, 'urlconf', None))
+    except Resolver404:
+        return False
+    return match.view_name in settings.PAGE_CACHE_VIEWS
+
+
+def store(key, response, current):
+    if (response.status_code != 200 or response.streaming
+            or response.cookies):
+        return
+    cache.set(
+        key,
+        Entry(time.time(), current, response.status_code,
+              list(response.items()), response.content),
+        settings.PAGE_CACHE_TIMEOUT + settings.PAGE_CACHE_STALE)
+
+
+def build_response(entry, state):
+    response = HttpResponse(entry.content, status=entry.status)
+    for header, value in entry.headers:
+        response[header] = value
+    response['Age'] = str(int(time.time() - entry.created))
+    response['X-Page-Cache'] = state
+    return response
+
+
+def refresh_in_background(get_response, request, key, current):
+    """Перестраивает страницу в отдельном потоке, если её ещё никто
+    не перестраивает."""
+    if not acquire(key, settings.PAGE_CACHE_REFRESH_TIMEOUT):
+        return
+
+    def refresh():
+        try:
+            store(key, get_response(request), current)
+        except Exception:
+            logger.exception('Не удалось обновить %s', request.path)
+        finally:
+            release(key)
+            connections.close_all()
+
+    schedule(refresh)
+
+
+def schedule(task):
+    threading.Thread(target=task, daemon=True).start()
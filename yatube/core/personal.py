@@ -0,0 +1,61 @@
+"""Персональные фрагменты страниц, общих для всех пользователей.
+
+Страница, которая отличается у разных пользователей лишь шапкой,
+кнопкой подписки или формой комментария, не может кешироваться целиком.
+Поэтому такие места выводятся тегом ``{% personal 'имя' аргументы %}``.
+При ``PAGE_SHELL_ENABLED`` тег оставляет в разметке метку, и страница
+становится общей «оболочкой»: её можно хранить в кеше страниц для всех
+пользователей. PersonalFragmentsMiddleware перед отдачей ответа заменяет
+метки фрагментами для текущего пользователя, и из кеша, и при свежей
+отрисовке. Без PAGE_SHELL_ENABLED фрагменты отрисовываются на месте.
+
+Фрагмент — функция ``(request, *args) -> str``, зарегистрированная
+декоратором ``fragment``. Аргументы фрагмента не должны зависеть от
+пользователя, потому что хранятся в общей оболочке.
+"""
+import re
+from urllib.parse import quote, unquote
+
+from django.contrib.auth.models import AnonymousUser
+from django.template.loader import render_to_string
+
+FRAGMENTS = {}
+
+PLACEHOLDER = re.compile(rb'<!--personal ([\w-]+)((?: [^\s>]*)*)-->')
+
+
+def fragment(name):
+    def decorator(function):
+        FRAGMENTS[name] = function
+        return function
+    return decorator
+
+
+def placeholder(name, args):
+    encoded = ''.join(' ' + quote(str(arg), safe='') for arg in args)
+    return f'<!--personal {name}{encoded}-->'
+
+
+def render(request, name, args):
+    return FRAGMENTS[name](request, *args)
+
+
+def fill(request, content):
+    """Заменяет метки в content (bytes) фрагментами для request."""
+    def replace(match):
+        args = [unquote(arg) for arg in match.group(2).decode().split()]
+        return render(request, match.group(1).decode(), args).encode()
+
+    return PLACEHOLDER.sub(replace, content)
+
+
+def current_user(request):
+    return getattr(request, 'user', None) or AnonymousUser()
+
+
+@fragment('header')
+def header(request, view_name=''):
+    return render_to_string('includes/header.html', {
+        'user': current_user(request),
+        'view_name': view_name,
+    })
@@ -0,0 +1,167 @@
+"""Запись SQL-запросов для тестов и диагностики."""
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+import traceback
+from collections import namedtuple
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger('yatube.slow_queries')
+
+RecordedQuery = namedtuple('RecordedQuery', 'sql params duration stack')
+
+LITERALS = re.compile(
+    r"'(?:[^']|'')*'"        # строки
+    r"|\b\d+(?:\.\d+)?\b"    # числа
+    r"|%s|\?"                # параметры
+)
+VALUE_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+SPACES = re.compile(r'\s+')
+
+
+def normalize(sql):
+    """SQL без конкретных значений: литералы и параметры заменены на ?,
+    списки значений IN (...) и VALUES (...) свёрнуты."""
+    sql = LITERALS.sub('?', sql)
+    sql = VALUE_LISTS.sub('(...)', sql)
+    return SPACES.sub(' ', sql).strip()
+
+
+def fingerprint(sql):
+    """Короткий идентификатор запроса, одинаковый для любых значений."""
+    return hashlib.md5(normalize(sql).encode()).hexdigest()[:16]
+
+
+def project_stack(limit=8):
+    """Кадры стека из кода проекта, без библиотек и самого модуля."""
+    frames = [
+        frame for frame in traceback.extract_stack()[:-2]
+        if frame.filename.startswith(settings.BASE_DIR)
+        and frame.filename != __file__
+        and f'{os.sep}site-packages{os.sep}' not in frame.filename
+    ]
+    return frames[-limit:]
+
+
+class QueryRecorder:
+    """Записывает выполненные запросы вместе со стеком вызовов.
+
+    Используется как контекстный менеджер::
+
+        with QueryRecorder() as recorder:
+            ...
+        print(recorder.report())
+    """
+
+    def __init__(self, using=connection, capture_stack=True):
+        self.connection = using
+        self.capture_stack = capture_stack
+        self.queries = []
+        self._wrapper = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(RecordedQuery(
+                sql, params, time.perf_counter() - started,
+                project_stack() if self.capture_stack else []))
+
+    def __enter__(self):
+        self._wrapper = self.connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._wrapper.__exit__(*exc_info)
+
+    def __len__(self):
+        return len(self.queries)
+
+    def repeated(self):
+        """Запросы с одинаковым текстом SQL, выполненные более одного раза,
+        от самых частых к редким."""
+        groups = {}
+        for query in self.queries:
+            groups.setdefault(query.sql, []).append(query)
+        return sorted(
+            (group for group in groups.values() if len(group) > 1),
+            key=len, reverse=True)
+
+    def report(self):
+        """Текстовый отчёт: все запросы и повторы со стеком вызовов."""
+        lines = [f'Выполнено запросов: {len(self.queries)}']
+        for number, query in enumerate(self.queries, 1):
+            lines.append(f'{number}. {query.sql}')
+        for group in self.repeated():
+            lines.append('')
+            lines.append(f'Повторяется {len(group)} раз: {group[0].sql}')
+            lines.extend(
+                line.rstrip()
+                for line in traceback.format_list(group[0].stack))
+        return '\n'.join(lines)
+
+
+class SlowQueryLogger:
+    """Обёртка execute_wrapper, записывающая медленные запросы.
+
+    Для каждого запроса дольше ``SLOW_QUERY_THRESHOLD_MS`` в журнал
+    ``SLOW_QUERY_LOG`` добавляется строка JSON: view, отпечаток SQL,
+    длительность и план выполнения, снятый сразу после запроса.
+    """
+
+    def __init__(self, request=None):
+        self.request = request
+        self.explaining = False
+
+    def __call__(self, execute, sql, params, many, context):
+        if self.explaining:
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - started) * 1000
+            if duration >= settings.SLOW_QUERY_THRESHOLD_MS:
+                self.log(sql, params, many, context['connection'], duration)
+
+    def view_name(self):
+        match = getattr(self.request, 'resolver_match', None)
+        return match.view_name if match else None
+
+    def explain(self, sql, params, many, connection):
+        if many or not sql.lstrip().upper().startswith('SELECT'):
+            return []
+        self.explaining = True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'{connection.ops.explain_query_prefix()} {sql}', params)
+                return [' '.join(str(column) for column in row)
+                        for row in cursor.fetchall()]
+        except Exception as error:
+            return [f'EXPLAIN не выполнен: {error}']
+        finally:
+            self.explaining = False
+
+    def log(self, sql, params, many, connection, duration):
+        entry = {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'view': self.view_name(),
+            'path': getattr(self.request, 'path', None),
+            'fingerprint': fingerprint(sql),
+            'sql': normalize(sql),
+            'duration_ms': round(duration, 3),
+            'plan': self.explain(sql, params, many, connection),
+        }
+        logger.info('%(duration_ms)s ms %(view)s %(sql)s', entry)
+        os.makedirs(os.path.dirname(settings.SLOW_QUERY_LOG), exist_ok=True)
+        with open(settings.SLOW_QUERY_LOG, 'a') as log:
+            log.write(json.dumps(entry, ensure_ascii=False) + '\n')
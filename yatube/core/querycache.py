@@ -0,0 +1,139 @@
+"""Кеш результатов запросов ORM с версиями таблиц.
+
+Запрос, обёрнутый в ``cached()``, кешируется по тексту SQL и параметрам
+вместе с текущими версиями всех таблиц, которые он читает. Любая
+запись (INSERT, UPDATE, DELETE) в таблицу из ``QUERY_CACHE_TABLES``
+увеличивает её версию, и прежние результаты больше не находятся. Записи
+отслеживаются обёрткой execute_wrapper на каждом соединении, поэтому
+учитываются и ``save()``, и ``QuerySet.update()``, и каскадное удаление,
+и сырой SQL. Внутри транзакции версия увеличивается ещё раз после
+фиксации: иначе параллельный запрос мог бы успеть закешировать данные,
+прочитанные до неё.
+
+Запросы к таблицам вне списка не кешируются вовсе. Кеш включается
+настройкой ``QUERY_CACHE_ENABLED``; версии ведутся всегда.
+
+Пример::
+
+    posts = cached(Post.objects.filter(author__following__user=user))
+"""
+import hashlib
+import re
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+
+WRITE = re.compile(
+    r'^\s*(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM)\s+"?(\w+)"?', re.I)
+READ = re.compile(r'\b(?:FROM|JOIN)\s+"?(\w+)"?', re.I)
+
+VERSION_KEY = 'querycache:table:{}'
+
+
+def initial_version():
+    # Версия пропавшего из кеша счётчика начинается с текущего времени в
+    # микросекундах, а не с нуля: иначе она могла бы совпасть с одной из
+    # прежних и вернуть результаты, сохранённые при ней.
+    return time.time_ns() // 1000
+
+
+def versions(tables):
+    keys = [VERSION_KEY.format(table) for table in tables]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, initial_version(), timeout=None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def bump(tables):
+    for table in tables:
+        key = VERSION_KEY.format(table)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, initial_version(), timeout=None)
+
+
+def track_writes(execute, sql, params, many, context):
+    """execute_wrapper: увеличивает версии таблиц, в которые пишет запрос."""
+    result = execute(sql, params, many, context)
+    match = WRITE.match(sql)
+    if match and match.group(1) in settings.QUERY_CACHE_TABLES:
+        tables = [match.group(1)]
+        bump(tables)
+        connection = context['connection']
+        if connection.in_atomic_block:
+            connection.on_commit(lambda: bump(tables))
+    return result
+
+
+def install(connection, **kwargs):
+    """Обработчик connection_created."""
+    if track_writes not in connection.execute_wrappers:
+        # В начало списка: execute_wrapper() снимает обёртки с конца, и
+        # соединение, открытое внутри такого блока, не должно потерять
+        # нашу.
+        connection.execute_wrappers.insert(0, track_writes)
+
+
+def fetch(queryset, kind, compute):
+    """Результат compute() для queryset из кеша или из базы."""
+    if not settings.QUERY_CACHE_ENABLED:
+        return compute()
+    try:
+        sql, params = queryset.query.sql_with_params()
+    except EmptyResultSet:
+        return compute()
+    tables = sorted(set(READ.findall(sql)))
+    if not tables or not set(tables) <= set(settings.QUERY_CACHE_TABLES):
+        return compute()
+    signature = repr((
+        kind, queryset.db, queryset._iterable_class.__name__, sql, params,
+        tables, versions(tables)))
+    key = f'querycache:{hashlib.md5(signature.encode()).hexdigest()}'
+    result = cache.get(key)
+    if result is None:
+        result = compute()
+        cache.set(key, result, queryset._query_cache_timeout)
+    return result
+
+
+class CachedQuerySetMixin:
+    _query_cache_timeout = None
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._query_cache_timeout = self._query_cache_timeout
+        return clone
+
+    def _fetch_all(self):
+        if self._result_cache is None:
+            self._result_cache = fetch(
+                self, 'rows', lambda: list(self._iterable_class(self)))
+        super()._fetch_all()
+
+    def count(self):
+        if self._result_cache is not None:
+            return len(self._result_cache)
+        return fetch(self, 'count', super().count)
+
+
+_classes = {}
+
+
+def cached(queryset, timeout=None):
+    """Копия queryset (или менеджера), результаты которой кешируются."""
+    queryset = queryset.all()
+    base = queryset.__class__
+    if not issubclass(base, CachedQuerySetMixin):
+        if base not in _classes:
+            _classes[base] = type(
+                f'Cached{base.__name__}', (CachedQuerySetMixin, base), {})
+        queryset.__class__ = _classes[base]
+    queryset._query_cache_timeout = (
+        settings.QUERY_CACHE_TIMEOUT if timeout is None else timeout)
+    return queryset
@@ -0,0 +1,109 @@
+"""Поиск объектов по slug и username без запроса к базе.
+
+``Resolver`` держит в памяти процесса ограниченный LRU: значение
+уникального поля (slug группы, username пользователя) -> кортеж нужных
+страницам полей. На каждый запрос по кортежу собирается свежий экземпляр
+модели с отложенными остальными полями, как после ``only()``, так что
+изменения экземпляра во view не портят кеш.
+
+Сохранение или удаление объекта (сигналы подключает приложение) очищает
+кеш своего процесса сразу, а в общем кеше увеличивает версию; остальные
+процессы сверяют версию раз в ``RESOLVER_SYNC_INTERVAL`` секунд и, если
+она изменилась, очищают свой кеш целиком. Сохранения, которые не трогают
+закешированные поля (например, ``last_login`` при входе), кеш не очищают.
+
+Без ``RESOLVER_ENABLED`` каждый поиск идёт в базу.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+
+VERSION_KEY = 'resolver:{}'
+
+
+class Resolver:
+    def __init__(self, model, field, fields):
+        self.model = model
+        self.field = field
+        # Model.from_db ждёт значения в порядке полей модели.
+        self.fields = tuple(
+            model_field.attname for model_field in model._meta.concrete_fields
+            if model_field.attname in fields)
+        self.name = f'{model._meta.label_lower}.{field}'
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.entries = OrderedDict()
+            # Номер поколения: поиск, начатый до очистки, не кладёт в кеш
+            # прочитанное до неё.
+            self.generation = getattr(self, 'generation', 0) + 1
+            self.version = None
+            self.synced = 0
+
+    @property
+    def version_key(self):
+        return VERSION_KEY.format(self.name)
+
+    def sync(self):
+        """Сверяет версию с общим кешем не чаще RESOLVER_SYNC_INTERVAL."""
+        now = time.monotonic()
+        if now - self.synced < settings.RESOLVER_SYNC_INTERVAL:
+            return
+        version = cache.get(self.version_key)
+        if version is None:
+            cache.add(self.version_key, time.time_ns() // 1000, timeout=None)
+            version = cache.get(self.version_key)
+        if version != self.version:
+            self.clear()
+        with self.lock:
+            self.version = version
+            self.synced = now
+
+    def invalidate(self, update_fields=None):
+        """Обработчик сохранения и удаления объекта модели."""
+        if update_fields and not set(update_fields) & set(self.fields):
+            return
+        try:
+            cache.incr(self.version_key)
+        except ValueError:
+            cache.add(self.version_key, time.time_ns() // 1000, timeout=None)
+        self.clear()
+
+    def build(self, values):
+        return self.model.from_db(
+            self.model._default_manager.db, self.fields, values)
+
+    def get(self, value):
+        """Экземпляр модели с полем field, равным value, или
+        Model.DoesNotExist."""
+        if not settings.RESOLVER_ENABLED:
+            return self.build(self.model._default_manager.values_list(
+                *self.fields).get(**{self.field: value}))
+        self.sync()
+        with self.lock:
+            values = self.entries.get(value)
+            generation = self.generation
+            if values is not None:
+                self.entries.move_to_end(value)
+        if values is None:
+            values = self.model._default_manager.values_list(
+                *self.fields).get(**{self.field: value})
+            with self.lock:
+                if generation == self.generation:
+                    self.entries[value] = values
+                    while len(self.entries) > settings.RESOLVER_MAX_ENTRIES:
+                        self.entries.popitem(last=False)
+        return self.build(values)
+
+    def get_or_404(self, value):
+        try:
+            return self.get(value)
+        except self.model.DoesNotExist:
+            raise Http404(
+                f'No {self.model._meta.object_name} matches the given query.')
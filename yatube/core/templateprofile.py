@@ -0,0 +1,147 @@
+"""Профилирование отрисовки шаблонов.
+
+Время отрисовки раскладывается по шаблонам, тегам и фильтрам: каждый
+шаблон (в том числе подключённый через ``{% include %}`` или
+``{% extends %}``) учитывается как ``template:<имя>``, теги — как
+``tag:<имя>``, переменные с фильтрами — как ``filter:<имена фильтров>``.
+Для каждой метки считаются число вызовов, полное время и собственное
+время без вложенных узлов. Узлы оборачиваются только после ``install()``
+и только пока в потоке открыт профиль, так что без профиля отрисовка
+почти не замедляется.
+"""
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from django.conf import settings
+from django.template.base import Node, Template, TextNode, VariableNode
+from django.template.loader_tags import ExtendsNode, IncludeNode
+
+_local = threading.local()
+_original = {}
+
+
+class TemplateProfile:
+    """Счётчики времени по меткам для одного запроса."""
+
+    def __init__(self):
+        self.calls = defaultdict(int)
+        self.total = defaultdict(float)
+        self.own = defaultdict(float)
+        self.stack = []
+
+    def __enter__(self):
+        _local.profile = self
+        return self
+
+    def __exit__(self, *exc_info):
+        _local.profile = None
+
+    def measure(self, label, render, *args):
+        # Второй элемент кадра копит время вложенных меток.
+        frame = [label, 0.0]
+        self.stack.append(frame)
+        started = time.perf_counter()
+        try:
+            return render(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.stack.pop()
+            if self.stack:
+                self.stack[-1][1] += elapsed
+            # Рекурсивный вход в ту же метку не удваивает полное время.
+            if all(outer[0] != label for outer in self.stack):
+                self.total[label] += elapsed
+            self.calls[label] += 1
+            self.own[label] += elapsed - frame[1]
+
+    def rows(self):
+        """Строки отчёта в миллисекундах, от наибольшего собственного
+        времени к наименьшему."""
+        return sorted(
+            ({'label': label,
+              'calls': self.calls[label],
+              'total_ms': round(self.total[label] * 1000, 3),
+              'own_ms': round(self.own[label] * 1000, 3)}
+             for label in self.calls),
+            key=lambda row: row['own_ms'], reverse=True)
+
+    def server_timing(self, limit=10):
+        """Значение заголовка Server-Timing для инструментов браузера."""
+        metrics = []
+        for number, row in enumerate(self.rows()[:limit]):
+            description = row['label'].replace('"', "'")
+            metrics.append(
+                f'tpl{number};dur={row["own_ms"]};'
+                f'desc="{description} x{row["calls"]}"')
+        return ', '.join(metrics)
+
+    def log(self, request):
+        """Добавляет профиль запроса в журнал TEMPLATE_PROFILE_LOG."""
+        match = getattr(request, 'resolver_match', None)
+        entry = {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'view': match.view_name if match else None,
+            'path': request.path,
+            'rows': self.rows(),
+        }
+        os.makedirs(
+            os.path.dirname(settings.TEMPLATE_PROFILE_LOG), exist_ok=True)
+        with open(settings.TEMPLATE_PROFILE_LOG, 'a') as log:
+            log.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+
+def current():
+    return getattr(_local, 'profile', None)
+
+
+def node_label(node):
+    """Метка узла; None для узлов, которые не стоит учитывать отдельно."""
+    if isinstance(node, VariableNode):
+        names = [func.__name__ for func, _ in node.filter_expression.filters]
+        return f'filter:{"|".join(names)}' if names else None
+    if isinstance(node, (TextNode, IncludeNode)):
+        # Подключённый шаблон учитывается в Template.render.
+        return None
+    if isinstance(node, ExtendsNode):
+        return f'template:{node.parent_name.var}'
+    token = getattr(node, 'token', None)
+    if token is None:
+        return f'tag:{type(node).__name__}'
+    return f'tag:{token.contents.split(maxsplit=1)[0]}'
+
+
+def render_annotated(self, context):
+    profile = current()
+    if profile is None:
+        return _original['render_annotated'](self, context)
+    try:
+        label = self._profile_label
+    except AttributeError:
+        label = self._profile_label = node_label(self)
+    if label is None:
+        return _original['render_annotated'](self, context)
+    return profile.measure(
+        label, _original['render_annotated'], self, context)
+
+
+def render(self, context):
+    profile = current()
+    if profile is None:
+        return _original['render'](self, context)
+    return profile.measure(
+        f'template:{self.name or "<string>"}',
+        _original['render'], self, context)
+
+
+def install():
+    """Подключает профилировщик к движку шаблонов Django."""
+    if _original:
+        return
+    _original['render_annotated'] = Node.render_annotated
+    _original['render'] = Template.render
+    Node.render_annotated = render_annotated
+    Template.render = render
@@ -0,0 +1,19 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from core import personal as fragments
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def personal(context, name, *args):
+    """Фрагмент для текущего пользователя или метка на его месте.
+
+    {% personal 'follow_button' author.pk author.username %}
+    """
+    request = context.get('request')
+    args = ['' if arg is None else str(arg) for arg in args]
+    if getattr(request, 'personal_shell', False):
+        return mark_safe(fragments.placeholder(name, args))
+    return mark_safe(fragments.render(request, name, args))
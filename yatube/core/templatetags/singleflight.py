@@ -0,0 +1,49 @@
+from django.core.cache.utils import make_template_fragment_key
+from django.template import (
+    Library, Node, TemplateSyntaxError, VariableDoesNotExist
+)
+
+from core import cache
+
+register = Library()
+
+
+class SingleFlightNode(Node):
+    def __init__(self, nodelist, expire_time_var, fragment_name, vary_on):
+        self.nodelist = nodelist
+        self.expire_time_var = expire_time_var
+        self.fragment_name = fragment_name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        try:
+            expire_time = int(self.expire_time_var.resolve(context))
+        except (VariableDoesNotExist, ValueError, TypeError):
+            raise TemplateSyntaxError(
+                f'"singleflight" tag got an invalid timeout: '
+                f'{self.expire_time_var.token!r}')
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        return cache.get_or_set(
+            make_template_fragment_key(self.fragment_name, vary_on),
+            lambda: self.nodelist.render(context),
+            expire_time)
+
+
+@register.tag
+def singleflight(parser, token):
+    """Как {% cache %}, но фрагмент пересчитывает только один запрос.
+
+    {% singleflight 20 index_page page_obj %}...{% endsingleflight %}
+
+    Ключ тот же, что у {% cache %} (make_template_fragment_key), остальные
+    запросы на время пересчёта получают прежний фрагмент (core.cache).
+    """
+    nodelist = parser.parse(('endsingleflight',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise TemplateSyntaxError(
+            f'{tokens[0]!r} tag requires at least 2 arguments.')
+    return SingleFlightNode(
+        nodelist, parser.compile_filter(tokens[1]), tokens[2],
+        [parser.compile_filter(bit) for bit in tokens[3:]])
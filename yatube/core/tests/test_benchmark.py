@@ -0,0 +1,73 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from core.benchmark import (
+    WSGIClient, count_queries, imports_by_owner, parse_importtime,
+    percentile, persistent_connections, session_cookie
+)
+
+User = get_user_model()
+
+
+class PercentileTest(TestCase):
+    def test_percentile_interpolates(self):
+        """Перцентили считаются с линейной интерполяцией."""
+        values = [4, 1, 3, 2]
+        self.assertEqual(percentile(values, 0), 1)
+        self.assertEqual(percentile(values, 50), 2.5)
+        self.assertEqual(percentile(values, 100), 4)
+        self.assertIsNone(percentile([], 50))
+
+
+class ImportTimeTest(TestCase):
+    OUTPUT = (
+        'import time: self [us] | cumulative | imported package\n'
+        'import time:       100 |        100 |     posts.forms\n'
+        'import time:        50 |        150 |   posts.views\n'
+        'import time:       300 |        300 |   django.contrib.admin.sites\n'
+        'import time:        20 |        20 | PIL\n'
+        'посторонняя строка\n'
+    )
+
+    def test_imports_grouped_by_app(self):
+        """Время импорта суммируется по приложениям и пакетам."""
+        imports = parse_importtime(self.OUTPUT)
+        self.assertEqual(
+            [row.module for row in imports],
+            ['posts.forms', 'posts.views', 'django.contrib.admin.sites',
+             'PIL'])
+        self.assertEqual(imports[1].cumulative_us, 150)
+        self.assertEqual(
+            imports_by_owner(imports, ['posts', 'django.contrib.admin']),
+            {'posts': 150, 'django.contrib.admin': 300, 'PIL': 20})
+
+
+class WSGIClientTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_anonymous_request(self):
+        """Клиент вызывает WSGI-приложение и считает запросы к БД."""
+        with persistent_connections(), count_queries() as counter:
+            status, body = WSGIClient().get(reverse('posts:index'))
+        self.assertEqual(status, 200)
+        self.assertIn('Последние обновления'.encode(), body)
+        self.assertGreater(counter['queries'], 0)
+
+    def test_authorized_request(self):
+        """Cookie сессии авторизует клиента, POST проходит проверку CSRF."""
+        client = WSGIClient(cookies=session_cookie(self.user))
+        with persistent_connections():
+            status, _ = client.get(reverse('posts:follow_index'))
+            self.assertEqual(status, 200)
+            status, _ = client.post(
+                reverse('posts:post_create'), {'text': 'Пост'})
+        self.assertEqual(status, 302)
+        self.assertTrue(self.user.posts.filter(text='Пост').exists())
@@ -0,0 +1,75 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import SimpleTestCase
+
+from core.cache import Entry, acquire, get_or_set, should_recompute
+
+
+class SingleFlightTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def compute(self, value='значение', delay=0):
+        def call():
+            self.calls += 1
+            time.sleep(delay)
+            return value
+        return call
+
+    def test_concurrent_misses_compute_once(self):
+        """Одновременные промахи пересчитывают значение один раз."""
+        results = []
+        compute = self.compute(delay=0.1)
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                get_or_set('hot', compute, 20)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, ['значение'] * 8)
+
+    def test_previous_value_served_during_recompute(self):
+        """Пока ключ пересчитывается, отдаётся прежнее значение."""
+        cache.set('hot', Entry('старое', 0.1, time.time() - 1), 60)
+        acquire('hot')
+        self.assertEqual(get_or_set('hot', self.compute('новое'), 20),
+                         'старое')
+        self.assertEqual(self.calls, 0)
+
+    def test_expired_value_recomputed_by_lock_holder(self):
+        """Истёкшую запись пересчитывает запрос, получивший блокировку."""
+        cache.set('hot', Entry('старое', 0.1, time.time() - 1), 60)
+        self.assertEqual(get_or_set('hot', self.compute('новое'), 20),
+                         'новое')
+        self.assertEqual(get_or_set('hot', self.compute('ещё'), 20),
+                         'новое')
+
+    def test_probabilistic_early_expiration(self):
+        """Досрочное обновление вероятнее у дорогих записей ближе к сроку."""
+        now = time.time()
+        cheap = Entry('', 0.001, now + 10)
+        costly = Entry('', 5, now + 10)
+        with mock.patch('core.cache.random.random', return_value=0.9):
+            self.assertFalse(should_recompute(cheap, now=now))
+            self.assertTrue(should_recompute(costly, now=now))
+            self.assertTrue(should_recompute(cheap, now=now + 10))
+
+    def test_template_tag(self):
+        """Тег singleflight кеширует фрагмент по имени и переменным."""
+        template = Template(
+            '{% load singleflight %}'
+            '{% singleflight 20 fragment key %}{{ value }}'
+            '{% endsingleflight %}')
+        first = template.render(Context({'key': 1, 'value': 'a'}))
+        cached = template.render(Context({'key': 1, 'value': 'b'}))
+        other = template.render(Context({'key': 2, 'value': 'c'}))
+        self.assertEqual((first, cached, other), ('a', 'a', 'c'))
@@ -0,0 +1,281 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.utils import make_template_fragment_key
+from django.test import SimpleTestCase, override_settings
+
+from core import cache_backends
+from core.cache_backends import (
+    InstrumentedCache, NearCache, SQLiteCache, merge, namespace, summarize
+)
+
+WRITER = '''
+import sys
+from core.cache_backends import SQLiteCache
+cache = SQLiteCache(sys.argv[1], {})
+cache.set('shared', 'из другого процесса')
+cache.incr('counter')
+'''
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.path = f'{self.directory}/cache.sqlite3'
+        self.cache = SQLiteCache(self.path, {})
+
+    def test_basic_operations(self):
+        """Запись, чтение, add, touch, удаление и истечение срока."""
+        cache = self.cache
+        cache.set('key', {'value': 0})
+        cache.set('key', {'value': 1})
+        self.assertEqual(cache.get('key'), {'value': 1})
+        self.assertEqual(cache.stats()['entries'], 1)
+        self.assertFalse(cache.add('key', 'другое'))
+        self.assertTrue(cache.add('new', 'значение'))
+        self.assertTrue(cache.has_key('new'))
+        cache.delete('new')
+        self.assertIsNone(cache.get('new'))
+        cache.set('short', 1, timeout=0.05)
+        time.sleep(0.06)
+        self.assertIsNone(cache.get('short'))
+        self.assertTrue(cache.add('short', 2))
+        self.assertFalse(cache.touch('missing'))
+        self.assertTrue(cache.touch('key', timeout=None))
+        cache.clear()
+        self.assertEqual(cache.stats(), {'entries': 0, 'size': 0})
+
+    def test_shared_between_processes(self):
+        """Значения и счётчики общие для разных процессов."""
+        self.cache.set('counter', 1)
+        subprocess.run(
+            [sys.executable, '-c', WRITER, self.path],
+            cwd=settings.BASE_DIR, check=True)
+        self.assertEqual(self.cache.get('shared'), 'из другого процесса')
+        self.assertEqual(self.cache.get('counter'), 2)
+
+    def test_incr_is_atomic(self):
+        """Одновременные incr из разных потоков не теряют приращений."""
+        self.cache.set('counter', 0)
+
+        def increment():
+            for _ in range(50):
+                self.cache.incr('counter')
+
+        threads = [threading.Thread(target=increment) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.cache.get('counter'), 200)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_lru_eviction_by_size(self):
+        """Сверх MAX_SIZE вытесняются давно не читанные записи."""
+        cache = SQLiteCache(self.path, {'OPTIONS': {
+            'MAX_SIZE': 10 * 1100, 'TOUCH_INTERVAL': 0}})
+        value = 'x' * 1000
+        for number in range(5):
+            cache.set(f'key{number}', value)
+        time.sleep(0.01)
+        cache.get('key0')
+        for number in range(5, 12):
+            cache.set(f'key{number}', value)
+        self.assertLessEqual(cache.stats()['size'], 10 * 1100)
+        self.assertEqual(cache.get('key0'), value)
+        self.assertIsNone(cache.get('key1'))
+        self.assertEqual(cache.get('key11'), value)
+
+    def test_evictions_and_scan(self):
+        """Вытеснения считаются по пространствам имён, scan отдаёт ключи
+        без префикса с размерами значений."""
+        cache = SQLiteCache(self.path, {'OPTIONS': {'MAX_ENTRIES': 10}})
+        before = cache_backends.EVICTIONS['feed']
+        for number in range(12):
+            cache.set(f'feed:1:index:{number}', number)
+        self.assertGreater(cache_backends.EVICTIONS['feed'], before)
+        keys = dict(cache.scan())
+        self.assertIn('feed:1:index:11', keys)
+        self.assertEqual(len(list(cache.scan(sample=3))), 3)
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'near-cache-test',
+    },
+})
+class NearCacheTest(SimpleTestCase):
+    def setUp(self):
+        caches['shared'].clear()
+        # Два экземпляра над одним общим кешем — как два рабочих процесса.
+        self.first = self.near()
+        self.second = self.near()
+
+    @staticmethod
+    def near(**options):
+        options.setdefault('SYNC_INTERVAL', 0)
+        return NearCache('shared', {'OPTIONS': options})
+
+    def test_reads_are_served_from_memory(self):
+        """Повторное чтение не обращается к общему кешу."""
+        self.first.set('key', 'значение')
+        self.assertEqual(self.second.get('key'), 'значение')
+        caches['shared'].delete('key')
+        self.assertEqual(self.second.get('key'), 'значение')
+        stats = self.second.stats()
+        self.assertEqual(stats['near']['hits'], 1)
+        self.assertEqual(stats['shared']['hits'], 1)
+        self.assertEqual(stats['near']['hit_ratio'], 0.5)
+
+    def test_writes_invalidate_other_workers(self):
+        """set, incr и delete в одном процессе видны в другом."""
+        self.first.set('key', 1)
+        self.first.set('counter', 1)
+        self.assertEqual(self.second.get_many(['key', 'counter']),
+                         {'key': 1, 'counter': 1})
+        self.first.set('key', 2)
+        self.first.incr('counter')
+        self.assertEqual(self.second.get('key'), 2)
+        self.assertEqual(self.second.get('counter'), 2)
+        self.first.delete('key')
+        self.assertIsNone(self.second.get('key'))
+        self.assertEqual(self.second.stats()['invalidations'], 3)
+
+    def test_clear_and_broken_journal_reset_memory(self):
+        """Очистка кеша или потерянный журнал сбрасывают локальный уровень."""
+        self.first.set('key', 1)
+        self.second.get('key')
+        self.first.clear()
+        self.assertIsNone(self.second.get('key'))
+        self.first.set('key', 2)
+        self.second.get('key')
+        for number in range(3):
+            self.first.set(f'other{number}', number)
+        caches['shared'].delete('nearcache:journal:5')
+        self.assertEqual(self.second.get('key'), 2)
+        self.assertEqual(self.second.stats()['resets'], 2)
+
+    def test_sync_interval_and_bounds(self):
+        """Журнал читается не чаще SYNC_INTERVAL, память ограничена
+        MAX_ENTRIES и LOCAL_TIMEOUT."""
+        lazy = self.near(SYNC_INTERVAL=60)
+        self.first.set('key', 1)
+        lazy.get('key')
+        self.first.set('key', 2)
+        self.assertEqual(lazy.get('key'), 1)
+        small = self.near(MAX_ENTRIES=2, LOCAL_TIMEOUT=0.05)
+        for number in range(3):
+            self.first.set(f'key{number}', number)
+            small.get(f'key{number}')
+        self.assertEqual(small.stats()['near']['entries'], 2)
+        time.sleep(0.06)
+        small.get('key2')
+        self.assertEqual(small.stats()['near']['hits'], 0)
+
+    def test_mutable_values_are_copied(self):
+        """Изменение прочитанного или записанного значения не меняет
+        значение в кеше."""
+        value = {'posts': [1, 2]}
+        self.first.set('key', value)
+        value['posts'].append(3)
+        self.first.get('key')['posts'].append(4)
+        self.assertEqual(self.first.get('key'), {'posts': [1, 2]})
+        self.second.get_many(['key'])['key']['posts'].clear()
+        self.assertEqual(self.second.get('key'), {'posts': [1, 2]})
+
+    def test_local_copy_expires_with_shared_entry(self):
+        """Прочитанное из SQLiteCache значение хранится локально не
+        дольше, чем живёт запись в общем кеше."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        with self.settings(CACHES={'shared': {
+            'BACKEND': 'core.cache_backends.SQLiteCache',
+            'LOCATION': f'{directory}/cache.sqlite3',
+        }}):
+            self.addCleanup(caches['shared'].close)
+            caches['shared'].set('key', 'значение', timeout=0.05)
+            near = self.near(LOCAL_TIMEOUT=60)
+            self.assertEqual(near.get('key'), 'значение')
+            time.sleep(0.06)
+            self.assertIsNone(near.get('key'))
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'instrumented-cache-test',
+    },
+})
+class InstrumentedCacheTest(SimpleTestCase):
+    def setUp(self):
+        caches['shared'].clear()
+        self.cache = InstrumentedCache('shared', {'OPTIONS': {
+            'SAMPLE_RATE': 1, 'LARGEST': 2, 'PUBLISH_INTERVAL': 60}})
+
+    def test_namespaces(self):
+        """Фрагменты {% cache %} различаются по имени, блокировки и
+        сессии — отдельные пространства."""
+        cases = {
+            make_template_fragment_key('index_page', [1]):
+                'template.cache.index_page',
+            'feed:2:7:index:1': 'feed',
+            'feed:2:7:index:1:lock': 'feed:lock',
+            'sorl-thumbnail||image||abc': 'sorl-thumbnail',
+            'django.contrib.sessions.cacheabc': 'sessions',
+        }
+        for key, expected in cases.items():
+            with self.subTest(key=key):
+                self.assertEqual(namespace(key), expected)
+
+    def test_counters(self):
+        """Попадания, промахи, записи и байты по пространствам имён."""
+        cache = self.cache
+        cache.get('feed:1')
+        cache.set('feed:1', 'x' * 1000)
+        cache.get('feed:1')
+        cache.set_many({'card:1': 'a', 'card:2': 'b'})
+        self.assertEqual(cache.get_many(['card:1', 'card:3']), {'card:1': 'a'})
+        cache.delete('card:2')
+        namespaces = cache.stats()['process']['namespaces']
+        self.assertEqual(namespaces['feed']['hits'], 1)
+        self.assertEqual(namespaces['feed']['misses'], 1)
+        self.assertEqual(namespaces['feed']['hit_ratio'], 0.5)
+        self.assertGreater(namespaces['feed']['bytes_written'], 1000)
+        self.assertEqual(namespaces['card']['sets'], 2)
+        self.assertEqual(namespaces['card']['deletes'], 1)
+        largest = cache.stats()['process']['largest']
+        self.assertEqual(len(largest), 2)
+        self.assertEqual(largest[0]['key'], 'feed:1')
+
+    def test_processes_are_merged(self):
+        """Снимки процессов складываются, наибольший размер — максимум."""
+        self.cache.set('feed:1', 'x' * 100)
+        self.assertTrue(self.cache.publish())
+        snapshot = self.cache.snapshot()
+        other = {
+            'namespaces': {'feed': {'sets': 2, 'max_size': 10}},
+            'evictions': {'feed': 3},
+            'largest': {},
+        }
+        feed = summarize(merge([snapshot, other]))['namespaces']['feed']
+        self.assertEqual(feed['sets'], 3)
+        self.assertEqual(feed['evictions'], 3 + snapshot['evictions'].get(
+            'feed', 0))
+        self.assertGreater(feed['max_size'], 100)
+        self.assertIn(os.getpid(), self.cache.published())
@@ -0,0 +1,104 @@
+import threading
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import cachewarm
+from core.benchmark import persistent_connections
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class CacheWarmingTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.popular = User.objects.create_user(username='popular')
+        cls.prolific = User.objects.create_user(username='prolific')
+        User.objects.create_user(username='reader')
+        for username in ('first', 'second'):
+            Follow.objects.create(
+                user=User.objects.create_user(username=username),
+                author=cls.popular)
+        cls.small = Group.objects.create(
+            title='Маленькая', slug='small', description='')
+        cls.large = Group.objects.create(
+            title='Большая', slug='large', description='')
+        Post.objects.create(author=cls.popular, text='Пост', group=cls.small)
+        Post.objects.bulk_create(
+            Post(author=cls.prolific, text=f'Пост {number}', group=cls.large)
+            for number in range(3))
+
+    def setUp(self):
+        cache.clear()
+
+    def test_targets(self):
+        """Страницы главной, группы по числу постов, авторы по числу
+        подписчиков; пользователи без постов не прогреваются."""
+        self.assertEqual(cachewarm.targets(2, 2, 5), [
+            '/', '/?page=2',
+            reverse('posts:group_list', args=('large',)),
+            reverse('posts:group_list', args=('small',)),
+            reverse('posts:profile', args=('popular',)),
+            reverse('posts:profile', args=('prolific',)),
+        ])
+
+    @override_settings(
+        PAGE_CACHE_ENABLED=True, CACHE_WARMING_HOST='testserver')
+    def test_pages_are_cached(self):
+        """После прогрева страницы отдаются из кеша."""
+        with persistent_connections():
+            results = cachewarm.warm_cache(
+                pages=1, groups=1, profiles=1, workers=1)
+        self.assertEqual([result.status for result in results], [200] * 3)
+        for result in results:
+            with self.subTest(path=result.path):
+                response = Client().get(result.path)
+                self.assertEqual(response['X-Page-Cache'], 'hit')
+
+    def test_bounded_concurrency(self):
+        """Одновременно выполняется не больше workers запросов."""
+        running = []
+        peak = []
+        lock = threading.Lock()
+        barrier = threading.Barrier(2)
+
+        def fetch(client, paths):
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            barrier.wait(timeout=5)
+            with lock:
+                running.pop()
+            return [cachewarm.Result(path, 200, 0) for path in paths]
+
+        paths = [f'/?page={number}' for number in range(1, 8)]
+        with mock.patch('core.cachewarm.fetch', side_effect=fetch):
+            results = cachewarm.warm(paths, workers=2)
+        self.assertEqual([result.path for result in results], paths)
+        self.assertEqual(max(peak), 2)
+
+    def test_scheduler_runs_once_per_interval(self):
+        """Из нескольких процессов за интервал прогревает только один."""
+        with mock.patch('core.cachewarm.warm_cache') as warm_cache:
+            first = cachewarm.Scheduler(None, interval=60)
+            second = cachewarm.Scheduler(None, interval=60)
+            self.assertTrue(first.tick())
+            self.assertFalse(second.tick())
+        warm_cache.assert_called_once_with(None)
+        self.assertIsNone(cachewarm.start_scheduler(None, interval=0))
+
+    def test_command(self):
+        """Команда выводит каждую страницу и итог."""
+        out = StringIO()
+        call_command(
+            'warm_cache', '--pages', '1', '--groups', '1', '--profiles', '0',
+            '--workers', '1', '--invalidate', stdout=out)
+        output = out.getvalue()
+        self.assertIn(reverse('posts:group_list', args=('large',)), output)
+        self.assertIn('Прогрето страниц: 2', output)
@@ -0,0 +1,80 @@
+from django.contrib.auth import get_user_model
+from django.template import Context, Template
+from django.template.base import Origin
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import lazyload
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+LOOP = Template(
+    '{% for comment in comments %}\n{{ comment.author.username }}'
+    '{% endfor %}',
+    origin=Origin('loop.html', template_name='loop.html'))
+
+
+@override_settings(LAZY_RELATIONS='raise')
+class LazyRelationDetectorTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='')
+        cls.post = Post.objects.create(
+            author=cls.user, text='Пост', group=cls.group)
+        Post.objects.create(author=cls.user, text='Ещё пост', group=cls.group)
+        for i in range(2):
+            Comment.objects.create(
+                post=cls.post, author=cls.user, text=f'Комментарий {i}')
+
+    def setUp(self):
+        lazyload.start()
+        self.addCleanup(lazyload.stop)
+
+    def test_loop_in_template_raises(self):
+        """Ленивая загрузка в цикле шаблона указывает шаблон и строку."""
+        with self.assertRaisesMessage(
+                lazyload.LazyRelationError,
+                'posts.Comment.author загружается лениво в цикле: '
+                'loop.html:2'):
+            LOOP.render(Context({'comments': Comment.objects.all()}))
+
+    def test_preloaded_relation_is_allowed(self):
+        """Связи, загруженные через select_related, не считаются."""
+        comments = Comment.objects.select_related('author')
+        LOOP.render(Context({'comments': comments}))
+
+    def test_log_mode(self):
+        """В режиме log обращение записывается в журнал."""
+        with override_settings(LAZY_RELATIONS='log'):
+            with self.assertLogs('yatube.lazyload', 'WARNING'):
+                LOOP.render(Context({'comments': Comment.objects.all()}))
+
+    def test_reverse_relation_in_code(self):
+        """Обратная связь без prefetch_related в цикле кода проекта."""
+        Group.objects.create(title='Ещё группа', slug='other', description='')
+        with self.assertRaisesMessage(lazyload.LazyRelationError,
+                                      'test_lazyload.py'):
+            for group in Group.objects.all():
+                group.posts.count()
+        for group in Group.objects.prefetch_related('posts'):
+            len(group.posts.all())
+
+    def test_outside_request_is_ignored(self):
+        """Вне обработки запроса детектор молчит."""
+        lazyload.stop()
+        LOOP.render(Context({'comments': Comment.objects.all()}))
+
+    def test_admin_changelists(self):
+        """Списки объектов в админке не загружают связи по одной."""
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        client = Client()
+        client.force_login(admin)
+        for model in ('post', 'comment', 'group'):
+            with self.subTest(model=model):
+                response = client.get(
+                    reverse(f'admin:posts_{model}_changelist'))
+                self.assertEqual(response.status_code, 200)
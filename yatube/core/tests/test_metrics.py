@@ -0,0 +1,102 @@
+import json
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+User = get_user_model()
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'core.cache_backends.NearCache',
+        'LOCATION': 'shared',
+        'OPTIONS': {'SYNC_INTERVAL': 0},
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'metrics-test',
+    },
+})
+class MetricsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.user = User.objects.create_user(username='auth')
+
+    def test_staff_only(self):
+        """Метрики доступны только сотрудникам."""
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_cache_tiers(self):
+        """В метриках есть попадания обоих уровней кеша."""
+        client = Client()
+        client.force_login(self.staff)
+        client.get(reverse('posts:index'))
+        client.get(reverse('posts:index'))
+        metrics = client.get(reverse('metrics')).json()
+        near = metrics['caches']['default']
+        self.assertEqual(near['pid'], metrics['pid'])
+        self.assertGreater(near['near']['hits'], 0)
+        self.assertIn('hit_ratio', near['shared'])
+
+
+class CacheStatsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        settings = override_settings(CACHES={
+            'default': {
+                'BACKEND': 'core.cache_backends.InstrumentedCache',
+                'LOCATION': 'shared',
+                'OPTIONS': {'SAMPLE_RATE': 1},
+            },
+            'shared': {
+                'BACKEND': 'core.cache_backends.SQLiteCache',
+                'LOCATION': f'{directory}/cache.sqlite3',
+            },
+        })
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    @override_settings(CARD_CACHE_ENABLED=True)
+    def test_namespaces_in_metrics(self):
+        """/metrics/ показывает обращения к кешу по пространствам имён."""
+        client = Client()
+        client.force_login(self.staff)
+        client.get(reverse('posts:index'))
+        client.get(reverse('posts:index'))
+        stats = client.get(reverse('metrics')).json()['caches']['default']
+        index_page = stats['process']['namespaces'][
+            'template.cache.index_page']
+        self.assertEqual(index_page['hits'], 1)
+        self.assertEqual(index_page['misses'], 1)
+        self.assertEqual(stats['all']['namespaces'], stats['process'][
+            'namespaces'])
+
+    def test_command(self):
+        """cache_stats выводит счётчики и содержимое хранилища."""
+        caches['default'].set('feed:1', 'x' * 2000)
+        caches['default'].get('feed:1')
+        out = StringIO()
+        call_command('cache_stats', '--json', '--sample', '0', stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['counters']['namespaces']['feed']['hits'], 1)
+        storage = report['storage']['shared']
+        self.assertEqual(storage['namespaces']['feed']['entries'], 1)
+        self.assertEqual(storage['largest'][0]['key'], 'feed:1')
+        out = StringIO()
+        call_command('cache_stats', stdout=out)
+        self.assertIn('Самые большие записи', out.getvalue())
@@ -0,0 +1,123 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import pagecache
+from posts import trending
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+def run_now(task):
+    task()
+
+
+@override_settings(PAGE_CACHE_ENABLED=True)
+class AnonymousPageCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='')
+        cls.post = Post.objects.create(
+            author=cls.user, text='Первый пост', group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    @override_settings(TRENDING_ENABLED=True, TRENDING_FLUSH_INTERVAL=None)
+    def test_anonymous_pages_are_cached(self):
+        """Повторный анонимный запрос отдаётся из кеша без запросов к БД."""
+        trending._local['expires'] = 0
+        self.addCleanup(trending._local.update, expires=0)
+        trending.record_view(self.post.pk)
+        trending.flush()
+        urls = (
+            reverse('posts:trending'),
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.user.username,)),
+            reverse('posts:post_detail', args=(self.post.pk,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.guest_client.get(url)
+                self.assertEqual(first['X-Page-Cache'], 'miss')
+                with self.assertNumQueries(0):
+                    second = self.guest_client.get(url)
+                self.assertEqual(second['X-Page-Cache'], 'hit')
+                self.assertEqual(second.content, first.content)
+                self.assertEqual(
+                    second['Content-Type'], first['Content-Type'])
+
+    def test_authorized_requests_bypass_cache(self):
+        """Пользователь с сессией всегда получает свежую страницу."""
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('X-Page-Cache'))
+
+    def test_writes_invalidate_pages(self):
+        """Запись поста, комментария или группы сбрасывает кеш страниц."""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        self.guest_client.get(url)
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Новый комментарий')
+        response = self.guest_client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Новый комментарий')
+        self.group.title = 'Переименованная группа'
+        self.group.save()
+        response = self.guest_client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Переименованная группа')
+
+    def test_comment_delete_and_author_rename_invalidate_pages(self):
+        """Удаление комментария и смена имени автора сбрасывают кеш
+        страниц, а вход автора — нет."""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        comment = Comment.objects.create(
+            post=self.post, author=self.user, text='Лишний комментарий')
+        self.guest_client.get(url)
+        comment.delete()
+        response = self.guest_client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertNotContains(response, 'Лишний комментарий')
+        Client().force_login(self.user)
+        response = self.guest_client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.user.first_name = 'Переименованный'
+        self.user.save()
+        response = self.guest_client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Переименованный')
+
+    @override_settings(PAGE_CACHE_TIMEOUT=0)
+    @mock.patch('core.pagecache.schedule', side_effect=run_now)
+    def test_stale_page_is_served_while_refreshing(self, schedule):
+        """Устаревшая страница отдаётся сразу, обновление идёт в фоне."""
+        url = reverse('posts:profile', args=(self.user.username,))
+        self.guest_client.get(url)
+        Post.objects.filter(pk=self.post.pk).update(text='Обновлённый пост')
+        response = self.guest_client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'stale')
+        self.assertContains(response, 'Первый пост')
+        schedule.assert_called_once()
+        response = self.guest_client.get(url)
+        self.assertContains(response, 'Обновлённый пост')
+
+    @override_settings(PAGE_CACHE_TIMEOUT=0)
+    @mock.patch('core.pagecache.schedule')
+    def test_single_refresh(self, schedule):
+        """Пока страница обновляется, новые обновления не запускаются."""
+        url = reverse('posts:index')
+        self.guest_client.get(url)
+        for _ in range(3):
+            self.guest_client.get(url)
+        schedule.assert_called_once()
+        self.assertEqual(pagecache.generation(), 1)
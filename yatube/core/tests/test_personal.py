@@ -0,0 +1,81 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(PAGE_CACHE_ENABLED=True, PAGE_SHELL_ENABLED=True)
+class PageShellTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.follower = User.objects.create_user(username='follower')
+        Follow.objects.create(user=cls.follower, author=cls.author)
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='')
+        cls.post = Post.objects.create(
+            author=cls.author, text='Пост', group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.clients = {}
+        for user in (self.author, self.reader, self.follower):
+            client = Client()
+            client.force_login(user)
+            self.clients[user.username] = client
+        self.clients['guest'] = Client()
+
+    def test_post_detail_is_shared(self):
+        """Одна оболочка поста, правка — только автору, форма
+        комментария — всем вошедшим, каждому со своим CSRF-токеном."""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        edit = reverse('posts:post_edit', args=(self.post.pk,))
+        author = self.clients['author'].get(url)
+        self.assertEqual(author['X-Page-Cache'], 'miss')
+        self.assertContains(author, edit)
+        self.assertContains(author, 'csrfmiddlewaretoken')
+        self.assertNotContains(author, '<!--personal')
+        reader = self.clients['reader'].get(url)
+        self.assertEqual(reader['X-Page-Cache'], 'hit')
+        self.assertNotContains(reader, edit)
+        self.assertContains(reader, 'Пользователь:<br>')
+        self.assertContains(reader, reverse('posts:profile', args=('reader',)))
+        self.assertContains(reader, 'csrfmiddlewaretoken')
+        self.assertIn('csrftoken', reader.cookies)
+        guest = self.clients['guest'].get(url)
+        self.assertEqual(guest['X-Page-Cache'], 'hit')
+        self.assertNotContains(guest, 'csrfmiddlewaretoken')
+        self.assertContains(guest, reverse('users:login'))
+
+    def test_follow_button(self):
+        """Кнопка подписки своя у каждого пользователя."""
+        url = reverse('posts:profile', args=(self.author.username,))
+        unfollow = reverse('posts:profile_unfollow', args=('author',))
+        follow = reverse('posts:profile_follow', args=('author',))
+        self.assertContains(self.clients['follower'].get(url), unfollow)
+        response = self.clients['reader'].get(url)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertContains(response, follow)
+        response = self.clients['author'].get(url)
+        self.assertNotContains(response, follow)
+        self.assertNotContains(response, unfollow)
+
+    def test_same_markup_as_inline_rendering(self):
+        """Заполненная оболочка совпадает со страницей без меток."""
+        url = reverse('posts:group_list', args=(self.group.slug,))
+        client = self.clients['follower']
+        with override_settings(PAGE_SHELL_ENABLED=False,
+                               PAGE_CACHE_ENABLED=False):
+            inline = client.get(url).content
+        self.assertEqual(client.get(url).content, inline)
+        self.assertEqual(client.get(url)['X-Page-Cache'], 'hit')
+
+    def test_header_highlights_current_page(self):
+        """Шапка подсвечивает текущий раздел и вне кеша страниц."""
+        response = self.clients['guest'].get(reverse('about:author'))
+        self.assertContains(response, 'active')
@@ -0,0 +1,64 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+TEMP_PROFILING_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+@override_settings(PROFILING_DIR=TEMP_PROFILING_DIR)
+class ProfilingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.user = User.objects.create_user(username='user')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_PROFILING_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        shutil.rmtree(TEMP_PROFILING_DIR, ignore_errors=True)
+
+    def get(self, user, **headers):
+        client = Client()
+        client.force_login(user)
+        return client.get(
+            reverse('posts:profile', args=(user.username,)), **headers)
+
+    def test_staff_header_triggers_profile(self):
+        """Сотрудник получает профиль по заголовку X-Profile."""
+        response = self.get(self.staff, HTTP_X_PROFILE='1')
+        self.assertTrue(response['X-Profile'].startswith('posts.profile/'))
+        output = StringIO()
+        call_command('profile_flamegraph', 'posts:profile',
+                     stdout=output, stderr=StringIO())
+        self.assertIn('profile (posts/views.py:', output.getvalue())
+        for line in output.getvalue().splitlines():
+            self.assertRegex(line, r'^\S.* \d+$')
+
+    def test_header_is_ignored_for_regular_users(self):
+        """Обычному пользователю заголовок X-Profile недоступен."""
+        response = self.get(self.user, HTTP_X_PROFILE='1')
+        self.assertFalse(response.has_header('X-Profile'))
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_sampled_requests_are_profiled(self):
+        """Запросы из выборки профилируются без заголовка."""
+        response = self.get(self.user)
+        self.assertFalse(response.has_header('X-Profile'))
+        call_command('profile_flamegraph', stdout=StringIO(),
+                     stderr=StringIO(), output=f'{TEMP_PROFILING_DIR}/out')
+        with open(f'{TEMP_PROFILING_DIR}/out') as result:
+            self.assertIn('posts/views.py', result.read())
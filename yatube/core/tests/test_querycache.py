@@ -0,0 +1,80 @@
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+
+from core.querycache import cached
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(QUERY_CACHE_ENABLED=True)
+class QueryCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='')
+        Post.objects.create(author=cls.user, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_repeated_query_is_cached(self):
+        """Повторный запрос, get() и count() не обращаются к базе."""
+        groups = cached(Group.objects)
+        self.assertEqual(groups.get(slug='group'), self.group)
+        self.assertEqual(groups.count(), 1)
+        self.assertEqual(
+            list(groups.values_list('slug', flat=True)), ['group'])
+        with self.assertNumQueries(0):
+            self.assertEqual(groups.get(slug='group'), self.group)
+            self.assertEqual(groups.count(), 1)
+            self.assertEqual(
+                list(groups.values_list('slug', flat=True)), ['group'])
+        with self.assertNumQueries(1):
+            self.assertEqual(list(groups.values_list('slug')), [('group',)])
+
+    def test_writes_bump_versions(self):
+        """save(), update(), delete() и сырой SQL сбрасывают кеш таблицы."""
+        groups = cached(Group.objects.filter(slug='group'))
+        writes = (
+            lambda: Group.objects.create(title='Другая', slug='other'),
+            lambda: Group.objects.filter(pk=self.group.pk).update(
+                title='Новое название'),
+            lambda: connection.cursor().execute(
+                'UPDATE posts_group SET description = %s', ['Описание']),
+        )
+        for write in writes:
+            with self.subTest(write=write):
+                list(groups.all())
+                write()
+                with self.assertNumQueries(1):
+                    list(groups.all())
+        group = groups.get()
+        self.assertEqual(group.title, 'Новое название')
+        self.assertEqual(group.description, 'Описание')
+        Group.objects.filter(slug='group').delete()
+        self.assertFalse(groups.exists())
+        self.assertEqual(groups.count(), 0)
+
+    def test_joined_tables_and_commit(self):
+        """Запрос сбрасывается записью в любую прочитанную им таблицу, в
+        том числе после фиксации транзакции."""
+        author = User.objects.create_user(username='author')
+        Post.objects.create(author=author, text='Пост')
+        feed = cached(Post.objects.filter(
+            author__following__user=self.user))
+        self.assertEqual(feed.count(), 0)
+        with transaction.atomic():
+            Follow.objects.create(user=self.user, author=author)
+        self.assertEqual(feed.count(), 1)
+
+    def test_untracked_tables_are_not_cached(self):
+        """Таблицы вне QUERY_CACHE_TABLES не кешируются."""
+        sessions = cached(Session.objects)
+        list(sessions.all())
+        with self.assertNumQueries(1):
+            list(sessions.all())
@@ -0,0 +1,133 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.http import Http404
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Group, Post
+from posts.resolvers import authors, groups
+
+User = get_user_model()
+
+
+@override_settings(RESOLVER_ENABLED=True, RESOLVER_SYNC_INTERVAL=60)
+class ResolverTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        Post.objects.create(author=cls.author, text='Пост', group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        for resolver in (groups, authors):
+            resolver.clear()
+            self.addCleanup(resolver.clear)
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_lookup_without_queries(self):
+        """Повторный поиск не обращается к базе и даёт новый экземпляр."""
+        group = groups.get('group')
+        group.title = 'Изменено в представлении'
+        with self.assertNumQueries(0):
+            again = groups.get('group')
+        self.assertEqual(again, self.group)
+        self.assertEqual(again.title, 'Группа')
+        authors.get('author')
+        with self.assertNumQueries(0):
+            author = authors.get('author')
+        self.assertEqual(author.get_full_name(), 'Лев Толстой')
+        with self.assertRaises(Http404):
+            groups.get_or_404('missing')
+
+    def test_views_skip_lookup(self):
+        """Страницы группы и профиля, подписка и отписка не ищут группу
+        и автора в базе, когда они уже есть в кеше."""
+        lookups = (
+            ('posts:group_list', 'group', '"posts_group"."slug" ='),
+            ('posts:profile', 'author', '"auth_user"."username" ='),
+            ('posts:profile_follow', 'author', '"auth_user"."username" ='),
+            ('posts:profile_unfollow', 'author', '"auth_user"."username" ='),
+        )
+        groups.get('group')
+        authors.get('author')
+        for name, arg, lookup in lookups:
+            with self.subTest(name=name):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(reverse(name, args=(arg,)))
+                self.assertIn(response.status_code, (200, 302))
+                self.assertFalse(
+                    [query for query in queries if lookup in query['sql']])
+
+    def test_save_and_delete_invalidate(self):
+        """Изменение и удаление объекта сразу видны в своём процессе."""
+        groups.get('group')
+        self.group.title = 'Новое название'
+        self.group.save()
+        self.assertEqual(groups.get('group').title, 'Новое название')
+        authors.get('author')
+        self.author.username = 'writer'
+        self.author.save()
+        with self.assertRaises(User.DoesNotExist):
+            authors.get('author')
+        self.assertEqual(authors.get('writer'), self.author)
+        self.group.delete()
+        with self.assertRaises(Group.DoesNotExist):
+            groups.get('group')
+
+    def test_login_keeps_cache(self):
+        """Сохранение last_login при входе не очищает кеш авторов."""
+        authors.get('author')
+        Client().force_login(self.author)
+        with self.assertNumQueries(0):
+            authors.get('author')
+
+    def test_other_process_invalidation(self):
+        """Версия в общем кеше очищает кеш других процессов."""
+        groups.get('group')
+        Group.objects.filter(pk=self.group.pk).update(title='Обновлено')
+        cache.incr(groups.version_key)
+        with self.assertNumQueries(0):
+            self.assertEqual(groups.get('group').title, 'Группа')
+        with override_settings(RESOLVER_SYNC_INTERVAL=0):
+            self.assertEqual(groups.get('group').title, 'Обновлено')
+
+    @override_settings(RESOLVER_MAX_ENTRIES=1)
+    def test_bounded(self):
+        """Кеш хранит не больше RESOLVER_MAX_ENTRIES записей."""
+        authors.get('author')
+        authors.get('reader')
+        self.assertEqual(list(authors.entries), ['reader'])
+
+
+@override_settings(RESOLVER_ENABLED=True, RESOLVER_SYNC_INTERVAL=60)
+class DeletedAuthorTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        authors.clear()
+        self.addCleanup(authors.clear)
+
+    def test_follow_deleted_author(self):
+        """Подписка на автора, удалённого в другом процессе, пока кеш
+        авторов не сверился, даёт 404, а не ошибку сервера."""
+        user = User.objects.create_user(username='reader')
+        author = User.objects.create_user(username='author')
+        authors.get('author')
+        # Удаление в другом процессе: сигналы этого процесса о нём не
+        # знают.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'DELETE FROM auth_user WHERE id = %s', [author.pk])
+        client = Client()
+        client.force_login(user)
+        response = client.get(
+            reverse('posts:profile_follow', args=('author',)))
+        self.assertEqual(response.status_code, 404)
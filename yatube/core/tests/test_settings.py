@@ -0,0 +1,70 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+INSPECT = '''
+import json
+from yatube import settings
+print(json.dumps({
+    'debug': settings.DEBUG,
+    'apps': settings.INSTALLED_APPS,
+    'middleware': settings.MIDDLEWARE,
+    'loaders': settings.TEMPLATES[0]['OPTIONS'].get('loaders'),
+    'app_dirs': settings.TEMPLATES[0]['APP_DIRS'],
+    'conn_max_age': settings.DATABASES['default']['CONN_MAX_AGE'],
+}))
+'''
+
+
+class SettingsProfileTest(SimpleTestCase):
+    def load(self, **env):
+        environ = {
+            key: value for key, value in os.environ.items()
+            if key not in ('DEBUG', 'SECRET_KEY', 'YATUBE_PROFILE')
+        }
+        environ.update(env)
+        process = subprocess.run(
+            [sys.executable, '-c', INSPECT], cwd=settings.BASE_DIR,
+            env=environ, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            universal_newlines=True)
+        if process.returncode:
+            return process.stderr
+        return json.loads(process.stdout)
+
+    def test_development(self):
+        """По умолчанию включены отладка и debug_toolbar."""
+        loaded = self.load()
+        self.assertTrue(loaded['debug'])
+        self.assertIn('debug_toolbar', loaded['apps'])
+        self.assertIn(
+            'debug_toolbar.middleware.DebugToolbarMiddleware',
+            loaded['middleware'])
+        self.assertEqual(loaded['conn_max_age'], 0)
+
+    def test_production(self):
+        """В production нет отладочных приложений, шаблоны кешируются,
+        соединения с БД постоянные."""
+        loaded = self.load(YATUBE_PROFILE='production', SECRET_KEY='secret')
+        self.assertFalse(loaded['debug'])
+        self.assertNotIn('debug_toolbar', loaded['apps'])
+        self.assertFalse(any(
+            'debug_toolbar' in middleware
+            for middleware in loaded['middleware']))
+        self.assertIn(
+            'django.contrib.admin.apps.SimpleAdminConfig', loaded['apps'])
+        self.assertFalse(loaded['app_dirs'])
+        [[loader, loaders]] = loaded['loaders']
+        self.assertEqual(loader, 'django.template.loaders.cached.Loader')
+        self.assertIn(
+            'django.template.loaders.app_directories.Loader', loaders)
+        self.assertGreater(loaded['conn_max_age'], 0)
+
+    def test_production_requires_secret_key(self):
+        """Без SECRET_KEY production-профиль не загружается."""
+        self.assertIn(
+            'Для production нужен SECRET_KEY',
+            self.load(YATUBE_PROFILE='production'))
@@ -0,0 +1,88 @@
+import json
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.queries import fingerprint, normalize
+from posts.models import Post
+
+TEMP_LOG_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SLOW_QUERY_LOG = f'{TEMP_LOG_DIR}/slow.log'
+
+User = get_user_model()
+
+
+class FingerprintTest(TestCase):
+    def test_values_are_normalized(self):
+        """Отпечаток не зависит от значений параметров и литералов."""
+        self.assertEqual(
+            normalize("SELECT * FROM t WHERE a IN (%s, %s) AND b = 'x'\n"
+                      "LIMIT 21"),
+            'SELECT * FROM t WHERE a IN (...) AND b = ? LIMIT ?')
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE a IN (%s, %s, %s)'),
+            fingerprint('SELECT * FROM t WHERE a IN (1)'))
+        self.assertNotEqual(
+            fingerprint('SELECT * FROM t1'), fingerprint('SELECT * FROM t2'))
+
+
+@override_settings(SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_LOG=SLOW_QUERY_LOG)
+class SlowQueryLogTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_LOG_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        shutil.rmtree(TEMP_LOG_DIR, ignore_errors=True)
+
+    def entries(self):
+        with open(SLOW_QUERY_LOG) as log:
+            return [json.loads(line) for line in log]
+
+    def test_queries_are_logged_with_view_and_plan(self):
+        """В журнал попадают view, отпечаток и план выполнения."""
+        Client().get(reverse('posts:post_detail', args=(self.post.pk,)))
+        entries = self.entries()
+        self.assertTrue(entries)
+        entry = next(entry for entry in entries
+                     if 'FROM "posts_comment"' in entry['sql'])
+        self.assertEqual(entry['view'], 'posts:post_detail')
+        self.assertEqual(entry['fingerprint'], fingerprint(entry['sql']))
+        self.assertTrue(entry['plan'])
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=None)
+    def test_disabled(self):
+        """При пороге None журнал не ведётся."""
+        Client().get(reverse('posts:index'))
+        with self.assertRaises(FileNotFoundError):
+            self.entries()
+
+    def test_report_groups_by_fingerprint(self):
+        """Отчёт объединяет одинаковые запросы разных обращений."""
+        client = Client()
+        for _ in range(3):
+            client.get(reverse('posts:post_detail', args=(self.post.pk,)))
+        output = StringIO()
+        call_command('slow_query_report', json=True, stdout=output)
+        groups = json.loads(output.getvalue())
+        comments = next(group for group in groups
+                        if 'FROM "posts_comment"' in group['sql'])
+        self.assertEqual(comments['count'], 3)
+        self.assertEqual(comments['views'], {'posts:post_detail': 3})
+        call_command('slow_query_report', view='posts:post_detail',
+                     stdout=StringIO())
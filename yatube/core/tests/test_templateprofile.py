@@ -0,0 +1,99 @@
+import json
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import templateprofile
+from posts.models import Post
+
+TEMP_LOG_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+TEMPLATE_PROFILE_LOG = f'{TEMP_LOG_DIR}/templates.log'
+
+User = get_user_model()
+
+
+class TemplateProfileTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        templateprofile.install()
+
+    def test_labels_and_own_time(self):
+        """Теги и фильтры учитываются отдельно, вложенное время
+        не входит в собственное время родителя."""
+        template = Template(
+            '{% for i in items %}{{ i|upper }}{% endfor %}')
+        with templateprofile.TemplateProfile() as profile:
+            template.render(Context({'items': ['a', 'b', 'c']}))
+        rows = {row['label']: row for row in profile.rows()}
+        self.assertEqual(rows['filter:upper']['calls'], 3)
+        self.assertEqual(rows['tag:for']['calls'], 1)
+        self.assertEqual(rows['template:<string>']['calls'], 1)
+        self.assertLessEqual(
+            rows['tag:for']['own_ms'], rows['tag:for']['total_ms'])
+        self.assertGreaterEqual(
+            rows['template:<string>']['total_ms'],
+            rows['tag:for']['total_ms'])
+
+    def test_no_profile_outside_context(self):
+        """Без открытого профиля отрисовка не учитывается."""
+        profile = templateprofile.TemplateProfile()
+        Template('{{ value|upper }}').render(Context({'value': 'a'}))
+        self.assertFalse(profile.calls)
+
+
+@override_settings(
+    TEMPLATE_PROFILING=True, TEMPLATE_PROFILE_LOG=TEMPLATE_PROFILE_LOG)
+class TemplateProfileMiddlewareTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        templateprofile.install()
+        cls.user = User.objects.create_user(username='auth')
+        Post.objects.create(author=cls.user, text='Пост')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_LOG_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        shutil.rmtree(TEMP_LOG_DIR, ignore_errors=True)
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_includes_and_custom_filters(self):
+        """В журнале есть шаблоны, подключения и фильтр addclass."""
+        response = self.client.get(reverse('posts:post_create'))
+        self.assertIn('filter:addclass', response['Server-Timing'])
+        self.client.get(reverse('posts:index'))
+        with open(TEMPLATE_PROFILE_LOG) as log:
+            entries = [json.loads(line) for line in log]
+        self.assertEqual(
+            [entry['view'] for entry in entries],
+            ['posts:post_create', 'posts:index'])
+        labels = {row['label'] for row in entries[1]['rows']}
+        for label in ('template:posts/index.html', 'template:base.html',
+                      'template:posts/includes/post_obj.html',
+                      'tag:singleflight', 'tag:url'):
+            with self.subTest(label=label):
+                self.assertIn(label, labels)
+
+    def test_report(self):
+        """Сводка суммирует вызовы по всем запросам."""
+        for _ in range(2):
+            self.client.get(reverse('posts:post_create'))
+        output = StringIO()
+        call_command('template_profile_report', json=True, stdout=output)
+        rows = {row['label']: row for row in json.loads(output.getvalue())}
+        self.assertEqual(rows['template:posts/create_post.html']['calls'], 2)
+        self.assertEqual(rows['filter:addclass']['requests'], 2)
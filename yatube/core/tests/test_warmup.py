@@ -0,0 +1,61 @@
+import logging
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.test import TestCase
+
+from core import warmup
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class WarmUpTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='auth')
+        group = Group.objects.create(
+            title='Группа', slug='group', description='')
+        Post.objects.create(author=user, text='Пост', group=group)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_all_steps_are_reported(self):
+        """Прогрев выполняет все шаги и сообщает их длительность."""
+        timings = warmup.warm_up()
+        self.assertEqual(
+            list(timings),
+            ['templates', 'urls', 'thumbnails', 'pages', 'total'])
+
+    def test_timings_reach_console(self):
+        """Длительность прогрева доходит до обработчика из LOGGING в
+        settings.py, а не теряется на уровне WARNING по умолчанию."""
+        with mock.patch.object(logging.StreamHandler, 'emit') as emit:
+            warmup.warm_up()
+        records = [call.args[0] for call in emit.call_args_list]
+        self.assertIn(
+            ('yatube.warmup', logging.INFO),
+            [(record.name, record.levelno) for record in records])
+
+    def test_index_cache_is_primed(self):
+        """После прогрева главная страница уже лежит в кеше."""
+        warmup.prime_pages(None, groups=1)
+        self.assertIsNotNone(cache.get(make_template_fragment_key(
+            'index_page', ['<Page 1 of 1>'])))
+
+    def test_every_url_name_is_resolved(self):
+        """Адреса с параметрами строятся по типам конвертеров."""
+        names = dict(warmup.url_names())
+        for name in ('posts:index', 'posts:post_detail', 'posts:profile',
+                     'users:signup', 'about:author'):
+            with self.subTest(name=name):
+                self.assertIn(name, names)
+        self.assertGreaterEqual(warmup.resolve_urls(), len(
+            [name for name in names if name.startswith('posts:')]))
+
+    def test_templates_are_compiled(self):
+        """Компилируются все шаблоны проекта."""
+        self.assertGreater(warmup.compile_templates(), 20)
@@ -1,3 +1,9 @@
+import os
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.cache import caches
+from django.http import JsonResponse
 from django.shortcuts import render
 
 
@@ -15,3 +21,16 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+@staff_member_required
+def metrics(request):
+    """Состояние кешей в обработавшем запрос рабочем процессе."""
+    return JsonResponse({
+        'pid': os.getpid(),
+        'caches': {
+            alias: caches[alias].stats()
+            for alias in settings.CACHES
+            if hasattr(caches[alias], 'stats')
+        },
+    }, json_dumps_params={'ensure_ascii': False})
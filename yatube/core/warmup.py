@@ -0,0 +1,132 @@
+"""Прогрев рабочего процесса сразу после запуска.
+
+Первые запросы нового процесса платят за заполнение URL-резолвера,
+компиляцию шаблонов, инициализацию sorl-thumbnail и пустой кеш. Прогрев
+делает эту работу заранее: компилирует все шаблоны из ``templates/``,
+строит и разрешает адрес для каждого имени URL и запрашивает главную
+страницу и страницы самых больших групп.
+
+Вызывается из ``yatube/wsgi.py`` при ``WARMUP_ON_BOOT``, а не из
+``AppConfig.ready``: ``ready`` выполняется и для команд manage.py, в том
+числе до создания таблиц в базе.
+"""
+import logging
+import os
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.template import engines
+from django.urls import (
+    NoReverseMatch, URLResolver, get_resolver, resolve, reverse
+)
+from django.urls.converters import IntConverter
+
+from .benchmark import persistent_connections
+
+logger = logging.getLogger('yatube.warmup')
+
+
+def template_names(engine):
+    """Имена всех файлов в каталогах шаблонов проекта (DIRS)."""
+    for directory in engine.engine.dirs:
+        for root, _, files in os.walk(directory):
+            for name in files:
+                yield os.path.relpath(os.path.join(root, name), directory)
+
+
+def compile_templates():
+    compiled = 0
+    for engine in engines.all():
+        for name in template_names(engine):
+            engine.get_template(name)
+            compiled += 1
+    return compiled
+
+
+def url_names(patterns=None, namespace=''):
+    """Пары (полное имя URL, конвертеры параметров) всех маршрутов."""
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            prefix = (f'{namespace}{pattern.namespace}:'
+                      if pattern.namespace else namespace)
+            yield from url_names(pattern.url_patterns, prefix)
+        elif pattern.name:
+            converters = getattr(pattern.pattern, 'converters', {})
+            yield namespace + pattern.name, converters
+
+
+def resolve_urls():
+    resolved = 0
+    for name, converters in url_names():
+        kwargs = {
+            key: 1 if isinstance(converter, IntConverter) else 'warmup'
+            for key, converter in converters.items()
+        }
+        try:
+            resolve(reverse(name, kwargs=kwargs))
+        except NoReverseMatch:
+            # Маршруты на регулярных выражениях (админка) с такими
+            # значениями не строятся, их резолвер уже заполнен.
+            continue
+        resolved += 1
+    return resolved
+
+
+def init_thumbnails():
+    from PIL import Image
+    from sorl.thumbnail import default
+
+    # Только основные форматы (JPEG, PNG, GIF, BMP, PPM), как при первом
+    # Image.open; остальные плагины Pillow догрузит, если понадобятся.
+    Image.preinit()
+    for name in ('backend', 'engine', 'kvstore', 'storage'):
+        # Обращение к __class__ создаёт объект за LazyObject.
+        getattr(default, name).__class__
+
+
+def request_host():
+    """Имя хоста из ALLOWED_HOSTS, которое пропустит проверку Host."""
+    for host in settings.ALLOWED_HOSTS:
+        if host != '*':
+            return host.lstrip('.')
+    return 'testserver'
+
+
+def prime_pages(application, groups):
+    from .cachewarm import group_paths, index_paths, warm
+
+    paths = index_paths(1) + group_paths(groups)
+    with persistent_connections():
+        warm(paths, application)
+    return len(paths)
+
+
+def warm_up(application=None, groups=None):
+    """Выполняет шаги прогрева и возвращает их длительность в мс.
+
+    Ошибка одного шага записывается в журнал и не мешает остальным:
+    процесс должен запуститься и без прогрева.
+    """
+    if groups is None:
+        groups = settings.WARMUP_GROUPS
+    steps = OrderedDict([
+        ('templates', compile_templates),
+        ('urls', resolve_urls),
+        ('thumbnails', init_thumbnails),
+        ('pages', lambda: prime_pages(application, groups)),
+    ])
+    timings = OrderedDict()
+    for name, step in steps.items():
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            logger.exception('Шаг прогрева %s не выполнен', name)
+            continue
+        timings[name] = round((time.perf_counter() - started) * 1000, 1)
+    timings['total'] = round(sum(timings.values()), 1)
+    logger.info('Прогрев: %s', timings)
+    return timings
@@ -0,0 +1,67 @@
+"""Буферы с отложенной записью в базу.
+
+Частые мелкие изменения (просмотры, события популярности) копятся в
+памяти процесса, а фоновый поток записывает их пачкой раз в интервал из
+настройки ``interval_setting`` или раньше, по ``wake()``. При падении
+процесса теряется не больше одного интервала; при обычной остановке буфер
+записывается напоследок. Без интервала поток не запускается и буфер
+записывают вызовом ``flush()``, как в тестах.
+"""
+import atexit
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('yatube.writebehind')
+
+
+class WriteBehindBuffer:
+    name = 'write-behind'
+    interval_setting = None
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.pid = None
+        self._reset()
+
+    def _reset(self):
+        """Очищает накопленное; вызывается под self.lock."""
+        raise NotImplementedError
+
+    def flush(self):
+        raise NotImplementedError
+
+    @property
+    def interval(self):
+        return getattr(settings, self.interval_setting)
+
+    def start(self):
+        """Запускает фоновый поток, свой у каждого процесса после fork."""
+        if not self.interval or self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            # Накопленное до fork запишет родитель.
+            self._reset()
+            self.pid = os.getpid()
+        threading.Thread(target=self._run, name=self.name, daemon=True).start()
+        atexit.register(self.flush)
+
+    def wake(self):
+        self.wakeup.set()
+
+    def _run(self):
+        while True:
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Буфер %s не записан', self.name)
+            finally:
+                connections.close_all()
@@ -12,13 +12,17 @@ class PostAdmin(admin.ModelAdmin):
         'group',
     )
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
 
 class GroupAdmin(admin.ModelAdmin):
-    list_display = ('title', 'slug', 'description')
+    list_display = (
+        'title', 'slug', 'description', 'post_count', 'last_post_at')
+    # Счётчики поддерживают сигналы (posts.directory).
+    readonly_fields = ('post_count', 'last_post_at')
 
 
 class CommentAdmin(admin.ModelAdmin):
@@ -1,5 +1,14 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class PostsConfig(AppConfig):
     name = 'posts'
+
+    def ready(self):
+        from . import fragments, signals  # noqa: F401
+
+        if settings.LAZY_RELATIONS:
+            from core import lazyload
+            from .models import Comment, Follow, Group, Post
+            lazyload.watch(Post, Comment, Follow, Group)
@@ -0,0 +1,50 @@
+"""Кеш разметки карточек постов, общий для всех лент.
+
+Одна и та же карточка (posts/includes/post_card.html) выводится на
+главной, в группе, в профиле и в подписках, на любой странице. Она
+кешируется по id поста и версии содержимого: времени изменения поста и
+отпечатку выводимых полей автора и группы. Лента собирается одним
+get_many, отрисовываются только отсутствующие карточки.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import get_template
+
+TEMPLATE = 'posts/includes/post_card.html'
+# Меняется вместе с разметкой карточки.
+VERSION = 1
+
+
+def card_key(post):
+    author = post.author
+    group = post.group
+    related = (
+        author.username, author.get_full_name(),
+        group.slug if group else None, str(group) if group else None,
+    )
+    digest = hashlib.md5(repr(related).encode()).hexdigest()[:12]
+    updated = int(post.updated.timestamp() * 10 ** 6)
+    return f'card:{VERSION}:{post.pk}:{updated}:{digest}'
+
+
+def render_card(post):
+    return get_template(TEMPLATE).render({'post': post})
+
+
+def render_cards(posts):
+    """Список разметки карточек posts в том же порядке."""
+    posts = list(posts)
+    if not settings.CARD_CACHE_ENABLED:
+        return [render_card(post) for post in posts]
+    keys = [card_key(post) for post in posts]
+    cards = cache.get_many(keys)
+    missing = {
+        key: render_card(post)
+        for key, post in zip(keys, posts) if key not in cards
+    }
+    if missing:
+        cache.set_many(missing, settings.CARD_CACHE_TIMEOUT)
+        cards.update(missing)
+    return [cards[key] for key in keys]
@@ -0,0 +1,72 @@
+"""Каталог групп и его счётчики.
+
+Каталог сортируется по числу постов и времени последнего поста, поэтому
+они хранятся прямо в Group (post_count, last_post_at), а не считаются
+агрегатом по постам на каждый запрос. Сигналы обновляют их одним UPDATE
+при публикации и удалении поста и при переносе его в другую группу,
+в том числе пачкой через list_editable в админке постов. Изменения в
+обход сигналов (QuerySet.update, bulk_create) исправляет recount().
+"""
+from django.db.models import (
+    Case, Count, DateTimeField, F, IntegerField, OuterRef, Subquery, Value,
+    When
+)
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Group, Post
+
+SORTS = {
+    'posts': (F('post_count').desc(), 'title'),
+    'recent': (F('last_post_at').desc(nulls_last=True), 'title'),
+    'title': ('title',),
+}
+
+SORT_TITLES = {
+    'posts': 'по числу постов',
+    'recent': 'по последнему посту',
+    'title': 'по названию',
+}
+
+DEFAULT_SORT = 'posts'
+
+
+def latest_post_date():
+    return Subquery(Post.objects.filter(group=OuterRef('pk')).order_by(
+        '-pub_date').values('pub_date')[:1])
+
+
+def post_added(group_id, pub_date):
+    Group.objects.filter(pk=group_id).update(
+        post_count=F('post_count') + 1,
+        last_post_at=Case(
+            When(last_post_at__gte=pub_date, then=F('last_post_at')),
+            default=Value(pub_date, output_field=DateTimeField()),
+            output_field=DateTimeField()))
+
+
+def post_removed(group_id):
+    """Вызывается, когда поста в группе уже нет."""
+    # Разошедшийся со счётом постов счётчик (изменения в обход сигналов)
+    # не должен уходить ниже нуля: иначе CHECK на PositiveIntegerField
+    # не даст удалить пост.
+    Group.objects.filter(pk=group_id).update(
+        post_count=Greatest(F('post_count') - 1, Value(0)),
+        last_post_at=latest_post_date())
+
+
+def recount(groups=None):
+    """Пересчитывает счётчики групп по постам в базе."""
+    if groups is None:
+        groups = Group.objects.all()
+    counts = Post.objects.filter(group=OuterRef('pk')).order_by().values(
+        'group').annotate(total=Count('pk')).values('total')
+    return groups.update(
+        post_count=Coalesce(
+            Subquery(counts, output_field=IntegerField()), Value(0)),
+        last_post_at=latest_post_date())
+
+
+def sorted_groups(sort):
+    if sort not in SORTS:
+        sort = DEFAULT_SORT
+    return sort, Group.objects.order_by(*SORTS[sort])
@@ -0,0 +1,136 @@
+"""Компактный кеш страниц ленты: главной, групп и профилей.
+
+Страница хранится не списком объектов Post (pickle тянет за собой
+``_state``, автора целиком, вместе с хешем пароля, и группу), а кортежами
+только тех полей, которые нужны шаблонам ленты, упакованными ``marshal``.
+Авторы и группы страницы записываются по одному разу, посты ссылаются на
+них по номеру. При чтении из этих кортежей собираются лёгкие неизменяемые
+объекты с тем же интерфейсом, что использует шаблон: ``post.author``,
+``post.group.slug``, ``post.image`` для sorl-thumbnail и так далее.
+
+Ключ включает поколение содержимого из core.pagecache: запись постов и
+групп делает прежние страницы недоступными. Имена авторов в ключ не
+входят и обновляются не позже чем через ``FEED_CACHE_TIMEOUT`` секунд.
+"""
+import marshal
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.paginator import Page, Paginator
+
+from core import pagecache
+from core.cache import get_or_set
+
+# Меняется вместе со структурой записи, чтобы не читать старый формат.
+FORMAT = 2
+
+
+class FeedAuthor(namedtuple('FeedAuthor', 'pk username first_name last_name')):
+    __slots__ = ()
+
+    def __str__(self):
+        return self.username
+
+    def get_full_name(self):
+        return f'{self.first_name} {self.last_name}'.strip()
+
+
+class FeedGroup(namedtuple('FeedGroup', 'pk slug title')):
+    __slots__ = ()
+
+    def __str__(self):
+        return self.title
+
+
+FeedPost = namedtuple(
+    'FeedPost', 'pk text pub_date updated image author group')
+
+
+def page_number(value):
+    """Номер страницы из запроса; непонятное значение — первая страница,
+    как у Paginator.get_page."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 1
+
+
+def timestamp(value):
+    return int(value.timestamp() * 10 ** 6)
+
+
+def from_timestamp(value):
+    return datetime.fromtimestamp(value / 10 ** 6, timezone.utc)
+
+
+def encode(page):
+    authors = {}
+    groups = {}
+    rows = []
+    for post in page:
+        author = post.author
+        if author.pk not in authors:
+            authors[author.pk] = len(authors), (
+                author.pk, author.username, author.first_name,
+                author.last_name)
+        group = -1
+        if post.group_id is not None:
+            if post.group_id not in groups:
+                groups[post.group_id] = len(groups), (
+                    post.group.pk, post.group.slug, post.group.title)
+            group = groups[post.group_id][0]
+        rows.append((
+            post.pk, post.text, timestamp(post.pub_date),
+            timestamp(post.updated), post.image.name or '',
+            authors[author.pk][0], group))
+    return marshal.dumps((
+        FORMAT, page.number, page.paginator.count,
+        [record for _, record in authors.values()],
+        [record for _, record in groups.values()],
+        rows,
+    ))
+
+
+def decode(payload, per_page):
+    _, number, count, authors, groups, rows = marshal.loads(payload)
+    authors = [FeedAuthor(*record) for record in authors]
+    groups = [FeedGroup(*record) for record in groups]
+    posts = [
+        FeedPost(
+            pk, text, from_timestamp(published), from_timestamp(updated),
+            image, authors[author], groups[group] if group >= 0 else None)
+        for pk, text, published, updated, image, author, group in rows
+    ]
+    paginator = Paginator((), per_page)
+    # Число постов известно из записи: запрос COUNT не нужен.
+    paginator.count = count
+    return Page(posts, number, paginator)
+
+
+def get_page(queryset, number, scope, per_page):
+    """Страница ленты scope ('index', 'group:<pk>', 'profile:<pk>').
+
+    Номер приводится к 1..num_pages, как у Paginator.get_page, до выбора
+    ключа: иначе каждый номер за концом ленты заводил бы в кеше свою
+    копию последней страницы. Число страниц берётся из записи первой
+    страницы.
+    """
+    if not settings.FEED_CACHE_ENABLED:
+        return Paginator(queryset, per_page).get_page(number)
+    generation = pagecache.generation()
+
+    def payload(number):
+        return get_or_set(
+            f'feed:{FORMAT}:{generation}:{scope}:{number}',
+            lambda: encode(Paginator(queryset, per_page).get_page(number)),
+            settings.FEED_CACHE_TIMEOUT)
+
+    first = payload(1)
+    number = page_number(number)
+    if number != 1:
+        paginator = Paginator((), per_page)
+        paginator.count = marshal.loads(first)[2]
+        if not 1 <= number <= paginator.num_pages:
+            number = paginator.num_pages
+    return decode(first if number == 1 else payload(number), per_page)
@@ -0,0 +1,62 @@
+"""Персональные фрагменты страниц постов (см. core.personal)."""
+from django.conf import settings
+from django.template.loader import render_to_string
+
+from core.personal import current_user, fragment
+
+from . import trending, viewcounts
+from .models import Follow
+
+
+@fragment('switcher')
+def switcher(request):
+    return render_to_string(
+        'posts/includes/switcher.html', {'user': current_user(request)})
+
+
+@fragment('follow_button')
+def follow_button(request, author_id, username):
+    user = current_user(request)
+    if not user.is_authenticated or str(user.pk) == author_id:
+        return ''
+    following = Follow.objects.filter(
+        user=user, author_id=author_id).exists()
+    return render_to_string('posts/includes/follow_button.html', {
+        'following': following,
+        'username': username,
+    })
+
+
+@fragment('post_actions')
+def post_actions(request, post_id, author_id):
+    if str(current_user(request).pk) != author_id:
+        return ''
+    return render_to_string(
+        'posts/includes/post_actions.html', {'post_id': post_id})
+
+
+@fragment('comment_form')
+def comment_form(request, post_id):
+    if not current_user(request).is_authenticated:
+        return ''
+    return render_to_string(
+        'posts/includes/comment_form.html', {'post_id': post_id},
+        request=request)
+
+
+@fragment('post_views')
+def post_views(request, post_id):
+    """Учитывает просмотр и выводит их число. Фрагмент отрисовывается на
+    каждый запрос, в том числе для страницы из кеша."""
+    post_id = int(post_id)
+    if request.method == 'GET' and settings.TRENDING_ENABLED:
+        trending.record_view(post_id)
+    if not settings.VIEW_COUNTS_ENABLED:
+        return ''
+    if request.method == 'GET':
+        viewcounts.record(post_id)
+    views = viewcounts.count(post_id)
+    if views is None:
+        return ''
+    return render_to_string(
+        'posts/includes/post_views.html', {'views': views})
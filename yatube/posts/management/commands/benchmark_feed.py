@@ -0,0 +1,70 @@
+import json
+import pickle
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.paginator import Paginator
+
+from core.benchmark import measure, summarize
+from posts import feed
+from posts.models import Post
+from posts.views import POSTS_PER_PAGE
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает размер и время распаковки страниц ленты в '
+            'компактном формате posts/feed.py и списком объектов Post '
+            'через pickle.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pages', type=int, default=5,
+            help='Сколько первых страниц главной измерить.'
+        )
+        parser.add_argument('--iterations', type=int, default=2000)
+        parser.add_argument(
+            '--output', help='Куда записать результаты в формате JSON.'
+        )
+
+    def handle(self, *args, **options):
+        paginator = Paginator(
+            Post.objects.select_related('author', 'group'), POSTS_PER_PAGE)
+        if not paginator.count:
+            raise CommandError(
+                'В базе нет постов: заполните её командой generate_data.')
+        pages = [paginator.page(number) for number in range(
+            1, min(options['pages'], paginator.num_pages) + 1)]
+        formats = {
+            'pickle': (
+                lambda page: pickle.dumps(
+                    list(page), pickle.HIGHEST_PROTOCOL),
+                pickle.loads,
+            ),
+            'compact': (
+                feed.encode,
+                lambda payload: feed.decode(payload, POSTS_PER_PAGE),
+            ),
+        }
+        report = {}
+        for name, (dump, load) in formats.items():
+            payloads = [dump(page) for page in pages]
+            position = {'index': 0}
+
+            def decode():
+                position['index'] = (position['index'] + 1) % len(payloads)
+                load(payloads[position['index']])
+
+            report[name] = {
+                'bytes_per_page': round(
+                    sum(map(len, payloads)) / len(payloads)),
+                'decode': summarize(measure(
+                    decode, options['iterations'],
+                    warmup=len(payloads))),
+            }
+        for name, result in report.items():
+            self.stdout.write(
+                f'{name:<10} {result["bytes_per_page"]:>8} байт, '
+                f'распаковка {result["decode"]["p50_ms"]:>7.3f} ms p50, '
+                f'{result["decode"]["p99_ms"]:>7.3f} ms p99')
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2, ensure_ascii=False)
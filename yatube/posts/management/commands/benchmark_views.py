@@ -0,0 +1,227 @@
+import json
+import os
+import platform
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.urls import reverse
+
+from core.benchmark import (
+    WSGIClient, count_queries, measure, peak_memory, persistent_connections,
+    session_cookie, summarize
+)
+from posts.models import Follow, Group, Post, User
+
+SUFFIXES = {'k': 10 ** 3, 'M': 10 ** 6}
+DEFAULT_SCALES = '10k,100k,1M'
+METRICS = ('p50_ms', 'p95_ms', 'p99_ms')
+
+
+def parse_scale(value):
+    """'10k' -> 10000, '1M' -> 1000000."""
+    multiplier = SUFFIXES.get(value[-1:], 1)
+    number = value[:-1] if value[-1:] in SUFFIXES else value
+    try:
+        return int(float(number) * multiplier)
+    except ValueError:
+        raise CommandError(f'Непонятный размер набора данных: {value}')
+
+
+def dataset_options(posts, seed):
+    """Пропорции набора данных для заданного числа постов."""
+    users = max(posts // 20, 100)
+    return {
+        'posts': posts,
+        'users': users,
+        'groups': max(posts // 2000, 10),
+        'comments': posts * 2,
+        'follows': users * 10,
+        'seed': seed,
+    }
+
+
+def use_database(path):
+    """Переключает соединение по умолчанию на другой файл SQLite."""
+    connection.close()
+    settings.DATABASES['default']['NAME'] = path
+    connection.settings_dict['NAME'] = path
+
+
+class Command(BaseCommand):
+    help = ('Измеряет время ответа, число запросов к БД и пик памяти для '
+            'каждого адреса posts/urls.py на наборах данных разного размера '
+            'и сравнивает результат с сохранённым эталоном.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scales', default=DEFAULT_SCALES,
+            help='Размеры наборов данных в постах через запятую.'
+        )
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--data-dir',
+            default=os.path.join(settings.BASE_DIR, 'benchmarks'),
+            help='Каталог с базами наборов данных.'
+        )
+        parser.add_argument(
+            '--output', help='Куда записать результаты в формате JSON.'
+        )
+        parser.add_argument(
+            '--baseline', help='JSON с эталонными результатами.'
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help='Допустимый относительный рост времени ответа.'
+        )
+        parser.add_argument(
+            '--metric', choices=METRICS, default='p95_ms',
+            help='Метрика, по которой ищется регрессия.'
+        )
+
+    def handle(self, *args, **options):
+        os.makedirs(options['data_dir'], exist_ok=True)
+        original = settings.DATABASES['default']['NAME']
+        report = {
+            'meta': {
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'iterations': options['iterations'],
+                'seed': options['seed'],
+            },
+            'results': {},
+        }
+        try:
+            for scale in options['scales'].split(','):
+                scale = scale.strip()
+                path = os.path.join(
+                    options['data_dir'], f'posts_{scale}.sqlite3')
+                self.prepare_dataset(path, parse_scale(scale), options)
+                report['results'][scale] = self.run_scale(scale, options)
+        finally:
+            use_database(original)
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2, ensure_ascii=False)
+        if options['baseline']:
+            self.compare(report, options)
+
+    def prepare_dataset(self, path, posts, options):
+        exists = os.path.exists(path)
+        use_database(path)
+        if exists:
+            return
+        self.stdout.write(f'Создаём набор данных {path}')
+        call_command('migrate', verbosity=0)
+        call_command(
+            'generate_data', stdout=self.stdout,
+            **dataset_options(posts, options['seed']))
+
+    def cases(self):
+        """Адреса posts/urls.py и пользователи, от имени которых их
+        запрашивать. Изменяющие данные запросы откатываются; подписка и
+        отписка пропускаются, если подписаться не на кого или не от
+        кого отписаться."""
+        group = Group.objects.annotate(
+            total=Count('posts')).order_by('-total').first()
+        author = User.objects.annotate(
+            total=Count('posts')).order_by('-total').first()
+        post = Post.objects.annotate(
+            total=Count('comments')).order_by('-total').first()
+        reader = User.objects.annotate(
+            total=Count('follower')).order_by('-total').first()
+        follow = Follow.objects.filter(user=reader).first()
+        stranger = User.objects.exclude(
+            following__user=reader).exclude(pk=reader.pk).first()
+
+        anonymous = WSGIClient()
+        reader_client = WSGIClient(cookies=session_cookie(reader))
+        owner_client = WSGIClient(cookies=session_cookie(post.author))
+        cases = [
+            ('posts:index', anonymous, 'GET', (), False),
+            ('posts:group_list', anonymous, 'GET', (group.slug,), False),
+            ('posts:profile', anonymous, 'GET', (author.username,), False),
+            ('posts:post_detail', anonymous, 'GET', (post.pk,), False),
+            ('posts:post_edit', owner_client, 'GET', (post.pk,), False),
+            ('posts:delete', owner_client, 'GET', (post.pk,), True),
+            ('posts:post_create', reader_client, 'GET', (), False),
+            ('posts:add_comment', reader_client, 'POST', (post.pk,), True),
+            ('posts:follow_index', reader_client, 'GET', (), False),
+        ]
+        if stranger is not None:
+            cases.append(('posts:profile_follow', reader_client, 'GET',
+                          (stranger.username,), True))
+        if follow is not None:
+            cases.append(('posts:profile_unfollow', reader_client, 'GET',
+                          (follow.author.username,), True))
+        return cases
+
+    def run_scale(self, scale, options):
+        results = {}
+        with persistent_connections():
+            for name, client, method, args, mutating in self.cases():
+                path = reverse(name, args=args)
+                call = self.make_call(client, path, method, mutating)
+                cache.clear()
+                status = call()
+                durations = measure(
+                    call, options['iterations'], options['warmup'])
+                with count_queries() as counter:
+                    call()
+                result = summarize(durations)
+                result.update({
+                    'status': status,
+                    'queries': counter['queries'],
+                    'peak_memory_kb': round(peak_memory(call) / 1024, 1),
+                })
+                results[name] = result
+                self.stdout.write(
+                    f'{scale:>6} {name:<24} {result["p50_ms"]:>9.2f} '
+                    f'{result["p95_ms"]:>9.2f} {result["p99_ms"]:>9.2f} ms '
+                    f'{result["queries"]:>4} q '
+                    f'{result["peak_memory_kb"]:>9.1f} KiB [{status}]')
+        return results
+
+    @staticmethod
+    def make_call(client, path, method, mutating):
+        data = {'text': 'Комментарий для измерений'}
+
+        def call():
+            if not mutating:
+                return client.request(path, method)[0]
+            with transaction.atomic():
+                status = client.request(path, method, data)[0]
+                transaction.set_rollback(True)
+            return status
+        return call
+
+    def compare(self, report, options):
+        with open(options['baseline']) as source:
+            baseline = json.load(source)['results']
+        metric = options['metric']
+        regressions = []
+        for scale, views in report['results'].items():
+            for name, current in views.items():
+                expected = baseline.get(scale, {}).get(name)
+                if expected is None:
+                    continue
+                limit = expected[metric] * (1 + options['threshold'])
+                if current[metric] > limit:
+                    regressions.append(
+                        f'{scale} {name}: {metric} {current[metric]} > '
+                        f'{expected[metric]} (+{options["threshold"]:.0%})')
+                if current['queries'] > expected['queries']:
+                    regressions.append(
+                        f'{scale} {name}: запросов {current["queries"]} > '
+                        f'{expected["queries"]}')
+        if regressions:
+            raise CommandError(
+                'Обнаружены регрессии:\n' + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS('Регрессий не обнаружено.'))
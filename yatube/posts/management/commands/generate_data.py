@@ -0,0 +1,263 @@
+import io
+import random
+from array import array
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from faker import Faker
+
+from posts import directory, rollups
+from posts.models import Comment, Follow, Group, Post, User
+
+# Фиксированная точка отсчёта: даты не зависят от момента запуска,
+# поэтому один и тот же seed всегда даёт одинаковый набор данных.
+EPOCH_END = datetime(2022, 3, 1, tzinfo=timezone.utc)
+TEXT_POOL_SIZE = 2000
+IMAGE_POOL_SIZE = 16
+GROUPLESS_SHARE = 0.2
+
+
+def skewed_index(rnd, size, skew):
+    """Индекс из [0, size) со степенным распределением.
+
+    Чем больше skew, тем сильнее выборка смещена к началу диапазона:
+    небольшое число «популярных» объектов получает основную долю связей.
+    """
+    return int(size * rnd.random() ** skew)
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """Отключает auto_now_add, чтобы bulk_create сохранил заданные даты."""
+    saved = [(field, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in saved:
+            field.auto_now_add = value
+
+
+class Command(BaseCommand):
+    help = ('Генерирует воспроизводимый синтетический набор пользователей, '
+            'групп, постов, комментариев и подписок для нагрузочных '
+            'измерений.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=30000)
+        parser.add_argument('--follows', type=int, default=20000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--images', type=float, default=0.0,
+            help='Доля постов с картинкой, от 0 до 1.'
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='Длина периода публикаций в днях.'
+        )
+        parser.add_argument('--locale', default='ru_RU')
+
+    def handle(self, *args, **options):
+        if options['users'] < 2 and options['follows']:
+            raise CommandError('Для подписок нужно минимум два пользователя.')
+        if options['posts'] and not options['users']:
+            raise CommandError('Постам нужен хотя бы один автор.')
+        if not 0 <= options['images'] <= 1:
+            raise CommandError('--images должен быть в диапазоне [0, 1].')
+        self.rnd = random.Random(options['seed'])
+        self.fake = Faker(options['locale'])
+        self.fake.seed_instance(options['seed'])
+        self.batch_size = options['batch_size']
+        self.seed = options['seed']
+        self.span = timedelta(days=options['days']).total_seconds()
+        self.start = EPOCH_END.timestamp() - self.span
+
+        user_ids = self.create_users(options['users'])
+        group_ids = self.create_groups(options['groups'])
+        texts = [self.fake.paragraph(nb_sentences=4)
+                 for _ in range(TEXT_POOL_SIZE)]
+        images = self.create_images(options['images'])
+        post_ids, post_dates = self.create_posts(
+            options['posts'], user_ids, group_ids, texts, images,
+            options['images'])
+        self.create_comments(
+            options['comments'], user_ids, post_ids, post_dates, texts)
+        self.create_follows(options['follows'], user_ids)
+        # bulk_create обходит сигналы, поэтому сводки и счётчики групп
+        # пересчитываются.
+        rollups.rebuild()
+        directory.recount()
+
+    def bulk_create(self, model, objects):
+        """Сохраняет поток объектов пачками и возвращает их id."""
+        last = model.objects.order_by('-pk').values_list('pk', flat=True)
+        last_pk = last.first() or 0
+        total = 0
+        for chunk in chunked(objects, self.batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(chunk)
+            total += len(chunk)
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: {total}', ending='\r')
+        self.stdout.write(
+            self.style.SUCCESS(f'{model._meta.verbose_name_plural}: {total}'))
+        return array('q', model.objects.filter(pk__gt=last_pk)
+                     .order_by('pk').values_list('pk', flat=True).iterator())
+
+    def create_users(self, count):
+        offset = User.objects.count()
+        password = make_password('yatube', salt='generated')
+        fake = self.fake
+
+        def users():
+            for i in range(offset, offset + count):
+                yield User(
+                    username=f'{fake.user_name()}_{i}'[:150],
+                    first_name=fake.first_name(),
+                    last_name=fake.last_name(),
+                    email=f'user{i}@example.com',
+                    password=password,
+                )
+        return self.bulk_create(User, users())
+
+    def create_groups(self, count):
+        offset = Group.objects.count()
+        fake = self.fake
+
+        def groups():
+            for i in range(offset, offset + count):
+                yield Group(
+                    title=fake.sentence(nb_words=3)[:200],
+                    slug=f'group-{i}',
+                    description=fake.paragraph(nb_sentences=2),
+                )
+        return self.bulk_create(Group, groups())
+
+    def create_images(self, share):
+        """Небольшой пул картинок, который разделяют все посты."""
+        if not share:
+            return []
+        from PIL import Image
+
+        names = []
+        for i in range(IMAGE_POOL_SIZE):
+            name = f'posts/generated/{self.seed}-{i}.jpg'
+            if not default_storage.exists(name):
+                # Отдельный генератор: наличие файлов на диске не должно
+                # влиять на последовательность остальных данных.
+                rnd = random.Random(f'{self.seed}-{i}')
+                color = tuple(rnd.randrange(256) for _ in range(3))
+                buffer = io.BytesIO()
+                Image.new('RGB', (960, 540), color).save(buffer, 'JPEG')
+                default_storage.save(name, ContentFile(buffer.getvalue()))
+            names.append(name)
+        return names
+
+    def post_stream(self, count, authors):
+        """Даты и авторы постов с «пачками» публикаций.
+
+        Авторы пишут сериями: серия начинается в случайный момент,
+        её длина распределена экспоненциально, интервалы внутри серии —
+        минуты. Активность авторов распределена по степенному закону.
+        """
+        rnd = self.rnd
+        produced = 0
+        while produced < count:
+            moment = self.start + rnd.random() * self.span
+            burst = min(1 + int(rnd.expovariate(1 / 4)), count - produced)
+            author = skewed_index(rnd, authors, 2)
+            for _ in range(burst):
+                moment += rnd.expovariate(1 / 600)
+                yield author, min(moment, EPOCH_END.timestamp())
+            produced += burst
+
+    def create_posts(self, count, user_ids, group_ids, texts, images,
+                     image_share):
+        rnd = self.rnd
+        dates = array('d')
+
+        def posts():
+            for author, moment in self.post_stream(count, len(user_ids)):
+                group = None
+                if group_ids and rnd.random() >= GROUPLESS_SHARE:
+                    group = group_ids[
+                        skewed_index(rnd, len(group_ids), 2)]
+                image = ''
+                if images and rnd.random() < image_share:
+                    image = rnd.choice(images)
+                dates.append(moment)
+                yield Post(
+                    text=rnd.choice(texts),
+                    author_id=user_ids[author],
+                    group_id=group,
+                    image=image,
+                    pub_date=datetime.fromtimestamp(moment, timezone.utc),
+                    created=datetime.fromtimestamp(moment, timezone.utc),
+                )
+
+        with explicit_dates(Post._meta.get_field('pub_date'),
+                            Post._meta.get_field('created')):
+            post_ids = self.bulk_create(Post, posts())
+        return post_ids, dates
+
+    def create_comments(self, count, user_ids, post_ids, post_dates, texts):
+        if not post_ids:
+            return
+        rnd = self.rnd
+        end = EPOCH_END.timestamp()
+
+        def comments():
+            for _ in range(count):
+                index = skewed_index(rnd, len(post_ids), 3)
+                posted = post_dates[index]
+                moment = min(posted + rnd.expovariate(1 / 86400), end)
+                yield Comment(
+                    post_id=post_ids[index],
+                    author_id=rnd.choice(user_ids),
+                    text=rnd.choice(texts),
+                    created=datetime.fromtimestamp(moment, timezone.utc),
+                )
+
+        with explicit_dates(Comment._meta.get_field('created')):
+            self.bulk_create(Comment, comments())
+
+    def create_follows(self, count, user_ids):
+        rnd = self.rnd
+        users = len(user_ids)
+        # Пара (подписчик, автор) кодируется одним числом. Выборка смещена
+        # к популярным авторам, поэтому полный граф не заполняем.
+        seen = set()
+        count = min(count, users * (users - 1) // 2)
+
+        def follows():
+            while len(seen) < count:
+                follower = rnd.randrange(users)
+                author = skewed_index(rnd, users, 3)
+                pair = follower * users + author
+                if follower == author or pair in seen:
+                    continue
+                seen.add(pair)
+                yield Follow(user_id=user_ids[follower],
+                             author_id=user_ids[author])
+        self.bulk_create(Follow, follows())
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts import rollups
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает сводки активности групп и авторов по всем '
+            'постам и комментариям в базе. Нужна после первой установки '
+            'сводок и после массовых изменений в обход сигналов. '
+            'Веб-процессы на время пересчёта нужно остановить: их '
+            'незаписанные приращения иначе учтутся дважды.')
+
+    def handle(self, *args, **options):
+        activity, commenters = rollups.rebuild()
+        self.stdout.write(
+            f'Сводок по периодам: {activity}, '
+            f'строк комментаторов: {commenters}')
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts import directory
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает число постов и время последнего поста групп '
+            'после изменений постов в обход сигналов.')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Пересчитано групп: {directory.recount()}')
@@ -0,0 +1,55 @@
+# Generated by Django 2.2.16 on 2026-10-19 18:17
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0017_trendingscore'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommenterRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('group', 'Группа'), ('author', 'Автор')], max_length=6, verbose_name='Чья активность')),
+                ('object_id', models.PositiveIntegerField(verbose_name='Номер')),
+                ('comments', models.IntegerField(default=0, verbose_name='Комментарии')),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Комментатор')),
+            ],
+            options={
+                'verbose_name': 'Комментатор',
+                'verbose_name_plural': 'Комментаторы',
+            },
+        ),
+        migrations.CreateModel(
+            name='ActivityRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('group', 'Группа'), ('author', 'Автор')], max_length=6, verbose_name='Чья активность')),
+                ('object_id', models.PositiveIntegerField(verbose_name='Номер')),
+                ('period', models.CharField(choices=[('hour', 'Час'), ('day', 'День')], max_length=4, verbose_name='Период')),
+                ('start', models.DateTimeField(verbose_name='Начало периода')),
+                ('posts', models.IntegerField(default=0, verbose_name='Посты')),
+                ('comments', models.IntegerField(default=0, verbose_name='Комментарии')),
+            ],
+            options={
+                'verbose_name': 'Активность за период',
+                'verbose_name_plural': 'Активность по периодам',
+                'unique_together': {('scope', 'object_id', 'period', 'start')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='commenterrollup',
+            index=models.Index(fields=['scope', 'object_id', '-comments'], name='posts_comme_scope_c97df6_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='commenterrollup',
+            unique_together={('scope', 'object_id', 'user')},
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 2.2.16 on 2026-10-19 18:21
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_posts(apps, schema_editor):
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    posts = Post.objects.filter(group=OuterRef('pk')).order_by()
+    Group.objects.update(
+        post_count=Coalesce(Subquery(
+            posts.values('group').annotate(total=Count('pk')).values(
+                'total'), output_field=models.IntegerField()), Value(0)),
+        last_post_at=Subquery(
+            posts.order_by('-pub_date').values('pub_date')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_activityrollup_commenterrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='last_post_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Последний пост'),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='post_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Число постов'),
+        ),
+        migrations.AddIndex(
+            model_name='group',
+            index=models.Index(fields=['-post_count'], name='posts_group_post_co_d99cf9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='group',
+            index=models.Index(fields=['-last_post_at'], name='posts_group_last_po_a493fa_idx'),
+        ),
+        migrations.RunPython(count_posts, migrations.RunPython.noop),
+    ]
@@ -13,10 +13,39 @@ class Group(models.Model):
         db_index=True,
     )
     description = models.TextField()
+    # Поддерживаются сигналами posts.directory при публикации, удалении и
+    # переносе постов.
+    post_count = models.PositiveIntegerField('Число постов', default=0)
+    last_post_at = models.DateTimeField(
+        'Последний пост', null=True, blank=True)
+
+    # Поля, которые обычное сохранение группы не перезаписывает.
+    COUNTERS = ('post_count', 'last_post_at')
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        # Экземпляр, загруженный до публикации поста, затёр бы счётчики
+        # старыми значениями: они меняются только запросами posts.directory.
+        if (not self._state.adding and kwargs.get('update_fields') is None
+                and not kwargs.get('force_insert') and not args):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTERS
+            ]
+        super().save(*args, **kwargs)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-post_count']),
+            models.Index(fields=['-last_post_at']),
+        ]
+
+
+# Post.loaded_group_id, когда group_id при загрузке отложен (defer, only).
+NOT_LOADED = object()
+
 
 class Post(CreatedModel):
     text = models.TextField(
@@ -27,6 +56,10 @@ class Post(CreatedModel):
         'Дата публикации',
         auto_now_add=True
     )
+    updated = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -52,6 +85,15 @@ class Post(CreatedModel):
     def __str__(self):
         return self.text[:15]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Группа на момент загрузки: по ней сигналы замечают перенос поста
+        # в другую группу без лишнего запроса.
+        instance.loaded_group_id = instance.__dict__.get(
+            'group_id', NOT_LOADED)
+        return instance
+
     class Meta:
         ordering = ['-pub_date']
 
@@ -87,3 +129,98 @@ class Follow(models.Model):
         related_name='following',
         on_delete=models.CASCADE
     )
+
+
+class PostViewCount(models.Model):
+    """Число просмотров поста. Пишется пачками из posts.viewcounts.
+
+    Связь без внешнего ключа в базе и без каскада: удаление поста не
+    тратит запрос на счётчик, а оставшаяся строка безвредна, потому что
+    номера постов не переиспользуются.
+    """
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        primary_key=True,
+        related_name='view_count',
+        verbose_name='Пост'
+    )
+    count = models.PositiveIntegerField('Просмотры', default=0)
+
+    class Meta:
+        verbose_name = 'Просмотры поста'
+        verbose_name_plural = 'Просмотры постов'
+
+
+class TrendingScore(models.Model):
+    """Популярность поста или группы: двоичный логарифм суммы весов
+    событий с прямым затуханием (см. posts.trending)."""
+    POST = 'post'
+    GROUP = 'group'
+    KINDS = (
+        (POST, 'Пост'),
+        (GROUP, 'Группа'),
+    )
+    kind = models.CharField('Тип', max_length=5, choices=KINDS)
+    object_id = models.PositiveIntegerField('Номер')
+    level = models.FloatField('Популярность')
+
+    class Meta:
+        unique_together = ('kind', 'object_id')
+        indexes = [models.Index(fields=['kind', '-level'])]
+        verbose_name = 'Популярность'
+        verbose_name_plural = 'Популярность'
+
+
+class ActivityRollup(models.Model):
+    """Число постов и комментариев группы или автора за час или день.
+
+    Пополняется из posts.rollups по мере публикации; у автора считаются
+    комментарии к его постам.
+    """
+    GROUP = 'group'
+    AUTHOR = 'author'
+    SCOPES = (
+        (GROUP, 'Группа'),
+        (AUTHOR, 'Автор'),
+    )
+    HOUR = 'hour'
+    DAY = 'day'
+    PERIODS = (
+        (HOUR, 'Час'),
+        (DAY, 'День'),
+    )
+    scope = models.CharField('Чья активность', max_length=6, choices=SCOPES)
+    object_id = models.PositiveIntegerField('Номер')
+    period = models.CharField('Период', max_length=4, choices=PERIODS)
+    start = models.DateTimeField('Начало периода')
+    posts = models.IntegerField('Посты', default=0)
+    comments = models.IntegerField('Комментарии', default=0)
+
+    class Meta:
+        unique_together = ('scope', 'object_id', 'period', 'start')
+        verbose_name = 'Активность за период'
+        verbose_name_plural = 'Активность по периодам'
+
+
+class CommenterRollup(models.Model):
+    """Сколько комментариев пользователь оставил к постам группы или
+    автора за всё время."""
+    scope = models.CharField(
+        'Чья активность', max_length=6, choices=ActivityRollup.SCOPES)
+    object_id = models.PositiveIntegerField('Номер')
+    user = models.ForeignKey(
+        User,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        verbose_name='Комментатор'
+    )
+    comments = models.IntegerField('Комментарии', default=0)
+
+    class Meta:
+        unique_together = ('scope', 'object_id', 'user')
+        indexes = [models.Index(fields=['scope', 'object_id', '-comments'])]
+        verbose_name = 'Комментатор'
+        verbose_name_plural = 'Комментаторы'
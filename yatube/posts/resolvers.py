@@ -0,0 +1,11 @@
+"""Группы по slug и авторы по username для страниц групп и профилей
+(см. core.resolver). Кешируются только поля, которые нужны этим
+страницам; сигналы в posts.signals сбрасывают кеш при изменениях."""
+from core.resolver import Resolver
+
+from .models import Group, User
+
+groups = Resolver(Group, 'slug', ('id', 'slug', 'title', 'description'))
+
+authors = Resolver(
+    User, 'username', ('id', 'username', 'first_name', 'last_name'))
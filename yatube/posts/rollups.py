@@ -0,0 +1,251 @@
+"""Сводки активности групп и авторов по часам и дням.
+
+Страницы активности и счётчики постов в админке читают готовые строки
+ActivityRollup и CommenterRollup вместо GROUP BY по постам и комментариям.
+Сводки пополняются сигналами при публикации и удалении поста, переносе
+его в другую группу и новом комментарии. Изменения копятся в буфере с
+отложенной записью (core.writebehind) и раз в ``ROLLUPS_FLUSH_INTERVAL``
+секунд записываются пакетными upsert, так что сама публикация не тратит
+на сводки ни одного запроса.
+
+Комментарии считаются событиями: они остаются в сводках, когда пост
+удаляют вместе с ними или переносят в другую группу. Пересчитать сводки
+заново по постам и комментариям можно командой rebuild_rollups.
+"""
+import datetime as dt
+import logging
+from collections import Counter
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from core.writebehind import WriteBehindBuffer
+
+from .models import ActivityRollup, Comment, CommenterRollup, Post
+
+logger = logging.getLogger('yatube.rollups')
+
+GROUP = ActivityRollup.GROUP
+AUTHOR = ActivityRollup.AUTHOR
+HOUR = ActivityRollup.HOUR
+DAY = ActivityRollup.DAY
+
+ACTIVITY_UPSERT = (
+    f'INSERT INTO {ActivityRollup._meta.db_table} '
+    f'(scope, object_id, period, start, posts, comments) '
+    f'VALUES (%s, %s, %s, %s, %s, %s) '
+    f'ON CONFLICT (scope, object_id, period, start) DO UPDATE '
+    f'SET posts = {ActivityRollup._meta.db_table}.posts + excluded.posts, '
+    f'comments = {ActivityRollup._meta.db_table}.comments + excluded.comments'
+)
+
+COMMENTER_UPSERT = (
+    f'INSERT INTO {CommenterRollup._meta.db_table} '
+    f'(scope, object_id, user_id, comments) VALUES (%s, %s, %s, %s) '
+    f'ON CONFLICT (scope, object_id, user_id) DO UPDATE '
+    f'SET comments = {CommenterRollup._meta.db_table}.comments '
+    f'+ excluded.comments'
+)
+
+BATCH_SIZE = 500
+
+# Поля поста и комментария с номером группы и автора; у автора считаются
+# комментарии к его постам.
+SCOPE_FIELDS = {AUTHOR: 'author', GROUP: 'group'}
+COMMENT_SCOPE_FIELDS = {AUTHOR: 'post__author', GROUP: 'post__group'}
+
+
+def period_start(moment, period):
+    """Начало часа или дня с моментом moment в текущем часовом поясе."""
+    moment = timezone.localtime(moment)
+    if period == DAY:
+        return timezone.make_aware(
+            dt.datetime.combine(moment.date(), dt.time.min))
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+class RollupBuffer(WriteBehindBuffer):
+    name = 'rollups'
+    interval_setting = 'ROLLUPS_FLUSH_INTERVAL'
+
+    def _reset(self):
+        # (scope, object_id, period, start) -> прирост.
+        self.posts = Counter()
+        self.comments = Counter()
+        # (scope, object_id, user_id) -> прирост.
+        self.commenters = Counter()
+
+    def add(self, counter, scopes, moment, delta):
+        self.start()
+        starts = [(period, period_start(moment, period))
+                  for period in (HOUR, DAY)]
+        with self.lock:
+            for scope, object_id in scopes:
+                for period, start in starts:
+                    counter[scope, object_id, period, start] += delta
+
+    def record_post(self, scopes, moment, delta):
+        self.add(self.posts, scopes, moment, delta)
+
+    def record_comment(self, scopes, moment, user_id):
+        self.add(self.comments, scopes, moment, 1)
+        with self.lock:
+            for scope, object_id in scopes:
+                self.commenters[scope, object_id, user_id] += 1
+
+    def flush(self):
+        """Записывает накопленные изменения; возвращает число
+        затронутых строк сводок."""
+        with self.lock:
+            posts, comments = self.posts, self.comments
+            commenters = self.commenters
+            self._reset()
+        activity = [
+            (*key[:3], connection.ops.adapt_datetimefield_value(key[3]),
+             posts[key], comments[key])
+            for key in posts.keys() | comments.keys()
+            if posts[key] or comments[key]
+        ]
+        commenter_rows = [
+            (*key, count) for key, count in commenters.items() if count
+        ]
+        if not activity and not commenter_rows:
+            return 0
+        try:
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    if activity:
+                        cursor.executemany(ACTIVITY_UPSERT, activity)
+                    if commenter_rows:
+                        cursor.executemany(COMMENTER_UPSERT, commenter_rows)
+        except DatabaseError:
+            logger.exception('Сводки активности не записаны, повтор позже')
+            with self.lock:
+                self.posts.update(posts)
+                self.comments.update(comments)
+                self.commenters.update(commenters)
+            return 0
+        return len(activity) + len(commenter_rows)
+
+
+buffer = RollupBuffer()
+
+
+def post_scopes(author_id, group_id):
+    scopes = [(AUTHOR, author_id)]
+    if group_id is not None:
+        scopes.append((GROUP, group_id))
+    return scopes
+
+
+def record_post(post, delta=1):
+    buffer.record_post(
+        post_scopes(post.author_id, post.group_id), post.pub_date, delta)
+
+
+def record_group_change(post, old_group_id):
+    if old_group_id is not None:
+        buffer.record_post([(GROUP, old_group_id)], post.pub_date, -1)
+    if post.group_id is not None:
+        buffer.record_post([(GROUP, post.group_id)], post.pub_date, 1)
+
+
+def record_comment(comment):
+    post = comment.post
+    buffer.record_comment(
+        post_scopes(post.author_id, post.group_id), comment.created,
+        comment.author_id)
+
+
+def flush():
+    return buffer.flush()
+
+
+def rebuild():
+    """Пересчитывает сводки по постам и комментариям в базе; возвращает
+    число строк ActivityRollup и CommenterRollup.
+
+    Приращения в буферах процессов относятся к постам и комментариям,
+    которые уже есть в базе: записанные после пересчёта, они были бы
+    учтены дважды. Буфер своего процесса записывается перед пересчётом,
+    а веб-процессы на время пересчёта нужно остановить.
+    """
+    buffer.flush()
+    activity = {}
+    sources = (
+        (Post.objects, 'pub_date', 'posts', SCOPE_FIELDS),
+        (Comment.objects, 'created', 'comments', COMMENT_SCOPE_FIELDS),
+    )
+    for queryset, date_field, column, fields in sources:
+        for scope, field in fields.items():
+            for period in (HOUR, DAY):
+                buckets = queryset.filter(**{f'{field}__isnull': False})
+                buckets = buckets.annotate(
+                    bucket=Trunc(date_field, period)).order_by().values(
+                    field, 'bucket').annotate(total=Count('pk'))
+                for row in buckets:
+                    key = (scope, row[field], period, row['bucket'])
+                    if key not in activity:
+                        activity[key] = ActivityRollup(
+                            scope=scope, object_id=row[field],
+                            period=period, start=row['bucket'])
+                    setattr(activity[key], column, row['total'])
+    commenters = [
+        CommenterRollup(
+            scope=scope, object_id=row[field], user_id=row['author'],
+            comments=row['total'])
+        for scope, field in COMMENT_SCOPE_FIELDS.items()
+        for row in Comment.objects.filter(
+            **{f'{field}__isnull': False}).order_by().values(
+            field, 'author').annotate(total=Count('pk'))
+    ]
+    with transaction.atomic():
+        ActivityRollup.objects.all().delete()
+        CommenterRollup.objects.all().delete()
+        ActivityRollup.objects.bulk_create(
+            activity.values(), batch_size=BATCH_SIZE)
+        CommenterRollup.objects.bulk_create(
+            commenters, batch_size=BATCH_SIZE)
+    return len(activity), len(commenters)
+
+
+def periods(scope, object_id, period, count):
+    """Строки за последние count периодов от новых к старым, включая
+    периоды без активности."""
+    now = timezone.localtime()
+    if period == DAY:
+        starts = [
+            period_start(now - dt.timedelta(days=i), DAY)
+            for i in range(count)
+        ]
+    else:
+        last = period_start(now, HOUR)
+        starts = [last - dt.timedelta(hours=i) for i in range(count)]
+    found = {
+        row.start: row for row in ActivityRollup.objects.filter(
+            scope=scope, object_id=object_id, period=period,
+            start__gte=starts[-1])
+    }
+    return [
+        found.get(start) or ActivityRollup(
+            scope=scope, object_id=object_id, period=period, start=start)
+        for start in starts
+    ]
+
+
+def activity(scope, object_id):
+    """Контекст страницы активности группы или автора."""
+    totals = ActivityRollup.objects.filter(
+        scope=scope, object_id=object_id, period=DAY).aggregate(
+        posts=Sum('posts'), comments=Sum('comments'))
+    return {
+        'totals': {name: value or 0 for name, value in totals.items()},
+        'days': periods(scope, object_id, DAY, settings.ACTIVITY_DAYS),
+        'hours': periods(scope, object_id, HOUR, settings.ACTIVITY_HOURS),
+        'commenters': CommenterRollup.objects.filter(
+            scope=scope, object_id=object_id, comments__gt=0).select_related(
+            'user').order_by('-comments')[:settings.ACTIVITY_COMMENTERS],
+    }
@@ -0,0 +1,88 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core import pagecache
+
+from . import directory, resolvers, rollups, trending
+from .models import NOT_LOADED, Comment, Follow, Group, Post, User
+
+
+# Обработчик post_delete у Comment лишает каскад при удалении поста
+# быстрого удаления одним запросом: комментарии сначала выбираются.
+@receiver([post_save, post_delete], sender=Post)
+@receiver([post_save, post_delete], sender=Group)
+@receiver([post_save, post_delete], sender=Comment)
+def invalidate_pages(**kwargs):
+    """Посты, комментарии и группы видны на страницах анонимного кеша."""
+    pagecache.invalidate()
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_author_pages(update_fields=None, **kwargs):
+    """Имя автора видно на страницах; вход (last_login) кеш не сбрасывает."""
+    if update_fields and not set(update_fields) & set(
+            resolvers.authors.fields):
+        return
+    pagecache.invalidate()
+
+
+@receiver([post_save, post_delete], sender=Group)
+def invalidate_groups(update_fields=None, **kwargs):
+    resolvers.groups.invalidate(update_fields)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_authors(update_fields=None, **kwargs):
+    resolvers.authors.invalidate(update_fields)
+
+
+@receiver(post_save, sender=Comment)
+def comment_trending(instance, created, **kwargs):
+    if created and settings.TRENDING_ENABLED:
+        trending.record_comment(instance.post_id)
+
+
+@receiver(post_save, sender=Follow)
+def follow_trending(instance, created, **kwargs):
+    if created and settings.TRENDING_ENABLED:
+        trending.record_follow(instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def post_counters(instance, created, **kwargs):
+    """Сводки активности и счётчики групп: новый пост или перенос поста
+    в другую группу (Post.loaded_group_id — группа при загрузке).
+
+    Если группа при загрузке не читалась (defer, only), перенос не
+    распознаётся: счётчики исправляют rebuild_rollups и recount_groups.
+    """
+    if created:
+        rollups.record_post(instance)
+        if instance.group_id is not None:
+            directory.post_added(instance.group_id, instance.pub_date)
+        instance.loaded_group_id = instance.group_id
+        return
+    # Чтение отложенного group_id загрузило бы его из базы.
+    current = instance.__dict__.get('group_id', NOT_LOADED)
+    loaded = getattr(instance, 'loaded_group_id', NOT_LOADED)
+    if NOT_LOADED not in (loaded, current) and loaded != current:
+        rollups.record_group_change(instance, loaded)
+        if loaded is not None:
+            directory.post_removed(loaded)
+        if current is not None:
+            directory.post_added(current, instance.pub_date)
+    instance.loaded_group_id = current
+
+
+@receiver(post_delete, sender=Post)
+def post_delete_counters(instance, **kwargs):
+    rollups.record_post(instance, -1)
+    if instance.group_id is not None:
+        directory.post_removed(instance.group_id)
+
+
+@receiver(post_save, sender=Comment)
+def comment_rollups(instance, created, **kwargs):
+    if created:
+        rollups.record_comment(instance)
@@ -0,0 +1,13 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts.cards import render_cards
+
+register = template.Library()
+
+
+@register.filter
+def cards(posts):
+    """Разметка карточек постов страницы ленты:
+    {% for card in page_obj|cards %}{{ card }}{% endfor %}."""
+    return [mark_safe(card) for card in render_cards(posts)]
@@ -0,0 +1,74 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import cards, feed
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+@override_settings(CARD_CACHE_ENABLED=True)
+class PostCardCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='')
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Пост {number}', group=cls.group)
+            for number in range(3))
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        patcher = mock.patch(
+            'posts.cards.render_card', wraps=cards.render_card)
+        self.render_card = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_cards_are_shared_between_feeds(self):
+        """Карточка, отрисованная в группе, берётся из кеша в профиле."""
+        group_url = reverse('posts:group_list', args=(self.group.slug,))
+        with override_settings(CARD_CACHE_ENABLED=False):
+            uncached = self.get(group_url).content
+        self.render_card.reset_mock()
+        self.assertEqual(self.get(group_url).content, uncached)
+        self.assertEqual(self.render_card.call_count, 3)
+        self.get(reverse('posts:profile', args=(self.user.username,)))
+        self.get(group_url)
+        self.assertEqual(self.render_card.call_count, 3)
+
+    def test_changes_rerender_cards(self):
+        """Изменение поста перерисовывает его карточку, переименование
+        группы — карточки её постов."""
+        url = reverse('posts:group_list', args=(self.group.slug,))
+        self.get(url)
+        post = Post.objects.first()
+        post.text = 'Изменённый пост'
+        post.save()
+        self.render_card.reset_mock()
+        self.assertContains(self.get(url), 'Изменённый пост')
+        self.assertEqual(self.render_card.call_count, 1)
+        self.group.title = 'Новая группа'
+        self.group.save()
+        self.assertContains(self.get(url), 'Новая группа')
+        self.assertEqual(self.render_card.call_count, 4)
+
+    def test_same_key_for_compact_feed(self):
+        """Посты из компактного кеша ленты дают те же ключи карточек."""
+        page = Paginator(
+            Post.objects.select_related('author', 'group'), 10).page(1)
+        compact = feed.decode(feed.encode(page), 10)
+        self.assertEqual(
+            [cards.card_key(post) for post in page],
+            [cards.card_key(post) for post in compact])
@@ -0,0 +1,77 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db.models import Count, F
+from django.test import TestCase, override_settings
+
+from ..management.commands import benchmark_views
+from ..models import Comment, Follow, Group, Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class GenerateDataCommandTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def generate(self, **options):
+        params = {
+            'users': 20, 'groups': 3, 'posts': 120, 'comments': 60,
+            'follows': 40, 'seed': 7, 'batch_size': 50, 'images': 0.5,
+            'stdout': StringIO(),
+        }
+        params.update(options)
+        call_command('generate_data', **params)
+
+    def snapshot(self):
+        return list(Post.objects.order_by('pk').values_list(
+            'author__username', 'group__slug', 'text', 'image', 'pub_date'))
+
+    def test_creates_requested_amounts(self):
+        """Команда создаёт заданное количество объектов."""
+        self.generate()
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 120)
+        self.assertEqual(Comment.objects.count(), 60)
+        self.assertEqual(Follow.objects.count(), 40)
+        self.assertTrue(Post.objects.exclude(image='').exists())
+        self.assertFalse(
+            Follow.objects.filter(user_id=F('author_id')).exists())
+
+    def test_same_seed_gives_same_data(self):
+        """Один и тот же seed воспроизводит набор данных."""
+        self.generate()
+        first = self.snapshot()
+        for model in (Follow, Comment, Post, Group, User):
+            model.objects.all().delete()
+        self.generate()
+        self.assertEqual(first, self.snapshot())
+
+    def test_followers_are_skewed(self):
+        """Подписчики распределены неравномерно между авторами."""
+        self.generate(users=200, follows=1000, posts=0, comments=0)
+        counts = sorted(
+            Follow.objects.values_list('author').annotate(
+                total=Count('id')).values_list('total', flat=True),
+            reverse=True)
+        self.assertGreater(counts[0], 10 * counts[len(counts) // 2])
+
+
+class BenchmarkViewsCasesTest(TestCase):
+    def test_dataset_without_follows(self):
+        """Без подписок отписка не измеряется, а остальные адреса — да."""
+        author = User.objects.create_user(username='author')
+        User.objects.create_user(username='reader')
+        group = Group.objects.create(title='Группа', slug='group')
+        Post.objects.create(author=author, text='Пост', group=group)
+        names = [case[0] for case in benchmark_views.Command().cases()]
+        self.assertIn('posts:profile_follow', names)
+        self.assertNotIn('posts:profile_unfollow', names)
+        self.assertIn('posts:follow_index', names)
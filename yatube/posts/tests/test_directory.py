@@ -0,0 +1,165 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post
+from posts.views import GROUPS_PER_PAGE
+
+User = get_user_model()
+
+
+class GroupCountersTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        cls.first = Group.objects.create(
+            title='Первая', slug='first', description='')
+        cls.second = Group.objects.create(
+            title='Вторая', slug='second', description='')
+
+    def counters(self, group):
+        group.refresh_from_db()
+        return group.post_count, group.last_post_at
+
+    def test_create_and_delete(self):
+        """Публикация и удаление поста меняют счётчики группы."""
+        old = Post.objects.create(
+            author=self.author, text='Старый', group=self.first)
+        new = Post.objects.create(
+            author=self.author, text='Новый', group=self.first)
+        self.assertEqual(self.counters(self.first), (2, new.pub_date))
+        new.delete()
+        self.assertEqual(self.counters(self.first), (1, old.pub_date))
+        old.delete()
+        self.assertEqual(self.counters(self.first), (0, None))
+
+    def test_group_change(self):
+        """Перенос поста уменьшает счётчик старой группы и увеличивает
+        новой; время последнего поста новой группы не уходит назад."""
+        moved = Post.objects.create(
+            author=self.author, text='Пост', group=self.first)
+        latest = Post.objects.create(
+            author=self.author, text='Новее', group=self.second)
+        post = Post.objects.get(pk=moved.pk)
+        post.group = self.second
+        post.save()
+        self.assertEqual(self.counters(self.first), (0, None))
+        self.assertEqual(self.counters(self.second), (2, latest.pub_date))
+        post.text = 'Правка'
+        post.save()
+        self.assertEqual(self.counters(self.second)[0], 2)
+
+    def test_deferred_group_is_not_a_move(self):
+        """Сохранение поста, загруженного без группы, не считается
+        переносом и не загружает группу."""
+        post = Post.objects.create(
+            author=self.author, text='Пост', group=self.first)
+        deferred = Post.objects.only('text').get(pk=post.pk)
+        deferred.text = 'Правка'
+        with self.assertNumQueries(1):
+            deferred.save()
+        self.assertEqual(self.counters(self.first), (1, post.pub_date))
+        self.assertEqual(self.counters(self.second), (0, None))
+
+    def test_group_save_keeps_counters(self):
+        """Сохранение группы, загруженной до публикации поста, не
+        затирает её счётчики."""
+        stale = Group.objects.get(pk=self.first.pk)
+        post = Post.objects.create(
+            author=self.author, text='Пост', group=self.first)
+        stale.title = 'Переименована'
+        stale.save()
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.title, 'Переименована')
+        self.assertEqual(self.counters(self.first), (1, post.pub_date))
+
+    def test_admin_list_editable(self):
+        """Перенос постов пачкой в админке обновляет счётчики."""
+        posts = [
+            Post.objects.create(
+                author=self.author, text=f'Пост {i}', group=self.first)
+            for i in range(3)
+        ]
+        client = Client()
+        client.force_login(self.admin)
+        data = {
+            'form-TOTAL_FORMS': len(posts),
+            'form-INITIAL_FORMS': len(posts),
+            '_save': 'Сохранить',
+        }
+        for i, post in enumerate(reversed(posts)):
+            data[f'form-{i}-id'] = post.pk
+            data[f'form-{i}-group'] = self.second.pk
+        response = client.post(
+            reverse('admin:posts_post_changelist'), data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.counters(self.first), (0, None))
+        self.assertEqual(self.counters(self.second), (3, posts[-1].pub_date))
+        response = client.get(reverse('admin:posts_group_changelist'))
+        self.assertContains(response, 'field-post_count">3<')
+
+    def test_recount(self):
+        """recount_groups исправляет изменения в обход сигналов."""
+        post = Post.objects.create(
+            author=self.author, text='Пост', group=self.first)
+        Post.objects.filter(pk=post.pk).update(group=self.second)
+        output = StringIO()
+        call_command('recount_groups', stdout=output)
+        self.assertIn('Пересчитано групп: 2', output.getvalue())
+        self.assertEqual(self.counters(self.first), (0, None))
+        self.assertEqual(self.counters(self.second), (1, post.pub_date))
+
+    def test_drifted_counter_does_not_block_delete(self):
+        """Пост, перенесённый в обход сигналов, удаляется, а счётчик его
+        группы не уходит ниже нуля."""
+        post = Post.objects.create(
+            author=self.author, text='Пост', group=self.first)
+        Post.objects.filter(pk=post.pk).update(group=self.second)
+        post.refresh_from_db()
+        post.delete()
+        self.assertFalse(Post.objects.filter(pk=post.pk).exists())
+        self.assertEqual(self.counters(self.second), (0, None))
+
+
+class GroupDirectoryTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='author')
+        cls.busy = Group.objects.create(
+            title='Большая', slug='busy', description='')
+        cls.fresh = Group.objects.create(
+            title='Свежая', slug='fresh', description='')
+        cls.empty = Group.objects.create(
+            title='Пустая', slug='empty', description='')
+        for i in range(3):
+            Post.objects.create(author=author, text='Пост', group=cls.busy)
+        Post.objects.create(author=author, text='Пост', group=cls.fresh)
+        cls.url = reverse('posts:group_directory')
+
+    def titles(self, sort=None):
+        response = self.client.get(self.url, {'sort': sort} if sort else {})
+        return [group.title for group in response.context['page_obj']]
+
+    def test_sorting(self):
+        """Каталог сортируется по числу постов, последнему посту и
+        названию; неизвестная сортировка — по числу постов."""
+        self.assertEqual(self.titles(), ['Большая', 'Свежая', 'Пустая'])
+        self.assertEqual(
+            self.titles('recent'), ['Свежая', 'Большая', 'Пустая'])
+        self.assertEqual(
+            self.titles('title'), ['Большая', 'Пустая', 'Свежая'])
+        self.assertEqual(self.titles('unknown'), self.titles('posts'))
+
+    def test_pagination_keeps_sort(self):
+        """Ссылки страниц сохраняют сортировку."""
+        Group.objects.bulk_create(
+            Group(title=f'Группа {i}', slug=f'group-{i}', description='')
+            for i in range(GROUPS_PER_PAGE))
+        response = self.client.get(self.url, {'sort': 'recent'})
+        self.assertEqual(len(response.context['page_obj']), GROUPS_PER_PAGE)
+        self.assertContains(response, '?sort=recent&amp;page=2')
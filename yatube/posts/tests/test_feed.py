@@ -0,0 +1,115 @@
+import pickle
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.paginator import Page, Paginator
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import feed
+from posts.models import Group, Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class FeedCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='auth', first_name='Лев', last_name='Толстой',
+            password='секрет')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.user, text='Пост с картинкой', group=cls.group,
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'))
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Пост {number}')
+            for number in range(12))
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_round_trip(self):
+        """Из записи восстанавливаются все поля, нужные шаблонам."""
+        queryset = Post.objects.select_related('author', 'group').filter(
+            pk=self.post.pk)
+        original = Paginator(queryset, 10).page(1)
+        page = feed.decode(feed.encode(original), 10)
+        self.assertIsInstance(page, Page)
+        self.assertEqual(page.paginator.count, 1)
+        post = page[0]
+        self.assertEqual(post.pk, self.post.pk)
+        self.assertEqual(post.text, self.post.text)
+        self.assertEqual(post.pub_date, self.post.pub_date)
+        self.assertEqual(post.image, self.post.image.name)
+        self.assertEqual(str(post.author), 'auth')
+        self.assertEqual(post.author.get_full_name(), 'Лев Толстой')
+        self.assertEqual(str(post.group), 'Группа')
+        self.assertEqual(post.group.slug, 'group')
+
+    def test_compact_entries(self):
+        """Запись меньше pickle объектов и не содержит хеша пароля."""
+        page = Paginator(
+            Post.objects.select_related('author', 'group'), 10).page(1)
+        payload = feed.encode(page)
+        self.assertLess(len(payload), len(pickle.dumps(list(page))) / 2)
+        self.assertNotIn(self.user.password.encode(), payload)
+
+    @override_settings(FEED_CACHE_ENABLED=True)
+    def test_cached_pages(self):
+        """Повторная страница ленты не запрашивает посты из базы, а
+        новый пост виден сразу."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.user.username,)) + '?page=2',
+        )
+        client = Client()
+        for url in urls:
+            with self.subTest(url=url):
+                first = client.get(url)
+                with self.assertNumQueries(0 if url == urls[0] else 1):
+                    second = client.get(url)
+                self.assertEqual(second.content, first.content)
+        Post.objects.create(
+            author=self.user, text='Новый пост', group=self.group)
+        response = client.get(
+            reverse('posts:group_list', args=(self.group.slug,)))
+        self.assertContains(response, 'Новый пост')
+        self.assertContains(response, 'Пост с картинкой')
+
+    @override_settings(FEED_CACHE_ENABLED=True)
+    def test_out_of_range_pages_share_last_page(self):
+        """Номера за пределами ленты отдают закешированную последнюю
+        страницу и не заводят своих записей."""
+        client = Client()
+        url = reverse('posts:index')
+        last = client.get(url, {'page': 2})
+        for number in (999, 0, -1):
+            with self.subTest(page=number):
+                with self.assertNumQueries(0):
+                    response = client.get(url, {'page': number})
+                self.assertEqual(response.context['page_obj'].number, 2)
+                self.assertEqual(response.content, last.content)
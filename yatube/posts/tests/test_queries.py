@@ -0,0 +1,222 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.queries import QueryRecorder
+from .. import rollups, trending
+from ..models import Comment, Follow, Group, Post
+from ..views import POSTS_PER_PAGE
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+# Максимальное число SQL-запросов на страницу для авторизованного
+# пользователя, включая загрузку сессии и пользователя. Бюджет не должен
+# зависеть ни от числа постов на странице, ни от числа комментариев.
+# В TestCase сюда входят и запросы SAVEPOINT вокруг get_or_create.
+QUERY_BUDGETS = {
+    'posts:index': 4,
+    'posts:group_directory': 4,
+    # Выборка популярного берётся из памяти процесса: счёт постов и
+    # сами посты в порядке выборки.
+    'posts:trending': 4,
+    # Итоги, две выборки по периодам и комментаторы вместе с
+    # пользователями.
+    'posts:group_activity': 7,
+    'posts:profile_activity': 7,
+    'posts:group_list': 5,
+    'posts:profile': 6,
+    'posts:post_detail': 5,
+    'posts:post_create': 3,
+    'posts:post_edit': 4,
+    # Удаление поста из группы обновляет её счётчики (posts.directory),
+    # а комментарии перед каскадным удалением выбираются для сигнала
+    # post_delete, сбрасывающего кеш страниц.
+    'posts:delete': 7,
+    'posts:add_comment': 4,
+    'posts:follow_index': 4,
+    'posts:profile_follow': 7,
+    'posts:profile_unfollow': 5,
+}
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class QueryBudgetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author{i}')
+            for i in range(3)
+        ]
+        cls.groups = [
+            Group.objects.create(
+                title=f'Группа {i}', slug=f'group-{i}', description='')
+            for i in range(3)
+        ]
+        image = Post.objects.create(
+            author=cls.authors[0],
+            text='Пост с картинкой',
+            group=cls.groups[0],
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        ).image.name
+        # Все посты делят одну картинку, чтобы не множить файлы.
+        Post.objects.bulk_create(
+            Post(author=cls.authors[i % 3], text=f'Пост {i}',
+                 group=cls.groups[i % 3], image=image)
+            for i in range(34)
+        )
+        cls.lonely_post = Post.objects.create(
+            author=cls.user, text='Пост без комментариев')
+        cls.busy_post = Post.objects.filter(image=image).first()
+        Comment.objects.bulk_create(
+            Comment(post=cls.busy_post, author=cls.authors[i % 3],
+                    text=f'Комментарий {i}')
+            for i in range(30)
+        )
+        Comment.objects.create(
+            post=cls.lonely_post, author=cls.user, text='Комментарий')
+        for author in cls.authors[:2]:
+            Follow.objects.create(user=cls.user, author=author)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def assertWithinBudget(self, name, path, method='get', data=None,
+                           client=None, warm=True):
+        """Запрос укладывается в бюджет QUERY_BUDGETS[name].
+
+        Для страниц первый запрос прогревает миниатюры sorl и не
+        учитывается; кеш фрагмента главной страницы затем сбрасывается,
+        чтобы посты на ней действительно загружались из БД.
+        """
+        client = client or self.client
+        if warm:
+            response = client.get(path)
+            if response.context and 'page_obj' in response.context:
+                cache.delete(make_template_fragment_key(
+                    'index_page', [response.context['page_obj']]))
+        with QueryRecorder() as recorder:
+            getattr(client, method)(path, data or {})
+        budget = QUERY_BUDGETS[name]
+        self.assertLessEqual(
+            len(recorder), budget,
+            f'{path}: бюджет {budget} запросов превышен.\n'
+            f'{recorder.report()}')
+        return len(recorder)
+
+    def test_feeds_do_not_depend_on_page_size(self):
+        """Ленты укладываются в бюджет на полной и неполной странице."""
+        feeds = {
+            'posts:index': reverse('posts:index'),
+            'posts:group_list': reverse(
+                'posts:group_list', args=(self.groups[0].slug,)),
+            'posts:profile': reverse(
+                'posts:profile', args=(self.authors[0].username,)),
+            'posts:follow_index': reverse('posts:follow_index'),
+            'posts:group_directory': reverse('posts:group_directory'),
+        }
+        for name, path in feeds.items():
+            with self.subTest(name=name):
+                full = self.assertWithinBudget(name, path)
+                last = self.assertWithinBudget(name, f'{path}?page=100')
+                self.assertEqual(full, last)
+
+    @override_settings(TRENDING_ENABLED=True, TRENDING_FLUSH_INTERVAL=None)
+    def test_trending_does_not_depend_on_page_size(self):
+        """Популярное с оценками у всех постов и групп укладывается в
+        бюджет на полной и неполной странице."""
+        trending._local['expires'] = 0
+        self.addCleanup(trending._local.update, expires=0)
+        self.addCleanup(trending.buffer._reset)
+        for post in Post.objects.all():
+            trending.record_view(post.pk)
+        trending.record_comment(self.busy_post.pk)
+        trending.flush()
+        path = reverse('posts:trending')
+        response = self.client.get(path)
+        self.assertEqual(
+            len(response.context['page_obj']), POSTS_PER_PAGE)
+        full = self.assertWithinBudget('posts:trending', path)
+        last = self.assertWithinBudget('posts:trending', f'{path}?page=100')
+        self.assertEqual(full, last)
+
+    def test_activity_does_not_depend_on_commenters(self):
+        """Страницы активности укладываются в бюджет, и число запросов
+        не зависит от числа комментаторов."""
+        rollups.rebuild()
+        pages = {
+            'posts:group_activity': (
+                self.groups[0].slug, self.groups[1].slug),
+            'posts:profile_activity': (
+                self.authors[0].username, self.authors[1].username),
+        }
+        for name, (busy, quiet) in pages.items():
+            with self.subTest(name=name):
+                response = self.client.get(reverse(name, args=(busy,)))
+                self.assertEqual(len(response.context['commenters']), 3)
+                many = self.assertWithinBudget(
+                    name, reverse(name, args=(busy,)))
+                none = self.assertWithinBudget(
+                    name, reverse(name, args=(quiet,)))
+                self.assertEqual(many, none)
+
+    def test_post_detail_does_not_depend_on_comments(self):
+        """Число запросов post_detail не зависит от числа комментариев."""
+        busy = self.assertWithinBudget('posts:post_detail', reverse(
+            'posts:post_detail', args=(self.busy_post.pk,)))
+        lonely = self.assertWithinBudget('posts:post_detail', reverse(
+            'posts:post_detail', args=(self.lonely_post.pk,)))
+        self.assertEqual(busy, lonely)
+
+    def test_forms_within_budget(self):
+        """Формы создания и редактирования укладываются в бюджет."""
+        self.assertWithinBudget(
+            'posts:post_create', reverse('posts:post_create'))
+        self.assertWithinBudget('posts:post_edit', reverse(
+            'posts:post_edit', args=(self.lonely_post.pk,)))
+
+    def test_actions_within_budget(self):
+        """Изменяющие данные адреса укладываются в бюджет."""
+        self.assertWithinBudget(
+            'posts:add_comment',
+            reverse('posts:add_comment', args=(self.busy_post.pk,)),
+            method='post', data={'text': 'Ещё комментарий'}, warm=False)
+        self.assertWithinBudget(
+            'posts:profile_follow', reverse(
+                'posts:profile_follow', args=(self.authors[2].username,)),
+            warm=False)
+        self.assertWithinBudget(
+            'posts:profile_unfollow', reverse(
+                'posts:profile_unfollow', args=(self.authors[0].username,)),
+            warm=False)
+        owner = Client()
+        owner.force_login(self.busy_post.author)
+        self.assertWithinBudget(
+            'posts:delete',
+            reverse('posts:delete', args=(self.busy_post.pk,)),
+            client=owner, warm=False)
@@ -0,0 +1,131 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import rollups
+from posts.models import ActivityRollup, Comment, CommenterRollup, Group, Post
+
+User = get_user_model()
+
+
+class RollupsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='')
+        cls.other = Group.objects.create(
+            title='Другая', slug='other', description='')
+
+    def setUp(self):
+        rollups.buffer._reset()
+        self.addCleanup(rollups.buffer._reset)
+        self.client = Client()
+
+    def totals(self, scope, object_id, period=rollups.DAY):
+        return list(ActivityRollup.objects.filter(
+            scope=scope, object_id=object_id, period=period).values_list(
+            'posts', 'comments'))
+
+    def snapshot(self):
+        return (
+            set(ActivityRollup.objects.filter(posts__gt=0).values_list(
+                'scope', 'object_id', 'period', 'start', 'posts')),
+            set(ActivityRollup.objects.filter(comments__gt=0).values_list(
+                'scope', 'object_id', 'period', 'start', 'comments')),
+            set(CommenterRollup.objects.values_list(
+                'scope', 'object_id', 'user_id', 'comments')),
+        )
+
+    def test_publishing_costs_no_queries(self):
+        """Сводки пополняются без запросов и записываются при flush."""
+        # Второй запрос — счётчики группы (posts.directory).
+        with self.assertNumQueries(2):
+            post = Post.objects.create(
+                author=self.author, text='Пост', group=self.group)
+        with self.assertNumQueries(1):
+            Comment.objects.create(
+                post=post, author=self.reader, text='Комментарий')
+        self.assertFalse(ActivityRollup.objects.exists())
+        rollups.flush()
+        for period in (rollups.HOUR, rollups.DAY):
+            self.assertEqual(
+                self.totals(rollups.GROUP, self.group.pk, period), [(1, 1)])
+            self.assertEqual(
+                self.totals(rollups.AUTHOR, self.author.pk, period),
+                [(1, 1)])
+        self.assertEqual(
+            CommenterRollup.objects.get(
+                scope=rollups.GROUP, object_id=self.group.pk).user,
+            self.reader)
+
+    def test_group_change_and_delete(self):
+        """Перенос поста в другую группу и удаление меняют счётчики."""
+        Post.objects.create(author=self.author, text='Пост', group=self.group)
+        post = Post.objects.get()
+        post.group = self.other
+        post.save()
+        rollups.flush()
+        self.assertEqual(self.totals(rollups.GROUP, self.group.pk), [])
+        self.assertEqual(self.totals(rollups.GROUP, self.other.pk), [(1, 0)])
+        post.delete()
+        rollups.flush()
+        self.assertEqual(self.totals(rollups.GROUP, self.other.pk), [(0, 0)])
+        self.assertEqual(
+            self.totals(rollups.AUTHOR, self.author.pk), [(0, 0)])
+
+    def test_rebuild_matches_incremental(self):
+        """rebuild_rollups даёт те же сводки, что и сигналы."""
+        posts = [
+            Post.objects.create(
+                author=self.author, text=f'Пост {i}',
+                group=(self.group, self.other, None)[i % 3])
+            for i in range(5)
+        ]
+        for i, post in enumerate(posts):
+            Comment.objects.create(
+                post=post, author=(self.reader, self.author)[i % 2],
+                text='Комментарий')
+        Post.objects.create(
+            author=self.reader, text='Удалённый', group=self.group).delete()
+        rollups.flush()
+        incremental = self.snapshot()
+        output = StringIO()
+        call_command('rebuild_rollups', stdout=output)
+        self.assertIn('Сводок по периодам', output.getvalue())
+        self.assertEqual(self.snapshot(), incremental)
+
+    def test_rebuild_consumes_pending_deltas(self):
+        """Незаписанные приращения своего процесса не учитываются после
+        пересчёта второй раз."""
+        Post.objects.create(author=self.author, text='Пост', group=self.group)
+        rollups.rebuild()
+        rollups.flush()
+        self.assertEqual(self.totals(rollups.GROUP, self.group.pk), [(1, 0)])
+
+    def test_activity_pages(self):
+        """Страницы активности выводят сводки и комментаторов."""
+        post = Post.objects.create(
+            author=self.author, text='Пост', group=self.group)
+        for _ in range(3):
+            Comment.objects.create(
+                post=post, author=self.reader, text='Комментарий')
+        rollups.flush()
+        pages = (
+            reverse('posts:group_activity', args=(self.group.slug,)),
+            reverse('posts:profile_activity', args=(self.author.username,)),
+        )
+        for url in pages:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(
+                    response.context['totals'], {'posts': 1, 'comments': 3})
+                self.assertEqual(len(response.context['days']), 30)
+                self.assertEqual(response.context['days'][0].comments, 3)
+                self.assertEqual(
+                    [row.user for row in response.context['commenters']],
+                    [self.reader])
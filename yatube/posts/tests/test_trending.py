@@ -0,0 +1,135 @@
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.cache import acquire, release
+from posts import trending
+from posts.models import Follow, Group, Post, TrendingScore
+
+User = get_user_model()
+
+
+@override_settings(TRENDING_ENABLED=True, TRENDING_FLUSH_INTERVAL=None)
+class TrendingTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.quiet = Group.objects.create(
+            title='Тихая', slug='quiet', description='')
+        cls.busy = Group.objects.create(
+            title='Шумная', slug='busy', description='')
+        cls.old = Post.objects.create(
+            author=cls.author, text='Старый пост', group=cls.quiet)
+        cls.new = Post.objects.create(
+            author=cls.author, text='Новый пост', group=cls.busy)
+
+    def setUp(self):
+        cache.clear()
+        trending.buffer._reset()
+        trending._local['expires'] = 0
+        self.addCleanup(trending.buffer._reset)
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def level(self, kind, object_id):
+        return TrendingScore.objects.get(kind=kind, object_id=object_id).level
+
+    def test_decay(self):
+        """Событие теряет половину веса за период полураспада."""
+        now = time.time()
+        with override_settings(TRENDING_HALF_LIFE=3600):
+            level = trending.combine(
+                trending.event_level(1, now),
+                trending.event_level(2, now - 3600))
+            self.assertAlmostEqual(trending.score(level, now), 2)
+            self.assertAlmostEqual(trending.score(level, now + 3600), 1)
+
+    def test_events_are_buffered(self):
+        """Комментарии, подписки и просмотры пишутся пачкой при flush;
+        подписка засчитывается последнему посту автора, событие поста —
+        и его группе."""
+        self.client.post(
+            reverse('posts:add_comment', args=(self.old.pk,)),
+            {'text': 'Комментарий'})
+        self.client.get(reverse('posts:post_detail', args=(self.old.pk,)))
+        self.client.get(
+            reverse('posts:profile_follow', args=(self.author.username,)))
+        self.assertTrue(Follow.objects.exists())
+        self.assertFalse(TrendingScore.objects.exists())
+        self.assertEqual(trending.flush(), 2)
+        weights = settings.TRENDING_WEIGHTS
+        now = time.time()
+        self.assertAlmostEqual(
+            trending.score(self.level(TrendingScore.POST, self.old.pk), now),
+            weights['comment'] + weights['view'], places=2)
+        self.assertAlmostEqual(
+            trending.score(self.level(TrendingScore.POST, self.new.pk), now),
+            weights['follow'], places=2)
+        self.assertAlmostEqual(
+            trending.score(self.level(TrendingScore.GROUP, self.busy.pk), now),
+            weights['follow'], places=2)
+
+    def test_trending_page(self):
+        """Лента и виджет групп упорядочены по популярности."""
+        for _ in range(3):
+            trending.record_comment(self.old.pk)
+        trending.record_view(self.new.pk)
+        trending.flush()
+        response = Client().get(reverse('posts:trending'))
+        self.assertEqual(
+            [post.pk for post in response.context['page_obj']],
+            [self.old.pk, self.new.pk])
+        content = response.content.decode()
+        self.assertIn('Популярные группы', content)
+        self.assertLess(content.index('Тихая'), content.index('Шумная'))
+
+    def test_ranking_is_kept_in_memory(self):
+        """Выборка обновляется раз в TRENDING_REFRESH_INTERVAL секунд."""
+        trending.record_view(self.old.pk)
+        trending.flush()
+        self.assertEqual(trending.ranking().posts, (self.old.pk,))
+        trending.record_comment(self.new.pk)
+        trending.flush()
+        with self.assertNumQueries(0):
+            self.assertEqual(trending.ranking().posts, (self.old.pk,))
+
+    def test_disabled(self):
+        """Без TRENDING_ENABLED лента пуста и события не копятся."""
+        with override_settings(TRENDING_ENABLED=False):
+            self.client.post(
+                reverse('posts:add_comment', args=(self.old.pk,)),
+                {'text': 'Комментарий'})
+            response = self.client.get(reverse('posts:trending'))
+        self.assertEqual(len(response.context['page_obj']), 0)
+        self.assertEqual(trending.flush(), 0)
+
+    def test_failed_flush_keeps_events(self):
+        """Если запись не удалась, события останутся в буфере."""
+        trending.record_comment(self.old.pk)
+        with mock.patch.object(
+                TrendingScore.objects, 'bulk_create',
+                side_effect=DatabaseError), \
+                self.assertLogs('yatube.trending', 'ERROR'):
+            self.assertEqual(trending.flush(), 0)
+        self.assertFalse(TrendingScore.objects.exists())
+        self.assertEqual(trending.flush(), 1)
+        self.assertTrue(TrendingScore.objects.filter(
+            kind=TrendingScore.POST, object_id=self.old.pk).exists())
+
+    def test_concurrent_flush_waits(self):
+        """Пока другой процесс записывает оценки, события ждут в буфере."""
+        trending.record_comment(self.old.pk)
+        self.assertTrue(acquire(trending.APPLY_KEY))
+        try:
+            self.assertEqual(trending.flush(), 0)
+        finally:
+            release(trending.APPLY_KEY)
+        self.assertFalse(TrendingScore.objects.exists())
+        self.assertEqual(trending.flush(), 1)
@@ -0,0 +1,88 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import viewcounts
+from posts.models import Post, PostViewCount
+
+User = get_user_model()
+
+
+@override_settings(VIEW_COUNTS_ENABLED=True, VIEW_COUNTS_FLUSH_INTERVAL=None)
+class ViewCountsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        cls.url = reverse('posts:post_detail', args=(cls.post.pk,))
+
+    def setUp(self):
+        cache.clear()
+        viewcounts.buffer._reset()
+        self.addCleanup(viewcounts.buffer._reset)
+        self.client = Client()
+
+    def test_views_are_written_in_batches(self):
+        """Просмотры копятся в памяти и записываются одним запросом."""
+        for _ in range(3):
+            response = self.client.get(self.url)
+        self.assertNotContains(response, 'Просмотров')
+        self.assertFalse(PostViewCount.objects.exists())
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(viewcounts.flush(), 3)
+        inserts = [query for query in queries
+                   if 'INSERT INTO' in query['sql']]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(PostViewCount.objects.get().count, 3)
+        self.assertContains(self.client.get(self.url), '<span>4</span>')
+
+    @override_settings(PAGE_CACHE_ENABLED=True, PAGE_SHELL_ENABLED=True)
+    def test_cached_pages_are_counted(self):
+        """Просмотр страницы из кеша тоже учитывается."""
+        self.client.get(self.url)
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        viewcounts.flush()
+        self.assertEqual(PostViewCount.objects.get().count, 2)
+
+    def test_count_without_queries(self):
+        """Число просмотров берётся из кеша и буфера процесса."""
+        viewcounts.record(self.post.pk)
+        viewcounts.flush()
+        viewcounts.record(self.post.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(viewcounts.count(self.post.pk), 2)
+
+    def test_failed_flush_keeps_views(self):
+        """Если запись не удалась, просмотры останутся в буфере."""
+        viewcounts.record(self.post.pk)
+        with mock.patch(
+                'django.db.backends.utils.CursorWrapper.executemany',
+                side_effect=DatabaseError), \
+                self.assertLogs('yatube.viewcounts', 'ERROR'):
+            self.assertEqual(viewcounts.flush(), 0)
+        self.assertEqual(viewcounts.flush(), 1)
+        self.assertEqual(PostViewCount.objects.get().count, 1)
+
+    def test_deleted_post_is_skipped(self):
+        """Просмотры удалённого поста не записываются."""
+        post = Post.objects.create(author=self.author, text='Удалённый')
+        viewcounts.record(post.pk)
+        post.delete()
+        viewcounts.flush()
+        self.assertFalse(PostViewCount.objects.exists())
+
+    @override_settings(VIEW_COUNTS_MAX_PENDING=2)
+    def test_full_buffer_wakes_writer(self):
+        """Переполненный буфер записывается, не дожидаясь интервала."""
+        viewcounts.buffer.wakeup.clear()
+        viewcounts.record(self.post.pk)
+        self.assertFalse(viewcounts.buffer.wakeup.is_set())
+        viewcounts.record(self.post.pk)
+        self.assertTrue(viewcounts.buffer.wakeup.is_set())
+        viewcounts.buffer.wakeup.clear()
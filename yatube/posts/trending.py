@@ -0,0 +1,224 @@
+"""Популярные посты и группы.
+
+Популярность — сумма весов событий (просмотр, комментарий, подписка на
+автора), каждое из которых теряет половину веса за
+``TRENDING_HALF_LIFE`` секунд. Чтобы не пересчитывать все оценки с
+течением времени, затухание прямое: событие в момент t добавляет
+weight·2^((t − EPOCH)/half_life), и порядок по такой сумме в любой момент
+совпадает с порядком по затухшей оценке. Сумма растёт экспоненциально,
+поэтому хранится её двоичный логарифм (TrendingScore.level), а событие
+добавляется к нему без переполнения.
+
+События копятся в буфере с отложенной записью (core.writebehind):
+просмотры учитывает фрагмент post_views, комментарии и подписки —
+сигналы, без запросов при обработке. При записи подписка засчитывается
+последнему посту автора, а событие поста — ещё и его группе; время всех
+событий пачки — время записи.
+
+``TRENDING_POSTS`` постов и ``TRENDING_GROUPS`` групп с наибольшей
+популярностью хранятся в памяти процесса кортежами и обновляются раз в
+``TRENDING_REFRESH_INTERVAL`` секунд; выборку делает один процесс, прочие
+берут её из общего кеша.
+"""
+import logging
+import math
+import time
+from collections import Counter, namedtuple
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import Case, IntegerField, Max, Value, When
+
+from core.cache import acquire, get_or_set, release
+from core.writebehind import WriteBehindBuffer
+
+from .models import Group, Post, TrendingScore
+
+logger = logging.getLogger('yatube.trending')
+
+# Начало отсчёта прямого затухания: 2026-01-01 00:00 UTC.
+EPOCH = 1767225600
+
+RANKING_KEY = 'trending:ranking'
+
+# Блокировка записи оценок, общая для всех процессов.
+APPLY_KEY = 'trending:apply'
+
+AUTHOR = 'author'
+
+# posts — номера постов, groups — пары (slug, название), version меняется
+# с каждой новой выборкой.
+Ranking = namedtuple('Ranking', 'posts groups version')
+
+EMPTY = Ranking((), (), 0)
+
+
+def event_level(weight, at):
+    return math.log2(weight) + (at - EPOCH) / settings.TRENDING_HALF_LIFE
+
+
+def combine(level, other):
+    """log2(2^level + 2^other) без переполнения."""
+    if level is None:
+        return other
+    high, low = max(level, other), min(level, other)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def score(level, now=None):
+    """Затухшая к моменту now сумма весов событий."""
+    if now is None:
+        now = time.time()
+    return 2 ** (level - (now - EPOCH) / settings.TRENDING_HALF_LIFE)
+
+
+def apply(kind, weights, now):
+    existing = {
+        entry.object_id: entry
+        for entry in TrendingScore.objects.filter(
+            kind=kind, object_id__in=weights)
+    }
+    created = []
+    for object_id, weight in weights.items():
+        level = event_level(weight, now)
+        if object_id in existing:
+            entry = existing[object_id]
+            entry.level = combine(entry.level, level)
+        else:
+            created.append(TrendingScore(
+                kind=kind, object_id=object_id, level=level))
+    TrendingScore.objects.bulk_update(existing.values(), ['level'])
+    TrendingScore.objects.bulk_create(created)
+
+
+class EventBuffer(WriteBehindBuffer):
+    name = 'trending'
+    interval_setting = 'TRENDING_FLUSH_INTERVAL'
+
+    def _reset(self):
+        # (TrendingScore.POST или AUTHOR, номер) -> сумма весов.
+        self.events = Counter()
+
+    def record(self, kind, object_id, weight):
+        self.start()
+        with self.lock:
+            self.events[kind, object_id] += weight
+
+    def flush(self):
+        """Записывает накопленные события; возвращает число их получателей
+        (постов и авторов).
+
+        Оценки читаются, складываются в Python и записываются обратно,
+        поэтому запись идёт под общей блокировкой: иначе два процесса
+        затёрли бы события друг друга. Если блокировку держит другой
+        процесс или запись не удалась, события возвращаются в буфер.
+        """
+        with self.lock:
+            events = self.events
+            self._reset()
+        if not events:
+            return 0
+        if not acquire(APPLY_KEY):
+            self.requeue(events)
+            return 0
+        try:
+            self.apply(events)
+        except DatabaseError:
+            logger.exception('События популярности не записаны, повтор позже')
+            self.requeue(events)
+            return 0
+        finally:
+            release(APPLY_KEY)
+        return len(events)
+
+    def requeue(self, events):
+        with self.lock:
+            self.events.update(events)
+
+    def apply(self, events):
+        now = time.time()
+        posts = Counter()
+        authors = Counter()
+        for (kind, object_id), weight in events.items():
+            (authors if kind == AUTHOR else posts)[object_id] += weight
+        if authors:
+            # order_by() убирает Meta.ordering из GROUP BY.
+            latest = Post.objects.filter(author_id__in=authors).order_by(
+            ).values('author_id').annotate(latest=Max('pk'))
+            for row in latest:
+                posts[row['latest']] += authors[row['author_id']]
+        # Заодно отбрасываются удалённые посты.
+        existing = Post.objects.filter(pk__in=posts).values_list(
+            'pk', 'group_id')
+        groups = Counter()
+        known = Counter()
+        for post_id, group_id in existing:
+            known[post_id] = posts[post_id]
+            if group_id is not None:
+                groups[group_id] += posts[post_id]
+        with transaction.atomic():
+            apply(TrendingScore.POST, known, now)
+            apply(TrendingScore.GROUP, groups, now)
+
+
+buffer = EventBuffer()
+
+
+def record_view(post_id):
+    buffer.record(TrendingScore.POST, post_id, settings.TRENDING_WEIGHTS[
+        'view'])
+
+
+def record_comment(post_id):
+    buffer.record(TrendingScore.POST, post_id, settings.TRENDING_WEIGHTS[
+        'comment'])
+
+
+def record_follow(author_id):
+    buffer.record(AUTHOR, author_id, settings.TRENDING_WEIGHTS['follow'])
+
+
+def flush():
+    return buffer.flush()
+
+
+def compute():
+    posts = tuple(TrendingScore.objects.filter(
+        kind=TrendingScore.POST).order_by('-level').values_list(
+        'object_id', flat=True)[:settings.TRENDING_POSTS])
+    group_ids = list(TrendingScore.objects.filter(
+        kind=TrendingScore.GROUP).order_by('-level').values_list(
+        'object_id', flat=True)[:settings.TRENDING_GROUPS])
+    found = {
+        pk: (slug, title)
+        for pk, slug, title in Group.objects.filter(
+            pk__in=group_ids).values_list('pk', 'slug', 'title')
+    }
+    # Удалённые группы пропускаются.
+    groups = tuple(
+        found[group_id] for group_id in group_ids if group_id in found)
+    return Ranking(posts, groups, time.time_ns())
+
+
+_local = {'ranking': EMPTY, 'expires': 0}
+
+
+def ranking():
+    """Текущая выборка популярного; пустая, если TRENDING_ENABLED выключен."""
+    if not settings.TRENDING_ENABLED:
+        return EMPTY
+    now = time.monotonic()
+    if now >= _local['expires']:
+        _local['ranking'] = get_or_set(
+            RANKING_KEY, compute, settings.TRENDING_REFRESH_INTERVAL)
+        _local['expires'] = now + settings.TRENDING_REFRESH_INTERVAL
+    return _local['ranking']
+
+
+def ordered(queryset, ids):
+    """queryset, ограниченный постами ids и упорядоченный как ids."""
+    if not ids:
+        return queryset.none()
+    return queryset.filter(pk__in=ids).order_by(Case(
+        *[When(pk=pk, then=Value(rank)) for rank, pk in enumerate(ids)],
+        output_field=IntegerField()))
@@ -5,8 +5,15 @@ app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('groups/', views.group_directory, name='group_directory'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
+    path('group/<slug:slug>/activity/',
+         views.group_activity,
+         name='group_activity'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path('profile/<str:username>/activity/',
+         views.profile_activity,
+         name='profile_activity'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('posts/<int:post_id>/delete/', views.delete, name='delete'),
@@ -15,6 +22,7 @@ urlpatterns = [
          views.add_comment,
          name='add_comment'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('trending/', views.trending_index, name='trending'),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
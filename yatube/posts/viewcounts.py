@@ -0,0 +1,122 @@
+"""Счётчики просмотров постов с отложенной записью.
+
+UPDATE на каждый просмотр упирался бы в блокировку записи SQLite. Вместо
+этого просмотры копятся в памяти процесса, по счётчику на пост, а фоновый
+поток раз в ``VIEW_COUNTS_FLUSH_INTERVAL`` секунд (или раньше, когда
+накопилось ``VIEW_COUNTS_MAX_PENDING`` просмотров) записывает их одним
+пакетным upsert в таблицу PostViewCount (см. core.writebehind). При
+падении процесса теряются только ещё не записанные просмотры, то есть не
+больше этих пределов.
+
+После записи поток перечитывает итоговые числа и кладёт их в кеш, так что
+шаблону число просмотров достаётся без запроса: итог из кеша плюс
+незаписанные просмотры этого процесса. Если итога в кеше нет, число не
+показывается, а поток загрузит его при следующей записи.
+"""
+import logging
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connection, transaction
+
+from core.writebehind import WriteBehindBuffer
+
+from .models import Post, PostViewCount
+
+logger = logging.getLogger('yatube.viewcounts')
+
+CACHE_KEY = 'views:{}'
+
+# Строки для удалённых постов не создаются.
+UPSERT = (
+    f'INSERT INTO {PostViewCount._meta.db_table} (post_id, count) '
+    f'SELECT id, %s FROM {Post._meta.db_table} WHERE id = %s '
+    f'ON CONFLICT (post_id) DO UPDATE '
+    f'SET count = {PostViewCount._meta.db_table}.count + excluded.count'
+)
+
+# Сколько номеров постов перечитывать одним запросом.
+BATCH_SIZE = 500
+
+
+def cache_key(post_id):
+    return CACHE_KEY.format(post_id)
+
+
+class ViewBuffer(WriteBehindBuffer):
+    name = 'view-counts'
+    interval_setting = 'VIEW_COUNTS_FLUSH_INTERVAL'
+
+    def _reset(self):
+        self.pending = Counter()
+        # Посты, итог которых нужно загрузить в кеш.
+        self.missing = set()
+        self.buffered = 0
+
+    def record(self, post_id):
+        self.start()
+        with self.lock:
+            self.pending[post_id] += 1
+            self.buffered += 1
+            full = self.buffered >= settings.VIEW_COUNTS_MAX_PENDING
+        if full:
+            self.wake()
+
+    def count(self, post_id):
+        """Число просмотров или None, если итога ещё нет в кеше."""
+        total = cache.get(cache_key(post_id))
+        with self.lock:
+            if total is None:
+                self.missing.add(post_id)
+                return None
+            return total + self.pending[post_id]
+
+    def flush(self):
+        """Записывает накопленные просмотры; возвращает их число."""
+        with self.lock:
+            pending, missing = self.pending, self.missing
+            self._reset()
+        if pending:
+            try:
+                with transaction.atomic():
+                    with connection.cursor() as cursor:
+                        cursor.executemany(UPSERT, [
+                            (views, post_id)
+                            for post_id, views in pending.items()
+                        ])
+            except DatabaseError:
+                logger.exception('Просмотры не записаны, повтор позже')
+                with self.lock:
+                    self.pending.update(pending)
+                    self.buffered += sum(pending.values())
+                return 0
+        self.refresh(set(pending) | missing)
+        return sum(pending.values())
+
+    def refresh(self, post_ids):
+        """Кладёт в кеш итоговые числа просмотров постов post_ids."""
+        post_ids = sorted(post_ids)
+        for start in range(0, len(post_ids), BATCH_SIZE):
+            batch = post_ids[start:start + BATCH_SIZE]
+            totals = dict(PostViewCount.objects.filter(
+                post_id__in=batch).values_list('post_id', 'count'))
+            cache.set_many(
+                {cache_key(post_id): totals.get(post_id, 0)
+                 for post_id in batch},
+                settings.VIEW_COUNTS_CACHE_TIMEOUT)
+
+
+buffer = ViewBuffer()
+
+
+def record(post_id):
+    buffer.record(post_id)
+
+
+def count(post_id):
+    return buffer.count(post_id)
+
+
+def flush():
+    return buffer.flush()
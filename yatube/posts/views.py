@@ -1,30 +1,60 @@
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.db import IntegrityError
+from django.http import Http404
 from django.shortcuts import redirect, render, get_object_or_404
-from .models import Post, Group, User, Follow
+
+from core.querycache import cached
+from . import directory, feed, resolvers, rollups, trending
+from .models import Post, Follow
 from .forms import PostForm, CommentForm
 
 
 POSTS_PER_PAGE = 10
+GROUPS_PER_PAGE = 20
 
 
 def index(request):
     post_list = Post.objects.select_related('author', 'group')
-    paginator = Paginator(post_list, POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = feed.get_page(
+        post_list, request.GET.get('page'), 'index', POSTS_PER_PAGE)
     context = {
         'page_obj': page_obj,
     }
     return render(request, 'posts/index.html', context)
 
 
+def trending_index(request):
+    ranking = trending.ranking()
+    post_list = trending.ordered(
+        Post.objects.select_related('author', 'group'), ranking.posts)
+    page_obj = feed.get_page(
+        post_list, request.GET.get('page'), f'trending:{ranking.version}',
+        POSTS_PER_PAGE)
+    context = {
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/trending.html', context)
+
+
+def group_directory(request):
+    sort, groups = directory.sorted_groups(request.GET.get('sort'))
+    paginator = Paginator(groups, GROUPS_PER_PAGE)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    context = {
+        'page_obj': page_obj,
+        'sort': sort,
+        'sorts': directory.SORT_TITLES,
+    }
+    return render(request, 'posts/group_directory.html', context)
+
+
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
+    group = resolvers.groups.get_or_404(slug)
     post_list = group.posts.select_related('group', 'author')
-    paginator = Paginator(post_list, POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = feed.get_page(
+        post_list, request.GET.get('page'), f'group:{group.pk}',
+        POSTS_PER_PAGE)
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -33,30 +63,45 @@ def group_posts(request, slug):
 
 
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    following = request.user.is_authenticated and Follow.objects.filter(
-        user=request.user, author=author).exists()
+    author = resolvers.authors.get_or_404(username)
     post_list = author.posts.select_related('author', 'group').filter(
         author=author)
-    paginator = Paginator(post_list, POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = feed.get_page(
+        post_list, request.GET.get('page'), f'profile:{author.pk}',
+        POSTS_PER_PAGE)
     context = {
         'author': author,
         'page_obj': page_obj,
         'post_list': post_list,
-        'following': following
     }
     return render(request, 'posts/profile.html', context)
 
 
+def group_activity(request, slug):
+    group = resolvers.groups.get_or_404(slug)
+    context = {
+        'group': group,
+        **rollups.activity(rollups.GROUP, group.pk),
+    }
+    return render(request, 'posts/activity.html', context)
+
+
+def profile_activity(request, username):
+    author = resolvers.authors.get_or_404(username)
+    context = {
+        'author': author,
+        **rollups.activity(rollups.AUTHOR, author.pk),
+    }
+    return render(request, 'posts/activity.html', context)
+
+
 def post_detail(request, post_id):
     post = get_object_or_404(
         Post.objects.select_related('author', 'group'),
         pk=post_id
     )
     post_count = Post.objects.filter(author=post.author).count()
-    comments = post.comments.all()
+    comments = post.comments.select_related('author')
     form = CommentForm()
     context = {
         'post': post,
@@ -82,7 +127,7 @@ def post_create(request):
 @login_required
 def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
-    if request.user == post.author:
+    if request.user.pk == post.author_id:
         form = PostForm(
             request.POST or None,
             files=request.FILES or None,
@@ -120,8 +165,8 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.select_related('author', 'group').filter(
-        author__following__user=request.user)
+    posts = cached(Post.objects.select_related('author', 'group').filter(
+        author__following__user=request.user))
     paginator = Paginator(posts, POSTS_PER_PAGE)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
@@ -133,16 +178,21 @@ def follow_index(request):
 
 @login_required
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = resolvers.authors.get_or_404(username)
     user = request.user
     if user != author:
-        Follow.objects.get_or_create(user=user, author=author)
+        try:
+            Follow.objects.get_or_create(user=user, author=author)
+        except IntegrityError:
+            # Автор удалён, а кеш авторов этого процесса ещё не сверился
+            # с общим (RESOLVER_SYNC_INTERVAL).
+            raise Http404('No User matches the given query.')
         return redirect('posts:profile', username=username)
     return redirect('posts:profile', username=username)
 
 
 @login_required
 def profile_unfollow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = resolvers.authors.get_or_404(username)
     Follow.objects.get(user=request.user, author=author).delete()
     return redirect('posts:profile', username=username)
@@ -11,6 +11,9 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import sys
+
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -19,18 +22,40 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/2.2/howto/deployment/checklist/
 
+TESTING = 'test' in sys.argv[1:2] or 'pytest' in sys.modules
+
+# Профиль настроек задаётся переменной окружения YATUBE_PROFILE:
+# development — отладка и debug_toolbar, production — без отладочных
+# приложений, с кешем шаблонов и постоянными соединениями с БД,
+# test — для прогона тестов.
+PROFILES = ('development', 'production', 'test')
+PROFILE = os.environ.get(
+    'YATUBE_PROFILE', 'test' if TESTING else 'development')
+if PROFILE not in PROFILES:
+    raise ImproperlyConfigured(
+        f'YATUBE_PROFILE должен быть одним из {PROFILES}, а не {PROFILE!r}')
+PRODUCTION = PROFILE == 'production'
+
+
+def env_bool(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = '67_wq*_&r*(62515l*xvcf#p8adywtj@zs$-g(i22c$7_5o&m)'
+SECRET_KEY = os.environ.get('SECRET_KEY')
+if not SECRET_KEY:
+    if PRODUCTION:
+        raise ImproperlyConfigured('Для production нужен SECRET_KEY.')
+    SECRET_KEY = '67_wq*_&r*(62515l*xvcf#p8adywtj@zs$-g(i22c$7_5o&m)'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = env_bool('DEBUG', not PRODUCTION)
 
-ALLOWED_HOSTS = [
-    'localhost',
-    '127.0.0.1',
-    '[::1]',
-    'testserver',
-]
+ALLOWED_HOSTS = os.environ.get(
+    'ALLOWED_HOSTS', 'localhost,127.0.0.1,[::1],testserver').split(',')
 
 
 # Application definition
@@ -42,7 +67,6 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'debug_toolbar',
     'posts.apps.PostsConfig',
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
@@ -52,15 +76,31 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.SlowQueryMiddleware',
+    'core.middleware.TemplateProfileMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Фрагменты заполняются и в страницах из кеша, поэтому этот слой
+    # снаружи кеша страниц, но внутри сессий, пользователя и CSRF.
+    'core.middleware.PersonalFragmentsMiddleware',
+    'core.middleware.AnonymousPageCacheMiddleware',
+    'core.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
+if PROFILE == 'development':
+    INSTALLED_APPS.append('debug_toolbar')
+    MIDDLEWARE.append('debug_toolbar.middleware.DebugToolbarMiddleware')
+
+# В production модули admin.py приложений (вместе с формами и виджетами
+# sorl-thumbnail) импортируются не при запуске, а при загрузке URLconf:
+# короткие команды manage.py их не загружают вовсе.
+if PRODUCTION:
+    INSTALLED_APPS[0] = 'django.contrib.admin.apps.SimpleAdminConfig'
+
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
@@ -86,6 +126,16 @@ TEMPLATES = [
     },
 ]
 
+# Вне разработки шаблоны компилируются один раз на процесс.
+if PROFILE != 'development':
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [(
+        'django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ],
+    )]
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 
@@ -95,7 +145,11 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'NAME': os.environ.get(
+            'DATABASE_PATH', os.path.join(BASE_DIR, 'db.sqlite3')),
+        # Время жизни соединения в секундах; 0 — новое на каждый запрос.
+        'CONN_MAX_AGE': int(os.environ.get(
+            'CONN_MAX_AGE', 600 if PRODUCTION else 0)),
     }
 }
 
@@ -155,8 +209,186 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+# Общий для всех рабочих процессов кеш в файле SQLite (CACHE_PATH) с
+# вытеснением давно не читанных записей сверх CACHE_MAX_SIZE байт. Перед
+# ним у каждого процесса небольшой LRU в памяти: чужие записи становятся
+# видны в нём не позже чем через SYNC_INTERVAL секунд. Обращения
+# считаются по пространствам имён ключей (команда cache_stats, /metrics/),
+# размер значений измеряется у доли SAMPLE_RATE обращений.
+# Тесты работают с LocMemCache, своим у каждого процесса.
+if PROFILE == 'test':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache_backends.InstrumentedCache',
+            'LOCATION': 'near',
+            'OPTIONS': {
+                'SAMPLE_RATE': 0.01,
+                'OVERSIZED': 2 ** 20,
+            },
+        },
+        'near': {
+            'BACKEND': 'core.cache_backends.NearCache',
+            'LOCATION': 'shared',
+            'OPTIONS': {
+                'MAX_ENTRIES': 1000,
+                'LOCAL_TIMEOUT': 5,
+                'SYNC_INTERVAL': 0.5,
+            },
+        },
+        'shared': {
+            'BACKEND': 'core.cache_backends.SQLiteCache',
+            'LOCATION': os.environ.get(
+                'CACHE_PATH', os.path.join(BASE_DIR, 'cache', 'cache.sqlite3')),
+            'OPTIONS': {
+                'MAX_SIZE': int(os.environ.get('CACHE_MAX_SIZE', 256 * 2 ** 20)),
+                'MAX_ENTRIES': 100000,
+            },
+        },
     }
+
+# Кеш целых страниц для анонимных читателей: запись свежая
+# PAGE_CACHE_TIMEOUT секунд и ещё PAGE_CACHE_STALE секунд отдаётся
+# устаревшей, пока фоновый поток её обновляет.
+PAGE_CACHE_ENABLED = env_bool('PAGE_CACHE_ENABLED', not (DEBUG or TESTING))
+PAGE_CACHE_VIEWS = {
+    'posts:index', 'posts:group_list', 'posts:profile', 'posts:post_detail',
+    'posts:trending', 'posts:group_directory',
+}
+PAGE_CACHE_TIMEOUT = 20
+PAGE_CACHE_STALE = 300
+PAGE_CACHE_REFRESH_TIMEOUT = 30
+
+# Страницы с персональными местами (шапка, подписка, правка поста, форма
+# комментария) отрисовываются как общие оболочки с метками, а метки
+# заполняются для каждого запроса (core/personal.py). Тогда кеш страниц
+# обслуживает и вошедших пользователей.
+PAGE_SHELL_ENABLED = env_bool('PAGE_SHELL_ENABLED', not (DEBUG or TESTING))
+
+# Страницы ленты (главная, группы, профили) в компактном формате
+# posts/feed.py: только поля, которые нужны шаблонам.
+FEED_CACHE_ENABLED = env_bool('FEED_CACHE_ENABLED', not (DEBUG or TESTING))
+FEED_CACHE_TIMEOUT = 60
+
+# Разметка карточек постов (posts/cards.py). Ключ меняется вместе с
+# содержимым карточки, поэтому записи живут долго.
+CARD_CACHE_ENABLED = env_bool('CARD_CACHE_ENABLED', not (DEBUG or TESTING))
+CARD_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Просмотры постов копятся в памяти процесса и записываются пачкой раз в
+# VIEW_COUNTS_FLUSH_INTERVAL секунд или после VIEW_COUNTS_MAX_PENDING
+# просмотров: при падении процесса теряется не больше этого. Без интервала
+# фоновый поток не запускается, буфер записывает posts.viewcounts.flush().
+VIEW_COUNTS_ENABLED = env_bool('VIEW_COUNTS_ENABLED', not (DEBUG or TESTING))
+VIEW_COUNTS_FLUSH_INTERVAL = 5
+VIEW_COUNTS_MAX_PENDING = 1000
+VIEW_COUNTS_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Популярные посты и группы (posts/trending.py): события с весами
+# TRENDING_WEIGHTS теряют половину веса за TRENDING_HALF_LIFE секунд,
+# копятся в памяти и записываются раз в TRENDING_FLUSH_INTERVAL секунд.
+# Первые TRENDING_POSTS постов и TRENDING_GROUPS групп выбираются заново
+# раз в TRENDING_REFRESH_INTERVAL секунд.
+TRENDING_ENABLED = env_bool('TRENDING_ENABLED', not (DEBUG or TESTING))
+TRENDING_HALF_LIFE = 6 * 60 * 60
+TRENDING_WEIGHTS = {'view': 1, 'comment': 10, 'follow': 20}
+TRENDING_FLUSH_INTERVAL = 10
+TRENDING_REFRESH_INTERVAL = 60
+TRENDING_POSTS = 50
+TRENDING_GROUPS = 10
+
+# Сводки активности групп и авторов (posts/rollups.py) пополняются при
+# публикации и записываются раз в ROLLUPS_FLUSH_INTERVAL секунд; в тестах
+# их записывает posts.rollups.flush(). Страница активности показывает
+# ACTIVITY_DAYS последних дней, ACTIVITY_HOURS часов и ACTIVITY_COMMENTERS
+# самых активных комментаторов.
+ROLLUPS_FLUSH_INTERVAL = None if TESTING else 10
+ACTIVITY_DAYS = 30
+ACTIVITY_HOURS = 24
+ACTIVITY_COMMENTERS = 10
+
+# Группы по slug и авторы по username в памяти процесса (core/resolver.py):
+# не больше RESOLVER_MAX_ENTRIES на модель; изменения из других процессов
+# видны не позже чем через RESOLVER_SYNC_INTERVAL секунд.
+RESOLVER_ENABLED = env_bool('RESOLVER_ENABLED', not (DEBUG or TESTING))
+RESOLVER_MAX_ENTRIES = 10000
+RESOLVER_SYNC_INTERVAL = 1
+
+# Кеш результатов запросов ORM, обёрнутых в core.querycache.cached().
+# Запись в любую таблицу из QUERY_CACHE_TABLES делает недействительными
+# все закешированные запросы к ней.
+QUERY_CACHE_ENABLED = env_bool('QUERY_CACHE_ENABLED', not (DEBUG or TESTING))
+QUERY_CACHE_TIMEOUT = 300
+QUERY_CACHE_TABLES = {
+    'posts_post', 'posts_group', 'posts_comment', 'posts_follow', 'auth_user',
+}
+
+# Профилирование запросов: сотрудники включают его заголовком X-Profile,
+# остальные запросы попадают в профиль с вероятностью PROFILING_SAMPLE_RATE.
+PROFILING_DIR = os.path.join(BASE_DIR, 'profiles')
+PROFILING_SAMPLE_RATE = 0
+
+# Прогрев процесса при загрузке yatube/wsgi.py: шаблоны, URL, sorl-thumbnail,
+# главная страница и WARMUP_GROUPS самых больших групп.
+WARMUP_ON_BOOT = env_bool('WARMUP_ON_BOOT', False)
+WARMUP_GROUPS = 5
+
+# Прогрев кеша страниц (core.cachewarm, команда warm_cache): первые
+# CACHE_WARMING_PAGES страниц главной, самые большие группы и профили
+# авторов с наибольшим числом подписчиков в CACHE_WARMING_WORKERS потоков.
+# При CACHE_WARMING_INTERVAL > 0 рабочий процесс повторяет прогрев в фоне.
+CACHE_WARMING_PAGES = 3
+CACHE_WARMING_GROUPS = 10
+CACHE_WARMING_PROFILES = 10
+CACHE_WARMING_WORKERS = 4
+CACHE_WARMING_INTERVAL = int(os.environ.get('CACHE_WARMING_INTERVAL', 0))
+# Хост, под которым читатели открывают сайт: он входит в ключ кеша
+# страниц. По умолчанию — первый из ALLOWED_HOSTS.
+CACHE_WARMING_HOST = os.environ.get('CACHE_WARMING_HOST')
+
+# Журнал медленных SQL-запросов с планами выполнения; None — отключён.
+SLOW_QUERY_THRESHOLD_MS = 100
+SLOW_QUERY_LOG = os.path.join(BASE_DIR, 'logs', 'slow_queries.log')
+
+# Время отрисовки по шаблонам, тегам и фильтрам: заголовок Server-Timing
+# и журнал для сводки template_profile_report.
+TEMPLATE_PROFILING = DEBUG and not TESTING
+TEMPLATE_PROFILE_LOG = os.path.join(BASE_DIR, 'logs', 'templates.log')
+
+# Ленивые загрузки связей в циклах: 'raise' — ошибка, 'log' — предупреждение
+# в журнале yatube.lazyload, None — детектор не устанавливается.
+LAZY_RELATIONS = 'raise' if TESTING else ('log' if DEBUG else None)
+
+# Журналы приложений проекта (yatube.*) с уровня LOG_LEVEL выводятся в
+# stderr с номером процесса: длительность прогрева, записи буферов,
+# медленные запросы. Без этой настройки сообщения INFO терялись бы:
+# Django настраивает только журнал django.
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'process': {
+            'format': '[{process}] {levelname} {name}: {message}',
+            'style': '{',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'process',
+        },
+    },
+    'loggers': {
+        'yatube': {
+            'handlers': ['console'],
+            'level': LOG_LEVEL,
+            'propagate': False,
+        },
+    },
 }
@@ -14,3 +14,24 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.WARMUP_ON_BOOT:
+    from django.db import connections
+
+    from core.warmup import warm_up
+
+    # Длительность шагов warm_up записывает в журнал yatube.warmup.
+    warm_up(application)
+    # Соединения, открытые до fork (gunicorn --preload), нельзя
+    # разделять между рабочими процессами.
+    connections.close_all()
+
+if settings.CACHE_WARMING_INTERVAL:
+    # Поток не переживает fork: с gunicorn --preload планировщик
+    # запускается только в мастер-процессе, поэтому прогревом
+    # по расписанию пользуются без --preload.
+    from core.cachewarm import start_scheduler
+
+    start_scheduler(application)